@@ -28,7 +28,7 @@ def run_atividade1():
         from atividade1.src.crypto_benchmark import main as benchmark_main
         
         start_time = time.time()
-        results_df = benchmark_main()
+        results_df = benchmark_main([])
         end_time = time.time()
         
         print(f"✓ Benchmark concluído em {end_time - start_time:.2f} segundos")
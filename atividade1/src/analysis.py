@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from scipy import stats
+import pstats
 import os
 
 # Configuração do matplotlib para português
@@ -391,6 +392,35 @@ ANÁLISE ESTATÍSTICA DOS ALGORITMOS DE CRIPTOGRAFIA
         
         return summary
     
+    def summarize_profiles(self, top_n=10, profile_dir=None):
+        """Resume as N funções mais custosas (tempo próprio) de cada caso perfilado
+        
+        Sem profile_dir, usa a coluna profile_path dos resultados do benchmark;
+        com profile_dir, resume todos os .prof do diretório (ex.: perfis do MessageSigner).
+        """
+        if profile_dir is not None:
+            cases = [{'case': os.path.splitext(name)[0], 'profile_path': os.path.join(profile_dir, name)}
+                     for name in sorted(os.listdir(profile_dir)) if name.endswith('.prof')]
+            output_name = f'profile_summary_{os.path.basename(os.path.normpath(profile_dir))}.csv'
+        elif 'profile_path' in self.df.columns:
+            cases = [{'case': f"{case['algorithm']}_{case['key_size']}_{case['data_size']}",
+                      'profile_path': case['profile_path']}
+                     for _, case in self.df.dropna(subset=['profile_path']).iterrows()]
+            output_name = 'profile_summary.csv'
+        else:
+            return None
+        
+        rows = []
+        for case in cases:
+            if not os.path.exists(case['profile_path']):
+                continue
+            for rank, entry in enumerate(summarize_profile(case['profile_path'], top_n), start=1):
+                rows.append({'case': case['case'], 'rank': rank, **entry})
+        
+        summary = pd.DataFrame(rows)
+        summary.to_csv(f'{self.output_dir}/{output_name}', index=False)
+        return summary
+    
     def run_complete_analysis(self):
         """Executa análise completa"""
         print("Gerando análises e gráficos...")
@@ -416,13 +446,33 @@ ANÁLISE ESTATÍSTICA DOS ALGORITMOS DE CRIPTOGRAFIA
         summary = self.generate_summary_table()
         print("✓ Tabela resumo")
         
+        profile_summary = self.summarize_profiles()
+        if profile_summary is not None:
+            print("✓ Resumo dos perfis (funções mais custosas por caso)")
+        
         print(f"\nTodos os gráficos e análises foram salvos em '{self.output_dir}/'")
         
         return {
             'statistical_report': stats_report,
-            'summary_table': summary
+            'summary_table': summary,
+            'profile_summary': profile_summary
         }
 
+def summarize_profile(profile_path, top_n=10):
+    """Retorna as N funções com maior tempo próprio de um arquivo .prof (cProfile)"""
+    stats_data = pstats.Stats(profile_path).stats
+    entries = []
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats_data.items():
+        entries.append({
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'ncalls': ncalls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+            'tottime_per_call': tottime / ncalls if ncalls else 0.0
+        })
+    entries.sort(key=lambda e: e['tottime'], reverse=True)
+    return entries[:top_n]
+
 def main():
     # Carregar resultados
     try:
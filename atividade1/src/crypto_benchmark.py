@@ -5,22 +5,39 @@ Algoritmos: AES, Blowfish, Twofish
 Autor: Análise Comparativa de Performance
 """
 
+# Núcleo de medição enxuto: apenas bibliotecas de cifragem, numpy e o timer.
+# pandas/matplotlib/seaborn/scipy ficam no estágio de análise (analysis.py),
+# para não distorcer tempo de inicialização e a própria coluna de memória.
 import os
+import sys
+import csv
 import time
+import argparse
+import cProfile
+import subprocess
+import multiprocessing
 import psutil
 import gc
 from Crypto.Cipher import AES, Blowfish
 from Crypto.Random import get_random_bytes
 from Crypto.Util.Padding import pad, unpad
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from tabulate import tabulate
-from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import resource  # ru_maxrss (indisponível no Windows)
+except ImportError:
+    resource = None
+
+RESULTS_PATH = 'atividade1/data/benchmark_results.csv'
+PROFILES_DIR = 'atividade1/data/profiles'
+PARALLEL_RESULTS_PATH = 'atividade1/data/parallel_scaling.csv'
+
+# Orçamento de importação do núcleo de medição
+IMPORT_BUDGET_SECONDS = 1.0
+FORBIDDEN_IMPORTS = ['pandas', 'matplotlib', 'seaborn', 'scipy', 'tabulate']
+
 class TwofishCipher:
     """Implementação simplificada do Twofish para benchmark"""
     def __init__(self, key):
@@ -37,8 +54,10 @@ class TwofishCipher:
         return cipher.decrypt(data)
 
 class CryptoBenchmark:
-    def __init__(self):
+    def __init__(self, profile_dir=None):
         self.results = []
+        # Se definido, cada caso é perfilado com cProfile e salvo neste diretório
+        self.profile_dir = profile_dir
         self.data_sizes = [1024, 10240, 102400, 1048576, 10485760]  # 1KB, 10KB, 100KB, 1MB, 10MB
         self.iterations = 100
         
@@ -98,21 +117,37 @@ class CryptoBenchmark:
             cpu_times_decrypt.append(max(end_cpu - start_cpu, 0))
             memory_usage_decrypt.append(current_memory - initial_memory)
         
-        return {
+        # Perfilamento opcional em uma passada separada, fora dos laços cronometrados:
+        # o cProfile infla os tempos e a CPU, que não podem ir para as médias do CSV
+        profile_path = None
+        if self.profile_dir:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            for _ in range(self.iterations):
+                decrypt_func(encrypt_func(data))
+            profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_path = os.path.join(self.profile_dir, f"{algorithm}_{key_size}_{len(data)}.prof")
+            profiler.dump_stats(profile_path)
+        
+        result = {
             'algorithm': algorithm,
             'key_size': key_size,
             'data_size': len(data),
-            'encrypt_time_mean': np.mean(execution_times_encrypt),
-            'encrypt_time_std': np.std(execution_times_encrypt),
-            'decrypt_time_mean': np.mean(execution_times_decrypt),
-            'decrypt_time_std': np.std(execution_times_decrypt),
-            'encrypt_cpu_mean': np.mean(cpu_times_encrypt),
-            'decrypt_cpu_mean': np.mean(cpu_times_decrypt),
-            'encrypt_memory_mean': np.mean(memory_usage_encrypt),
-            'decrypt_memory_mean': np.mean(memory_usage_decrypt),
-            'throughput_encrypt': (len(data) / 1024 / 1024) / np.mean(execution_times_encrypt),  # MB/s
-            'throughput_decrypt': (len(data) / 1024 / 1024) / np.mean(execution_times_decrypt)   # MB/s
+            'encrypt_time_mean': float(np.mean(execution_times_encrypt)),
+            'encrypt_time_std': float(np.std(execution_times_encrypt)),
+            'decrypt_time_mean': float(np.mean(execution_times_decrypt)),
+            'decrypt_time_std': float(np.std(execution_times_decrypt)),
+            'encrypt_cpu_mean': float(np.mean(cpu_times_encrypt)),
+            'decrypt_cpu_mean': float(np.mean(cpu_times_decrypt)),
+            'encrypt_memory_mean': float(np.mean(memory_usage_encrypt)),
+            'decrypt_memory_mean': float(np.mean(memory_usage_decrypt)),
+            'throughput_encrypt': float((len(data) / 1024 / 1024) / np.mean(execution_times_encrypt)),  # MB/s
+            'throughput_decrypt': float((len(data) / 1024 / 1024) / np.mean(execution_times_decrypt))   # MB/s
         }
+        if profile_path:
+            result['profile_path'] = profile_path
+        return result
     
     def test_aes(self, data, key_size):
         """Testa performance do AES"""
@@ -147,18 +182,36 @@ class CryptoBenchmark:
         
         return self.measure_performance(encrypt, decrypt, padded_data, 'Twofish', key_size)
     
-    def run_benchmark(self):
-        """Executa todos os testes de benchmark"""
-        print("Iniciando benchmark de algoritmos de criptografia...")
-        
-        # Configurações de teste
-        algorithms = {
+    def algorithms(self):
+        """Configurações de teste: algoritmo -> função de teste e tamanhos de chave"""
+        return {
             'AES': {'func': self.test_aes, 'key_sizes': [128, 192, 256]},
             'Blowfish': {'func': self.test_blowfish, 'key_sizes': [128, 192, 256]},
             'Twofish': {'func': self.test_twofish, 'key_sizes': [128, 192, 256]}
         }
+    
+    def cases(self):
+        """Lista de casos (tamanho dos dados, algoritmo, tamanho da chave) na ordem de execução"""
+        return [(data_size, alg_name, key_size)
+                for data_size in self.data_sizes
+                for alg_name, config in self.algorithms().items()
+                for key_size in config['key_sizes']]
+    
+    def run_benchmark(self, isolated=False, group_by='case', cpu=None):
+        """Executa todos os testes de benchmark
         
-        total_tests = sum(len(config['key_sizes']) for config in algorithms.values()) * len(self.data_sizes)
+        isolated=False executa tudo neste interpretador (mais rápido).
+        isolated=True executa cada grupo de casos em um subprocesso novo (heap e RSS limpos);
+        group_by='case' usa um processo por caso, 'size' um processo por tamanho de dados.
+        cpu fixa os subprocessos em um núcleo (Linux).
+        """
+        print("Iniciando benchmark de algoritmos de criptografia...")
+        if isolated:
+            return self._run_isolated(group_by, cpu)
+        
+        algorithms = self.algorithms()
+        cases = self.cases()
+        total_tests = len(cases)
         current_test = 0
         
         for data_size in self.data_sizes:
@@ -177,18 +230,214 @@ class CryptoBenchmark:
                         print(f"    Erro: {e}")
         
         print("\nBenchmark concluído!")
-        return pd.DataFrame(self.results)
+        return self.results
+    
+    def _run_isolated(self, group_by, cpu):
+        """Executa grupos de casos em subprocessos 'spawn', recebendo resultados por pipe"""
+        cases = self.cases()
+        if group_by == 'case':
+            groups = [[case] for case in cases]
+        elif group_by == 'size':
+            groups = [[case for case in cases if case[0] == size] for size in self.data_sizes]
+        else:
+            raise ValueError(f"group_by inválido: {group_by}")
+        
+        context = multiprocessing.get_context('spawn')
+        total_tests = len(cases)
+        current_test = 0
+        
+        for group in groups:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_isolated_worker,
+                args=(sender, group, self.iterations, self.profile_dir, cpu)
+            )
+            process.start()
+            sender.close()
+            
+            # Resultados chegam em streaming, um por caso; None encerra o grupo
+            while True:
+                try:
+                    message = receiver.recv()
+                except EOFError:
+                    print("    Erro: subprocesso encerrou sem concluir o grupo")
+                    break
+                if message is None:
+                    break
+                current_test += 1
+                data_size, alg_name, key_size = message['case']
+                print(f"  [{current_test}/{total_tests}] {alg_name} - {key_size} bits "
+                      f"({data_size/1024:.0f}KB, processo isolado)")
+                if 'error' in message:
+                    print(f"    Erro: {message['error']}")
+                else:
+                    self.results.append(message['result'])
+            
+            receiver.close()
+            process.join()
+        
+        print("\nBenchmark concluído!")
+        return self.results
 
-def main():
-    benchmark = CryptoBenchmark()
-    df = benchmark.run_benchmark()
+    def run_parallel_scaling(self, data_sizes=(1048576, 10485760, 104857600), workers_list=None):
+        """Mede o throughput do motor AES-GCM paralelo contra a chamada única (baseline)
+        
+        O motor fica em atividade2/src/ParallelCipher.py (usa a biblioteca cryptography,
+        a mesma do AESCipher do chat) e só é importado aqui, mantendo o núcleo enxuto.
+        """
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)))), 'atividade2', 'src'))
+        from ParallelCipher import ParallelAESCipher
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        
+        cpu_count = os.cpu_count() or 1
+        workers_list = workers_list or sorted({1, 2, 4, cpu_count})
+        key = get_random_bytes(32)
+        nonce = get_random_bytes(12)
+        aesgcm = AESGCM(key)
+        results = []
+        
+        print("Iniciando benchmark de escalabilidade do AES-GCM paralelo...")
+        for data_size in data_sizes:
+            data = self.generate_test_data(data_size)
+            
+            baseline = self.measure_performance(
+                lambda d: aesgcm.encrypt(nonce, d, None),
+                lambda d: aesgcm.decrypt(nonce, d, None),
+                data, 'AES-GCM', 256)
+            baseline.update({'workers': 1, 'mode': 'single_call', 'speedup': 1.0})
+            results.append(baseline)
+            print(f"  {data_size/1048576:.0f}MB - chamada única: {baseline['throughput_encrypt']:.1f} MB/s")
+            
+            for workers in workers_list:
+                with ParallelAESCipher(key, workers=workers) as engine:
+                    def encrypt(d):
+                        ciphertext, tag = engine.encrypt_gcm(d, nonce)
+                        return ciphertext, tag
+                    def decrypt(encrypted):
+                        return engine.decrypt_gcm(encrypted[0], nonce, encrypted[1])
+                    result = self.measure_performance(encrypt, decrypt, data, 'AES-GCM', 256)
+                result.update({'workers': workers, 'mode': 'parallel',
+                               'speedup': result['throughput_encrypt'] / baseline['throughput_encrypt']})
+                results.append(result)
+                print(f"  {data_size/1048576:.0f}MB - {workers} worker(s): "
+                      f"{result['throughput_encrypt']:.1f} MB/s ({result['speedup']:.2f}x)")
+        
+        return results
+
+def peak_rss_mb():
+    """Pico de RSS do processo atual (ru_maxrss) em MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB; macOS em bytes
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def _isolated_worker(sender, cases, iterations, profile_dir, cpu):
+    """Executa casos em um interpretador novo e envia cada resultado pelo pipe"""
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+    
+    benchmark = CryptoBenchmark(profile_dir=profile_dir)
+    benchmark.iterations = iterations
+    algorithms = benchmark.algorithms()
+    test_data = {}
+    
+    # ru_maxrss é o pico de toda a vida do processo: só com um caso por processo ele é o
+    # pico do caso; em grupos (--group-by size) é o pico acumulado do grupo até este caso
+    rss_column = 'peak_rss_mb' if len(cases) == 1 else 'group_peak_rss_mb'
+    
+    try:
+        for case in cases:
+            data_size, alg_name, key_size = case
+            if data_size not in test_data:
+                test_data[data_size] = benchmark.generate_test_data(data_size)
+            try:
+                result = algorithms[alg_name]['func'](test_data[data_size], key_size)
+                result[rss_column] = peak_rss_mb()
+                sender.send({'case': case, 'result': result})
+            except Exception as e:
+                sender.send({'case': case, 'error': str(e)})
+        sender.send(None)
+    finally:
+        sender.close()
+
+def save_results(results, path=RESULTS_PATH):
+    """Salva resultados em CSV sem depender de pandas"""
+    if not results:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+def measure_import(forbidden=FORBIDDEN_IMPORTS):
+    """Importa este módulo em um interpretador limpo; retorna (segundos, módulos proibidos carregados)"""
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    probe = (
+        "import sys, time; sys.path.insert(0, %r); start = time.perf_counter(); "
+        "import crypto_benchmark; elapsed = time.perf_counter() - start; "
+        "heavy = [m for m in %r if m in sys.modules]; print(elapsed); print(','.join(heavy))"
+    ) % (module_dir, list(forbidden))
+    output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True).stdout.split('\n')
+    elapsed = float(output[0])
+    heavy = [m for m in output[1].split(',') if m]
+    return elapsed, heavy
+
+def check_import_budget(budget=IMPORT_BUDGET_SECONDS, forbidden=FORBIDDEN_IMPORTS):
+    """Verifica, em um interpretador limpo, o tempo de importação e o grafo de imports deste módulo"""
+    elapsed, heavy = measure_import(forbidden)
+    
+    print(f"Tempo de importação: {elapsed:.3f}s (orçamento: {budget:.3f}s)")
+    if heavy:
+        print(f"✗ Módulos pesados importados: {', '.join(heavy)}")
+    ok = elapsed <= budget and not heavy
+    print("✓ Núcleo de medição dentro do orçamento" if ok else "✗ Orçamento de importação excedido")
+    return ok
+
+def main(argv=()):
+    """Executa o benchmark com as opções de argv (padrão: nenhuma)
+
+    Só a execução como script lê sys.argv; quem importa main (run_study, run_atividade1...)
+    não herda as opções da própria linha de comando.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark de AES, Blowfish e Twofish (apenas medição)')
+    parser.add_argument('--output', default=RESULTS_PATH, help='CSV de saída')
+    parser.add_argument('--check-imports', action='store_true',
+                        help='verifica o orçamento de importação do núcleo de medição e sai')
+    parser.add_argument('--profile', nargs='?', const=PROFILES_DIR, default=None, metavar='DIR',
+                        help=f'salva um perfil cProfile por caso (padrão: {PROFILES_DIR})')
+    parser.add_argument('--isolated', action='store_true',
+                        help='executa os casos em subprocessos novos (memória e cache limpos)')
+    parser.add_argument('--group-by', choices=['case', 'size'], default='case',
+                        help='granularidade dos subprocessos no modo isolado')
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='fixa os subprocessos isolados em um núcleo (Linux)')
+    parser.add_argument('--parallel-scaling', action='store_true',
+                        help=f'mede a escalabilidade do AES-GCM paralelo e salva em {PARALLEL_RESULTS_PATH}')
+    args = parser.parse_args(list(argv))
+    
+    if args.check_imports:
+        sys.exit(0 if check_import_budget() else 1)
+    
+    benchmark = CryptoBenchmark(profile_dir=args.profile)
+    
+    if args.parallel_scaling:
+        benchmark.iterations = 10
+        results = benchmark.run_parallel_scaling()
+        save_results(results, PARALLEL_RESULTS_PATH)
+        print(f"\nResultados salvos em '{PARALLEL_RESULTS_PATH}'")
+        return results
+    
+    results = benchmark.run_benchmark(isolated=args.isolated, group_by=args.group_by, cpu=args.cpu)
     
-    # Salva resultados
-    df.to_csv('atividade1/data/benchmark_results.csv', index=False)
-    print(f"\nResultados salvos em 'atividade1/data/benchmark_results.csv'")
-    print(f"Total de testes realizados: {len(df)}")
+    # Salva resultados (a análise é um estágio separado: analysis.py)
+    save_results(results, args.output)
+    print(f"\nResultados salvos em '{args.output}'")
+    print(f"Total de testes realizados: {len(results)}")
     
-    return df
+    return results
 
 if __name__ == "__main__":
-    results_df = main()
+    results = main(sys.argv[1:])
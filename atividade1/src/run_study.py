@@ -54,7 +54,7 @@ def run_benchmark():
         from src.crypto_benchmark import main as benchmark_main
         
         start_time = time.time()
-        results_df = benchmark_main()
+        results_df = benchmark_main([])
         end_time = time.time()
         
         print(f"✓ Benchmark concluído em {end_time - start_time:.2f} segundos")
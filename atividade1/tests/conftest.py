@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos da atividade1 são importados pelo nome (como em run_study.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,14 @@
+import crypto_benchmark
+
+
+def test_measurement_core_import_stays_lean():
+    elapsed, heavy = crypto_benchmark.measure_import()
+    assert heavy == []
+    assert elapsed <= crypto_benchmark.IMPORT_BUDGET_SECONDS
+    assert {'pandas', 'matplotlib'} <= set(crypto_benchmark.FORBIDDEN_IMPORTS)
+
+
+def test_measure_import_reports_forbidden_modules():
+    # numpy é dependência legítima do núcleo: serve para provar que a sonda detecta o import
+    _, heavy = crypto_benchmark.measure_import(forbidden=['numpy'])
+    assert heavy == ['numpy']
@@ -4,12 +4,18 @@ Gerador de Gráficos das Métricas Reais do Chat para LaTeX
 Baseado exclusivamente em dados coletados durante uso real do chat
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+import sys
 import os
 
-def generate_chat_metrics_charts():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from LatencyHistogram import ChatMetricsAggregator
+
+OPERATION_LABELS = {'sign': 'Assinatura', 'verify': 'Verificação'}
+
+def generate_chat_metrics_charts(chunksize=100_000, window_seconds=60, max_windows=240):
     """Gera gráficos das métricas reais coletadas durante uso do chat"""
     
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -25,18 +31,16 @@ def generate_chat_metrics_charts():
         print("   4. Execute este script novamente")
         return
     
-    # Carregar dados reais
-    df = pd.read_csv('data/real_chat_metrics.csv')
+    # Agregar dados reais em blocos (memória limitada, independente do tamanho do log)
+    agg = ChatMetricsAggregator(window_seconds=window_seconds, max_windows=max_windows)
+    agg.consume_csv('data/real_chat_metrics.csv', chunksize=chunksize)
     
-    if df.empty:
+    if agg.rows == 0:
         print("❌ Arquivo de métricas está vazio!")
         return
     
-    print(f"📊 Gerando gráficos com {len(df)} métricas reais do chat...")
-    
-    # Preparar dados de tempo
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['time_from_start'] = (df['timestamp'] - df['timestamp'].min()).dt.total_seconds()
+    print(f"📊 Gerando gráficos com {agg.rows} métricas reais do chat "
+          f"(janelas de {agg.window_seconds}s)...")
     
     # Configurar estilo para LaTeX
     plt.rcParams.update({
@@ -47,50 +51,50 @@ def generate_chat_metrics_charts():
         'grid.alpha': 0.3
     })
     
-    sign_data = df[df['operation'] == 'sign']
-    verify_data = df[df['operation'] == 'verify']
+    sign_hist = agg.histogram('sign')
+    verify_hist = agg.histogram('verify')
     
     # 1. Gráfico Principal (4 subgráficos)
     fig, axes = plt.subplots(2, 2, figsize=(14, 12))
     
-    # Timeline de uso
-    
-    if not sign_data.empty:
-        axes[0,0].scatter(sign_data['time_from_start'], sign_data['time'] * 1000, 
-                         alpha=0.7, s=60, c='blue', label='Assinatura')
-    if not verify_data.empty:
-        axes[0,0].scatter(verify_data['time_from_start'], verify_data['time'] * 1000, 
-                         alpha=0.7, s=60, c='red', label='Verificação')
+    # Timeline de uso (p50 e p99 por janela de tempo)
+    for operation, color in (('sign', 'blue'), ('verify', 'red')):
+        starts, series = agg.window_series(operation)
+        if len(starts):
+            axes[0,0].plot(starts, series[50] * 1000, 'o-', markersize=4, alpha=0.7,
+                           c=color, label=f'{OPERATION_LABELS[operation]} (p50)')
+            axes[0,0].plot(starts, series[99] * 1000, '--', alpha=0.5,
+                           c=color, label=f'{OPERATION_LABELS[operation]} (p99)')
     axes[0,0].set_xlabel('Tempo (s)')
     axes[0,0].set_ylabel('Tempo (ms)')
     axes[0,0].set_title('Timeline de Uso Real do Chat')
     axes[0,0].legend()
     
     # Performance por usuário
-    if 'username' in df.columns and len(df['username'].unique()) > 1:
-        user_stats = df.groupby(['username', 'operation'])['time'].mean().unstack(fill_value=0) * 1000
+    user_stats = agg.user_means() * 1000
+    if len(user_stats) > 1:
         user_stats.plot(kind='bar', ax=axes[0,1], alpha=0.8)
         axes[0,1].set_title('Performance por Usuário')
         axes[0,1].set_ylabel('Tempo Médio (ms)')
         axes[0,1].tick_params(axis='x', rotation=45)
     
-    # Distribuição de tempos
-    if not sign_data.empty:
-        axes[1,0].hist(sign_data['time'] * 1000, bins=20, alpha=0.7, 
-                      color='lightblue', edgecolor='navy', label='Assinatura')
-    if not verify_data.empty:
-        axes[1,0].hist(verify_data['time'] * 1000, bins=20, alpha=0.7, 
-                      color='lightcoral', edgecolor='darkred', label='Verificação')
+    # Distribuição de tempos (buckets log-lineares)
+    for hist, color, edge, label in ((sign_hist, 'lightblue', 'navy', 'Assinatura'),
+                                     (verify_hist, 'lightcoral', 'darkred', 'Verificação')):
+        if hist.total_count:
+            centers, widths, counts = hist.buckets()
+            axes[1,0].bar(centers * 1000, counts, width=widths * 1000, alpha=0.7,
+                          color=color, edgecolor=edge, label=label)
+    axes[1,0].set_xscale('log')
     axes[1,0].set_xlabel('Tempo (ms)')
     axes[1,0].set_ylabel('Frequência')
     axes[1,0].set_title('Distribuição de Tempos')
     axes[1,0].legend()
     
-    # Tamanhos de mensagem
-    if not sign_data.empty:
-        # Usar message_size_chars se disponível, senão usar message_size (compatibilidade)
-        size_col = 'message_size_chars' if 'message_size_chars' in sign_data.columns else 'message_size'
-        axes[1,1].scatter(sign_data[size_col], sign_data['time'] * 1000, 
+    # Tamanhos de mensagem (tempo médio por faixa de tamanho)
+    sizes, times, counts = agg.size_series('sign')
+    if len(sizes):
+        axes[1,1].scatter(sizes, times * 1000, s=20 + 80 * counts / counts.max(),
                          alpha=0.7, c='green')
         axes[1,1].set_xlabel('Tamanho da Mensagem (caracteres)')
         axes[1,1].set_ylabel('Tempo de Assinatura (ms)')
@@ -103,10 +107,13 @@ def generate_chat_metrics_charts():
     # 2. Gráfico de Comparação
     fig, axes = plt.subplots(1, 2, figsize=(14, 6))
     
-    # Box plot
-    if not sign_data.empty and not verify_data.empty:
-        data = [sign_data['time'] * 1000, verify_data['time'] * 1000]
-        bp = axes[0].boxplot(data, tick_labels=['Assinatura', 'Verificação'], patch_artist=True)
+    # Box plot (quartis e percentis 5/95 calculados a partir dos histogramas)
+    if sign_hist.total_count and verify_hist.total_count:
+        box_stats = [sign_hist.box_stats('Assinatura'), verify_hist.box_stats('Verificação')]
+        for stats in box_stats:
+            for key in ('whislo', 'q1', 'med', 'q3', 'whishi', 'mean'):
+                stats[key] *= 1000
+        bp = axes[0].bxp(box_stats, patch_artist=True, showmeans=True)
         bp['boxes'][0].set_facecolor('lightblue')
         bp['boxes'][1].set_facecolor('lightgreen')
         axes[0].set_ylabel('Tempo (ms)')
@@ -115,8 +122,8 @@ def generate_chat_metrics_charts():
     
     # Estatísticas
     operations = ['Assinatura', 'Verificação']
-    means = [sign_data['time'].mean() * 1000 if not sign_data.empty else 0,
-             verify_data['time'].mean() * 1000 if not verify_data.empty else 0]
+    means = [sign_hist.mean() * 1000 if sign_hist.total_count else 0,
+             verify_hist.mean() * 1000 if verify_hist.total_count else 0]
     
     bars = axes[1].bar(operations, means, alpha=0.8, 
                       color=['skyblue', 'lightgreen'], edgecolor='black')
@@ -134,10 +141,10 @@ def generate_chat_metrics_charts():
     plt.close()
     
     # 3. Gráficos para LaTeX
-    create_latex_charts(df)
+    create_latex_charts(agg)
     
     # 4. Tabela LaTeX
-    create_latex_table(df)
+    create_latex_table(agg)
     
     print("✅ Gráficos das métricas reais gerados!")
     print("📊 Arquivos criados:")
@@ -147,35 +154,33 @@ def generate_chat_metrics_charts():
     print("   - results/chat_statistics_latex.png")
     print("   - results/chat_metrics_table_latex.tex")
 
-def create_latex_charts(df):
+def create_latex_charts(agg):
     """Cria gráficos otimizados para LaTeX com foco acadêmico"""
-    sign_data = df[df['operation'] == 'sign']
-    verify_data = df[df['operation'] == 'verify']
+    sign_hist = agg.histogram('sign')
+    verify_hist = agg.histogram('verify')
     
     # Gráfico de métricas para LaTeX - Foco acadêmico
     fig, axes = plt.subplots(2, 2, figsize=(12, 10))
     
-    # 1. Análise temporal detalhada
-    if not sign_data.empty:
-        axes[0,0].plot(sign_data['time_from_start'], sign_data['time'] * 1000, 
-                      'o-', markersize=8, linewidth=3, label='Assinatura Digital', 
-                      color='darkblue', alpha=0.8)
-    if not verify_data.empty:
-        axes[0,0].plot(verify_data['time_from_start'], verify_data['time'] * 1000, 
-                      's-', markersize=8, linewidth=3, label='Verificação Digital', 
-                      color='darkred', alpha=0.8)
+    # 1. Análise temporal detalhada (mediana por janela de tempo)
+    for operation, marker, color, label in (('sign', 'o-', 'darkblue', 'Assinatura Digital'),
+                                            ('verify', 's-', 'darkred', 'Verificação Digital')):
+        starts, series = agg.window_series(operation, percentiles=(50,))
+        if len(starts):
+            axes[0,0].plot(starts, series[50] * 1000, marker, markersize=8, linewidth=3,
+                          label=label, color=color, alpha=0.8)
     axes[0,0].set_xlabel('Tempo de Execução (segundos)', fontweight='bold')
-    axes[0,0].set_ylabel('Latência (ms)', fontweight='bold')
+    axes[0,0].set_ylabel('Latência Mediana (ms)', fontweight='bold')
     axes[0,0].set_title('Análise Temporal de Operações Criptográficas', fontweight='bold')
     axes[0,0].legend(fontsize=11)
     axes[0,0].grid(True, alpha=0.3)
     
     # 2. Análise estatística comparativa
-    if not sign_data.empty and not verify_data.empty:
-        sign_mean = sign_data['time'].mean() * 1000
-        verify_mean = verify_data['time'].mean() * 1000
-        sign_std = sign_data['time'].std() * 1000
-        verify_std = verify_data['time'].std() * 1000
+    if sign_hist.total_count and verify_hist.total_count:
+        sign_mean = sign_hist.mean() * 1000
+        verify_mean = verify_hist.mean() * 1000
+        sign_std = sign_hist.std() * 1000
+        verify_std = verify_hist.std() * 1000
         
         operations = ['Assinatura\nDigital', 'Verificação\nDigital']
         means = [sign_mean, verify_mean]
@@ -193,26 +198,25 @@ def create_latex_charts(df):
                           f'{mean_val:.1f}±{std_val:.1f}ms', ha='center', va='bottom', 
                           fontweight='bold')
     
-    # 3. Distribuição probabilística
-    if not sign_data.empty:
-        axes[1,0].hist(sign_data['time'] * 1000, bins=12, alpha=0.7, 
-                      color='lightsteelblue', edgecolor='darkblue', linewidth=2,
-                      label=f'Assinatura (n={len(sign_data)})', density=True)
-    if not verify_data.empty:
-        axes[1,0].hist(verify_data['time'] * 1000, bins=12, alpha=0.7, 
-                      color='lightcoral', edgecolor='darkred', linewidth=2,
-                      label=f'Verificação (n={len(verify_data)})', density=True)
+    # 3. Distribuição probabilística (densidade = contagem / (n * largura do bucket))
+    for hist, color, edge, label in ((sign_hist, 'lightsteelblue', 'darkblue', 'Assinatura'),
+                                     (verify_hist, 'lightcoral', 'darkred', 'Verificação')):
+        if hist.total_count:
+            centers, widths, counts = hist.buckets()
+            axes[1,0].bar(centers * 1000, counts / (hist.total_count * widths * 1000),
+                          width=widths * 1000, alpha=0.7, color=color, edgecolor=edge,
+                          linewidth=1, label=f'{label} (n={hist.total_count})')
+    axes[1,0].set_xscale('log')
     axes[1,0].set_xlabel('Latência (ms)', fontweight='bold')
     axes[1,0].set_ylabel('Densidade de Probabilidade', fontweight='bold')
     axes[1,0].set_title('Distribuição Probabilística de Latências', fontweight='bold')
     axes[1,0].legend()
     
     # 4. Análise de eficiência computacional
-    if not sign_data.empty:
-        # Usar message_size_chars se disponível, senão usar message_size (compatibilidade)
-        size_col = 'message_size_chars' if 'message_size_chars' in sign_data.columns else 'message_size'
-        efficiency = sign_data[size_col] / (sign_data['time'] * 1000)  # chars/ms
-        axes[1,1].scatter(sign_data[size_col], efficiency, 
+    sizes, times, counts = agg.size_series('sign')
+    if len(sizes):
+        efficiency = sizes / (times * 1000)  # chars/ms
+        axes[1,1].scatter(sizes, efficiency, 
                          alpha=0.8, c='forestgreen', s=80, edgecolor='darkgreen')
         axes[1,1].set_xlabel('Tamanho da Mensagem (caracteres)', fontweight='bold')
         axes[1,1].set_ylabel('Eficiência (chars/ms)', fontweight='bold')
@@ -227,8 +231,8 @@ def create_latex_charts(df):
     
     # 1. Tempos médios
     operations = ['Assinatura', 'Verificação']
-    means = [sign_data['time'].mean() * 1000 if not sign_data.empty else 0,
-             verify_data['time'].mean() * 1000 if not verify_data.empty else 0]
+    means = [sign_hist.mean() * 1000 if sign_hist.total_count else 0,
+             verify_hist.mean() * 1000 if verify_hist.total_count else 0]
     
     bars = axes[0].bar(operations, means, alpha=0.8, color=['blue', 'red'])
     axes[0].set_title('Tempos Médios Reais')
@@ -241,11 +245,11 @@ def create_latex_charts(df):
                         f'{mean_val:.2f}ms', ha='center', va='bottom')
     
     # 2. Contagem de operações
-    if not df.empty:
-        operation_counts = df['operation'].value_counts()
-        colors = ['lightblue' if op == 'sign' else 'lightcoral' for op in operation_counts.index]
+    operation_counts = sorted(((agg.histogram(op).total_count, op) for op in agg.operations()), reverse=True)
+    if operation_counts:
+        colors = ['lightblue' if op == 'sign' else 'lightcoral' for _, op in operation_counts]
         
-        axes[1].pie(operation_counts.values, labels=operation_counts.index, 
+        axes[1].pie([count for count, _ in operation_counts], labels=[op for _, op in operation_counts], 
                    autopct='%1.1f%%', colors=colors, startangle=90)
         axes[1].set_title('Distribuição de Operações')
     
@@ -253,27 +257,27 @@ def create_latex_charts(df):
     plt.savefig('results/chat_statistics_latex.png', dpi=300, bbox_inches='tight')
     plt.close()
 
-def create_latex_table(df):
+def create_latex_table(agg):
     """Cria tabela LaTeX com métricas reais"""
-    sign_data = df[df['operation'] == 'sign']
-    verify_data = df[df['operation'] == 'verify']
+    sign_hist = agg.histogram('sign')
+    verify_hist = agg.histogram('verify')
     
     latex_code = """\\begin{table}[h]
 \\centering
 \\caption{Métricas Reais do Sistema de Chat com Assinatura Digital}
 \\label{tab:real_chat_metrics}
-\\begin{tabular}{|l|c|c|c|}
+\\begin{tabular}{|l|c|c|c|c|c|}
 \\hline
-\\textbf{Operação} & \\textbf{Tempo Médio} & \\textbf{Desvio Padrão} & \\textbf{Total} \\\\
-& \\textbf{(ms)} & \\textbf{(ms)} & \\textbf{Operações} \\\\
+\\textbf{Operação} & \\textbf{Tempo Médio} & \\textbf{Desvio Padrão} & \\textbf{P50} & \\textbf{P99} & \\textbf{Total} \\\\
+& \\textbf{(ms)} & \\textbf{(ms)} & \\textbf{(ms)} & \\textbf{(ms)} & \\textbf{Operações} \\\\
 \\hline
 """
     
-    if not sign_data.empty:
-        latex_code += f"Assinatura & {sign_data['time'].mean()*1000:.2f} & {sign_data['time'].std()*1000:.2f} & {len(sign_data)} \\\\\n"
-    
-    if not verify_data.empty:
-        latex_code += f"Verificação & {verify_data['time'].mean()*1000:.2f} & {verify_data['time'].std()*1000:.2f} & {len(verify_data)} \\\\\n"
+    for label, hist in (('Assinatura', sign_hist), ('Verificação', verify_hist)):
+        if hist.total_count:
+            latex_code += (f"{label} & {hist.mean()*1000:.2f} & {hist.std()*1000:.2f} & "
+                           f"{hist.percentile(50)*1000:.2f} & {hist.percentile(99)*1000:.2f} & "
+                           f"{hist.total_count} \\\\\n")
     
     latex_code += """\\hline
 \\end{tabular}
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script para executar os benchmarks das camadas criptográficas do chat
+Resultados são exibidos e salvos em data/benchmark_<nome>.csv
+"""
+
+import argparse
+import sys
+import os
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, 'src'))
+
+from benchmarks import BENCHMARKS, save_benchmark_results
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}" if abs(value) >= 0.01 or value == 0 else f"{value:.2e}"
+    return str(value)
+
+
+def print_rows(rows):
+    """Imprime as linhas do benchmark como tabela alinhada"""
+    if not rows:
+        return
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    table = [[format_value(row.get(column, '')) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in table)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in table:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks das camadas criptográficas do chat')
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"benchmarks a executar (padrão: todos): {', '.join(sorted(BENCHMARKS))}")
+    args = parser.parse_args()
+    
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmark desconhecido: {', '.join(unknown)}")
+
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        print(f"\n📊 Benchmark: {name}")
+        print("=" * 60)
+        rows = BENCHMARKS[name]()
+        print_rows(rows)
+        path = save_benchmark_results(name, rows)
+        print(f"💾 Resultados salvos em {os.path.relpath(path, script_dir)}")
@@ -17,7 +17,13 @@ os.makedirs('certificates', exist_ok=True)
 os.makedirs('data', exist_ok=True)
 os.makedirs('results', exist_ok=True)
 
-from chat_app import app, socketio
+from crypto_logging import configure_logging
+
+# CHAT_LOG_LEVEL=TRACE|DEBUG|INFO|WARNING; CHAT_LOG_QUEUED=1 escreve os logs em uma thread separada
+configure_logging(os.environ.get('CHAT_LOG_LEVEL', 'INFO'),
+                  queued=os.environ.get('CHAT_LOG_QUEUED') == '1')
+
+from chat_app import app, socketio, start_key_pool
 
 if __name__ == '__main__':
     print("🔐 Chat Seguro com Assinatura Digital e WebSocket")
@@ -38,6 +44,7 @@ if __name__ == '__main__':
     print("🌐 Acesse: http://localhost:8081")
     print("=" * 60)
     
+    start_key_pool()
     try:
         socketio.run(app, host='0.0.0.0', port=8081, debug=False, allow_unsafe_werkzeug=True)
     except KeyboardInterrupt:
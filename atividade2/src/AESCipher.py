@@ -1,120 +1,435 @@
-from datetime import datetime
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
 import time
 import base64
+import logging
 import os
 
+from crypto_logging import get_logger, log_event, TRACE
+from MetricsRing import MetricsRing
+from ParallelCipher import ParallelAESCipher, GCM_NONCE_SIZE, GCM_TAG_SIZE
+
+_log = get_logger('aes')
+
+# Modos suportados: CBC (sigilo; integridade via SHA-256 no MessageSigner) e AEADs
+# de passagem única (sigilo + integridade na mesma operação)
+MODES = {
+    'cbc': 'AES-256-CBC',
+    'gcm': 'AES-256-GCM',
+    'chacha20': 'ChaCha20-Poly1305',
+}
+AEAD_MODES = ('gcm', 'chacha20')
+AEAD_NONCE_SIZE = 12
+AEAD_TAG_SIZE = 16
+CBC_IV_SIZE = 16
+BLOCK_SIZE = 16
+
+# Frame binário: versão (1 byte, identifica o modo) | IV/nonce | ciphertext (| tag)
+FRAME_VERSIONS = {'cbc': 0x01, 'gcm': 0x02, 'chacha20': 0x03}
+FRAME_MODES = {version: mode for mode, version in FRAME_VERSIONS.items()}
+FRAME_HEADER_SIZE = 1
+
+
+def iv_size(mode):
+    return AEAD_NONCE_SIZE if mode in AEAD_MODES else CBC_IV_SIZE
+
+
+def frame_size(mode, length):
+    """Tamanho do frame de uma mensagem de length bytes"""
+    if mode in AEAD_MODES:
+        return FRAME_HEADER_SIZE + AEAD_NONCE_SIZE + length + AEAD_TAG_SIZE
+    # Padding PKCS7: sempre de 1 a 16 bytes
+    return FRAME_HEADER_SIZE + CBC_IV_SIZE + (length // BLOCK_SIZE + 1) * BLOCK_SIZE
+
+
+def frame_mode(frame):
+    """Modo indicado pelo byte de versão, ou None se frame estiver no formato legado (IV | ciphertext)"""
+    if not len(frame):
+        return None
+    mode = FRAME_MODES.get(frame[0])
+    # CBC legado (IV + blocos) tem tamanho múltiplo de 16; o frame CBC tem um byte a mais
+    if mode == 'cbc' and len(frame) % BLOCK_SIZE != FRAME_HEADER_SIZE:
+        return None
+    return mode
+
+
+class CipherBatch:
+    """Resultado de encrypt_many: frames contíguos em uma única arena
+
+    O item i ocupa arena[offsets[i]:offsets[i + 1]] e é acessado como memoryview (sem cópia).
+    """
+
+    def __init__(self, mode, arena, offsets):
+        self.mode = mode
+        self.arena = arena
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return memoryview(self.arena)[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        view = memoryview(self.arena)
+        for start, end in zip(self.offsets, self.offsets[1:]):
+            yield view[start:end]
+
+    def to_base64(self):
+        """Itens no formato texto de encrypt()/encrypt_aead(), aceitos por decrypt()"""
+        return [base64.b64encode(item).decode('utf-8') for item in self]
+
+
+def _batch_aad(aad, count):
+    """AAD por mensagem: None, um único valor para todas ou uma sequência com count valores"""
+    if aad is None or isinstance(aad, (bytes, bytearray, memoryview)):
+        return [aad] * count
+    aad = list(aad)
+    if len(aad) != count:
+        raise ValueError("aad deve ter um valor por mensagem")
+    return aad
+
+
+def _as_frame(encrypted_data):
+    """Aceita o frame binário ou a sua forma texto (base64)"""
+    if isinstance(encrypted_data, str):
+        return base64.b64decode(encrypted_data)
+    return memoryview(encrypted_data)
+
+
 class AESCipher:
-    """Gerenciador de cifragem AES-256 para sigilo das mensagens"""
-    
-    def __init__(self):
-        self.performance_data = []
-        # Chave simétrica compartilhada (em produção, usar key exchange seguro)
-        self.key = os.urandom(32)  # AES-256 (256 bits = 32 bytes)
-        print(f"[AES] Chave simétrica gerada: {self.key[:8].hex()}...{self.key[-8:].hex()} (256 bits)")
-    
-    def encrypt(self, plaintext):
-        """Cifra mensagem com AES-256-CBC"""
-        print(f"\n[SIGILO - AES-256] Iniciando cifragem")
-        print(f"[AES] Mensagem original: '{plaintext}' ({len(plaintext)} chars)")
-        
+    """Gerenciador de cifragem AES-256 para sigilo das mensagens
+
+    O núcleo é binário (encrypt_bytes/decrypt_bytes, frames versão | IV | ciphertext);
+    encrypt/decrypt e encrypt_aead/decrypt_aead são invólucros texto (UTF-8 + base64).
+    """
+
+    def __init__(self, mode='cbc', metrics=None, key=None):
+        if mode not in MODES:
+            raise ValueError(f"Modo não suportado: {mode} (use {', '.join(MODES)})")
+        if key is not None and len(key) != 32:
+            raise ValueError("A chave deve ter 32 bytes (AES-256)")
+        self.mode = mode
+        # Buffer circular de métricas (pode ser compartilhado com o MessageSigner)
+        self.metrics = metrics if metrics is not None else MetricsRing()
+        # Chave simétrica: gerada aqui (compartilhada) ou fornecida pelo SessionKeyManager
+        generated = key is None
+        self.key = os.urandom(32) if generated else bytes(key)  # AES-256 (256 bits = 32 bytes)
+        self._parallel = None  # Motor paralelo para buffers grandes (criado sob demanda)
+        self._aes = algorithms.AES(self.key)
+        # Objetos AEAD preparados uma vez (key schedule reaproveitado entre mensagens)
+        self._aead = {'gcm': AESGCM(self.key), 'chacha20': ChaCha20Poly1305(self.key)}
+        # A chave nunca é registrada em log, apenas o seu tamanho
+        if generated and _log.isEnabledFor(logging.INFO):
+            log_event(_log, logging.INFO, 'key_generated', bits=len(self.key) * 8, mode=MODES[mode])
+
+    @property
+    def is_aead(self):
+        return self.mode in AEAD_MODES
+
+    @property
+    def performance_data(self):
+        """Métricas no formato antigo (lista de dicionários), geradas sob demanda"""
+        return self.metrics.to_dicts()
+
+    def _seal_into(self, mode, iv, payload, aad, out):
+        """Escreve o frame de payload em out (CBC exige 15 bytes de folga após o frame)"""
+        out[0] = FRAME_VERSIONS[mode]
+        pos = FRAME_HEADER_SIZE + len(iv)
+        out[FRAME_HEADER_SIZE:pos] = iv
+
+        if mode in AEAD_MODES:
+            cipher = self._aead[mode]
+            end = pos + len(payload) + AEAD_TAG_SIZE
+            if hasattr(cipher, 'encrypt_into'):
+                cipher.encrypt_into(iv, payload, aad, out[pos:end])
+            else:
+                out[pos:end] = cipher.encrypt(iv, payload, aad)
+            return
+
+        encryptor = Cipher(self._aes, modes.CBC(iv)).encryptor()
+        # Blocos completos direto da mensagem; só o último bloco (com padding PKCS7) é montado
+        full = len(payload) - len(payload) % BLOCK_SIZE
+        if full:
+            pos += encryptor.update_into(memoryview(payload)[:full], out[pos:pos + full + BLOCK_SIZE - 1])
+        padding_length = BLOCK_SIZE - len(payload) % BLOCK_SIZE
+        last = bytes(payload[full:]) + bytes([padding_length] * padding_length)
+        encryptor.update_into(last, out[pos:pos + 2 * BLOCK_SIZE - 1])
+        encryptor.finalize()
+
+    def _layouts(self, data, mode):
+        """Interpretações de data a tentar: frame versionado e/ou formato legado (IV | ciphertext)"""
+        layouts = []
+        framed = frame_mode(data)
+        if framed:
+            end = FRAME_HEADER_SIZE + iv_size(framed)
+            layouts.append((framed, data[FRAME_HEADER_SIZE:end], data[end:]))
+        legacy = mode or self.mode
+        if legacy in AEAD_MODES or len(data) % BLOCK_SIZE == 0:
+            layouts.append((legacy, data[:iv_size(legacy)], data[iv_size(legacy):]))
+        return layouts
+
+    def _open_into(self, data, aad, mode, out):
+        """Verifica e decifra data em out (len(data) + 15 bytes); retorna (tamanho, modo, IV, tag)"""
+        error = ValueError("Mensagem cifrada em formato desconhecido")
+        for layout_mode, iv, body in self._layouts(data, mode):
+            iv = bytes(iv)
+            try:
+                if layout_mode in AEAD_MODES:
+                    length = len(body) - AEAD_TAG_SIZE
+                    if length < 0:
+                        raise ValueError("Mensagem AEAD menor que a tag")
+                    cipher = self._aead[layout_mode]
+                    if hasattr(cipher, 'decrypt_into'):
+                        cipher.decrypt_into(iv, body, aad, out[:length])
+                    else:
+                        out[:length] = cipher.decrypt(iv, bytes(body), aad)
+                    return length, layout_mode, iv, bytes(body[-AEAD_TAG_SIZE:])
+
+                if not len(body) or len(body) % BLOCK_SIZE:
+                    raise ValueError("Ciphertext CBC deve ser múltiplo de 16 bytes")
+                decryptor = Cipher(self._aes, modes.CBC(iv)).decryptor()
+                decryptor.update_into(body, out[:len(body) + BLOCK_SIZE - 1])
+                decryptor.finalize()
+                # Remover padding PKCS7
+                padding_length = out[len(body) - 1]
+                if not 1 <= padding_length <= BLOCK_SIZE:
+                    raise ValueError("Padding PKCS7 inválido")
+                return len(body) - padding_length, layout_mode, iv, None
+            except Exception as e:
+                error = e
+        raise error
+
+    def _encrypt(self, payload, aad, mode):
+        """Cifra payload (bytes) em um frame novo; retorna (frame, IV/nonce)"""
         start_time = time.time()
-        
+
         # Gerar IV (Vetor de Inicialização) aleatório é um valor aleatório usado em criptografia para
         # garantir que o mesmo texto simples criptografado várias vezes produzirá
         # textos cifrados diferentes, impedindo a análise de padrões.
-        iv = os.urandom(16)  # 16 bytes para AES
-        print(f"[AES] IV gerado: {iv.hex()} (128 bits)")
-        
-        # Criar cifrador
-        cipher = Cipher(
-            algorithms.AES(self.key),
-            modes.CBC(iv),
-            backend=default_backend()
-        )
-        encryptor = cipher.encryptor()
-        print(f"[AES] Cifrador criado: AES-256-CBC")
-        
-        # Padding PKCS7
-        plaintext_bytes = plaintext.encode('utf-8')
-        padding_length = 16 - (len(plaintext_bytes) % 16)
-        padded_plaintext = plaintext_bytes + bytes([padding_length] * padding_length)
-        print(f"[AES] Padding PKCS7 aplicado: {len(plaintext_bytes)} → {len(padded_plaintext)} bytes")
-        
-        # Cifrar
-        ciphertext = encryptor.update(padded_plaintext) + encryptor.finalize()
-        print(f"[AES] Mensagem cifrada: {ciphertext[:16].hex()}...{ciphertext[-16:].hex()}")
-        
-        end_time = time.time()
-        time_taken = end_time - start_time
-        print(f"[AES] ✅ Cifragem concluída em {time_taken:.6f}s")
-        
+        iv = os.urandom(iv_size(mode))
+
+        size = frame_size(mode, len(payload))
+        # Folga de um bloco: versões antigas do cryptography exigem len(buf) >= len(data) + 15
+        frame = bytearray(size + BLOCK_SIZE - 1)
+        with memoryview(frame) as view:
+            self._seal_into(mode, iv, payload, aad, view)
+        del frame[size:]
+
+        time_taken = time.time() - start_time
+
         # Coletar métricas
-        self.performance_data.append({
-            'operation': 'aes_encrypt',
-            'time': time_taken,
-            'message_size': len(plaintext_bytes),
-            'timestamp': datetime.now().isoformat()
-        })
+        self.metrics.record('aes_encrypt', time_taken, len(payload))
+
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'encrypt', mode=MODES[mode], plaintext_bytes=len(payload),
+                      frame_bytes=size, seconds=f"{time_taken:.6f}")
+        if _log.isEnabledFor(TRACE):
+            body = frame[FRAME_HEADER_SIZE + len(iv):]
+            log_event(_log, TRACE, 'encrypt_detail', iv=iv.hex(),
+                      ciphertext=f"{body[:16].hex()}...{body[-16:].hex()}")
+        return frame, iv
+
+    def _decrypt(self, encrypted_data, aad, mode):
+        """Decifra frame binário, base64 ou formato legado; retorna (texto em bytes, IV, tag) ou Nones"""
+        start_time = time.time()
+
+        try:
+            data = _as_frame(encrypted_data)
+            plaintext = bytearray(len(data) + BLOCK_SIZE - 1)
+            with memoryview(plaintext) as view:
+                length, mode, iv, tag = self._open_into(data, aad, mode, view)
+            del plaintext[length:]
+
+            time_taken = time.time() - start_time
+
+            # Coletar métricas
+            self.metrics.record('aes_decrypt', time_taken, length)
+
+            if _log.isEnabledFor(logging.DEBUG):
+                log_event(_log, logging.DEBUG, 'decrypt', mode=MODES[mode], ciphertext_bytes=len(data),
+                          seconds=f"{time_taken:.6f}")
+            if _log.isEnabledFor(TRACE):
+                log_event(_log, TRACE, 'decrypt_detail', iv=iv.hex(), framed=frame_mode(data) is not None)
+            return plaintext, iv, tag
+        except Exception as e:
+            log_event(_log, logging.WARNING, 'decrypt_failed', mode=MODES.get(mode or self.mode, mode),
+                      error=repr(e))
+            return None, None, None
+
+    def encrypt_bytes(self, data, aad=None, mode=None):
+        """Cifra bytes/memoryview sem passar por str nem base64; retorna o frame (bytearray)
+
+        aad só se aplica aos modos AEAD.
+        """
+        return self._encrypt(data, aad, mode or self.mode)[0]
+
+    def decrypt_bytes(self, frame, aad=None, mode=None):
+        """Decifra um frame (ou o formato legado de mode); retorna bytearray ou None se inválido"""
+        return self._decrypt(frame, aad, mode)[0]
+
+    def encrypt(self, plaintext):
+        """Cifra mensagem com o modo configurado (AES-256-CBC por padrão); retorna o frame em base64"""
+        frame = self._encrypt(plaintext.encode('utf-8'), None, self.mode)[0]
+        return base64.b64encode(frame).decode('utf-8')
+
+    def decrypt(self, encrypted_data, mode=None):
+        """Decifra a saída de encrypt (base64 ou frame binário)
+
+        O modo vem do byte de versão; mode (padrão: o modo configurado) só é usado para
+        mensagens no formato legado, sem versão.
+        """
+        plaintext = self._decrypt(encrypted_data, None, mode)[0]
+        return None if plaintext is None else plaintext.decode('utf-8')
+
+    def encrypt_aead(self, plaintext, aad=None, mode=None, binary=False):
+        """Cifra e autentica em uma única passagem (AES-256-GCM ou ChaCha20-Poly1305)
+
+        Retorna (frame, nonce, tag), com o frame em base64 ou, se binary=True, em bytes.
+        O MessageSigner assina aead_transcript(modo, frame), que cobre o frame inteiro
+        (ciphertext incluído): GCM e Poly1305 não comprometem a chave, nonce e tag não bastam.
+        Levanta ValueError para modos que não são AEAD.
+        """
+        mode = mode or self.mode
+        if mode not in AEAD_MODES:
+            raise ValueError(f"encrypt_aead exige modo AEAD ({', '.join(AEAD_MODES)})")
+        frame, nonce = self._encrypt(plaintext.encode('utf-8'), aad, mode)
+        tag = bytes(frame[-AEAD_TAG_SIZE:])
+        if not binary:
+            frame = base64.b64encode(frame).decode('utf-8')
+        return frame, nonce, tag
+
+    def decrypt_aead(self, encrypted_data, aad=None, mode=None):
+        """Verifica e decifra a saída de encrypt_aead; retorna (texto, nonce, tag) ou (None, None, None)"""
+        plaintext, nonce, tag = self._decrypt(encrypted_data, aad, mode)
+        if plaintext is None:
+            return None, None, None
+        try:
+            return plaintext.decode('utf-8'), nonce, tag
+        except UnicodeDecodeError as e:
+            log_event(_log, logging.WARNING, 'decrypt_failed', error=repr(e))
+            return None, None, None
+
+    def encrypt_many(self, plaintexts, aad=None, mode=None):
+        """Cifra um lote de mensagens (str ou bytes) de uma só vez
+
+        Todos os IVs/nonces saem de uma única chamada a os.urandom e os frames são
+        escritos em uma arena contígua (CipherBatch), no mesmo formato de encrypt_bytes().
+        aad só se aplica aos modos AEAD.
+        """
+        mode = mode or self.mode
+        start_time = time.time()
+
+        payloads = [p.encode('utf-8') if isinstance(p, str) else p for p in plaintexts]
+        count = len(payloads)
+        size = iv_size(mode)
+
+        offsets = [0] * (count + 1)
+        for i, payload in enumerate(payloads):
+            offsets[i + 1] = offsets[i] + frame_size(mode, len(payload))
+        total = offsets[-1]
+
+        ivs = os.urandom(size * count)
+        aads = _batch_aad(aad, count)
+        # Folga de um bloco: versões antigas do cryptography exigem len(buf) >= len(data) + 15
+        arena = bytearray(total + BLOCK_SIZE - 1)
+        with memoryview(arena) as view:
+            for i, payload in enumerate(payloads):
+                self._seal_into(mode, ivs[i * size:(i + 1) * size], payload, aads[i], view[offsets[i]:])
+        del arena[total:]
+
+        time_taken = time.time() - start_time
+        self.metrics.record('aes_encrypt_batch', time_taken, sum(len(p) for p in payloads),
+                            batch_size=count)
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'encrypt_batch', mode=MODES[mode], messages=count,
+                      arena_bytes=total, seconds=f"{time_taken:.6f}")
+        return CipherBatch(mode, arena, offsets)
+
+    def decrypt_many(self, items, aad=None, mode=None):
+        """Decifra um lote (CipherBatch, frames ou base64); retorna textos, None nos inválidos
+
+        Os textos decifrados são escritos em uma única arena antes da decodificação UTF-8.
+        """
+        if isinstance(items, CipherBatch):
+            mode = mode or items.mode
+        items = [_as_frame(item) for item in items]
+        start_time = time.time()
+        count = len(items)
+
+        # O texto nunca é maior que o item cifrado, que já inclui ao menos 16 bytes de IV/nonce
+        offsets = [0] * (count + 1)
+        for i, item in enumerate(items):
+            offsets[i + 1] = offsets[i] + len(item)
+        arena = bytearray(offsets[-1] + BLOCK_SIZE - 1)
+        aads = _batch_aad(aad, count)
+
+        results = []
+        failures = 0
+        plaintext_bytes = 0
+        with memoryview(arena) as view:
+            for i, item in enumerate(items):
+                pos = offsets[i]
+                try:
+                    length = self._open_into(item, aads[i], mode, view[pos:])[0]
+                    plaintext_bytes += length
+                    results.append(str(view[pos:pos + length], 'utf-8'))
+                except Exception as e:
+                    failures += 1
+                    if _log.isEnabledFor(logging.DEBUG):
+                        log_event(_log, logging.DEBUG, 'decrypt_batch_item_failed', index=i, error=repr(e))
+                    results.append(None)
+
+        time_taken = time.time() - start_time
+        self.metrics.record('aes_decrypt_batch', time_taken, plaintext_bytes, batch_size=count)
+        if failures:
+            log_event(_log, logging.WARNING, 'decrypt_batch_failed', mode=MODES.get(mode or self.mode, mode),
+                      messages=count, failures=failures)
+        elif _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'decrypt_batch', mode=MODES[mode or self.mode], messages=count,
+                      seconds=f"{time_taken:.6f}")
+        return results
+
+    def stream_encryptor(self, chunk_size=None, aad=None):
+        """Cifrador em fluxo (AESStream) com a mesma chave; CBC usa AES-256-GCM por chunk"""
+        from AESStream import StreamEncryptor, DEFAULT_CHUNK_SIZE
+        mode = self.mode if self.is_aead else 'gcm'
+        return StreamEncryptor(self.key, mode, chunk_size or DEFAULT_CHUNK_SIZE, aad)
+
+    def stream_decryptor(self, aad=None):
+        """Decifrador em fluxo (AESStream); o modo e o tamanho do chunk vêm do cabeçalho"""
+        from AESStream import StreamDecryptor
+        return StreamDecryptor(self.key, aad)
+
+    def parallel_engine(self, workers=None):
+        """Motor AES paralelo com a mesma chave (criado sob demanda)"""
+        if self._parallel is None or (workers and self._parallel.workers != workers):
+            if self._parallel is not None:
+                self._parallel.close()
+            self._parallel = ParallelAESCipher(self.key, workers=workers)
+        return self._parallel
+    
+    def encrypt_large(self, data, workers=None):
+        """Cifra bytes grandes com AES-256-GCM multi-core: nonce (12) | ciphertext | tag (16)"""
+        start_time = time.time()
+        nonce = os.urandom(GCM_NONCE_SIZE)
+        ciphertext, tag = self.parallel_engine(workers).encrypt_gcm(data, nonce)
+        result = nonce + ciphertext + tag
         
-        # Retornar IV + ciphertext em base64
-        result = base64.b64encode(iv + ciphertext).decode('utf-8')
-        print(f"[AES] Resultado final (base64): {result[:32]}...{result[-32:]}")
+        self.metrics.record('aes_encrypt_large', time.time() - start_time, len(data))
         return result
     
-    def decrypt(self, encrypted_data):
-        """Decifra mensagem AES-256-CBC"""
-        print(f"\n[SIGILO - AES-256] Iniciando decifragem")
-        print(f"[AES] Dados cifrados (base64): {encrypted_data[:32]}...{encrypted_data[-32:]}")
-        
+    def decrypt_large(self, blob, workers=None):
+        """Decifra o formato de encrypt_large (levanta InvalidTag se adulterado, ValueError se curto demais)"""
         start_time = time.time()
+        blob = memoryview(blob)
+        if len(blob) < GCM_NONCE_SIZE + GCM_TAG_SIZE:
+            raise ValueError(f"Blob menor que nonce + tag ({GCM_NONCE_SIZE + GCM_TAG_SIZE} bytes)")
+        nonce = bytes(blob[:GCM_NONCE_SIZE])
+        tag = bytes(blob[-GCM_TAG_SIZE:])
+        plaintext = self.parallel_engine(workers).decrypt_gcm(blob[GCM_NONCE_SIZE:-GCM_TAG_SIZE], nonce, tag)
         
-        try:
-            # Decodificar base64
-            data = base64.b64decode(encrypted_data.encode('utf-8'))
-            print(f"[AES] Dados decodificados: {len(data)} bytes")
-            
-            # Extrair IV e ciphertext
-            iv = data[:16]
-            ciphertext = data[16:]
-            print(f"[AES] IV extraído: {iv.hex()}")
-            print(f"[AES] Ciphertext: {ciphertext[:16].hex()}...{ciphertext[-16:].hex()}")
-            
-            # Criar decifrador
-            cipher = Cipher(
-                algorithms.AES(self.key),
-                modes.CBC(iv),
-                backend=default_backend()
-            )
-            decryptor = cipher.decryptor()
-            print(f"[AES] Decifrador criado com chave: {self.key[:8].hex()}...{self.key[-8:].hex()}")
-            
-            # Decifrar
-            padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-            print(f"[AES] Dados decifrados (com padding): {len(padded_plaintext)} bytes")
-            
-            # Remover padding PKCS7
-            padding_length = padded_plaintext[-1]
-            plaintext = padded_plaintext[:-padding_length]
-            print(f"[AES] Padding removido: {padding_length} bytes")
-            
-            end_time = time.time()
-            time_taken = end_time - start_time
-            
-            result = plaintext.decode('utf-8')
-            print(f"[AES] ✅ Decifragem concluída em {time_taken:.6f}s")
-            print(f"[AES] Mensagem recuperada: '{result}' ({len(result)} chars)")
-            
-            # Coletar métricas
-            self.performance_data.append({
-                'operation': 'aes_decrypt',
-                'time': time_taken,
-                'message_size': len(plaintext),
-                'timestamp': datetime.now().isoformat()
-            })
-            
-            return result
-        except Exception as e:
-            print(f"[AES] ❌ Erro na decifragem: {e}")
-            return None
\ No newline at end of file
+        self.metrics.record('aes_decrypt_large', time.time() - start_time, len(plaintext))
+        return plaintext
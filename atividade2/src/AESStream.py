@@ -0,0 +1,237 @@
+"""
+Cifragem em fluxo (streaming) para anexos grandes com autenticação por chunk
+Construção STREAM (Hoang et al.): cada chunk é selado com AEAD usando o nonce
+prefixo (7 bytes) | contador (4 bytes) | flag de último chunk (1 byte), e o
+cabeçalho entra como AAD em todos os chunks. O receptor verifica e libera cada
+chunk assim que ele chega; reordenação, remoção e truncamento são detectados.
+Memória constante: no máximo um chunk pendente de cada lado.
+
+Formato: cabeçalho (versão | tamanho do chunk (4 bytes) | prefixo do nonce)
+seguido dos chunks selados (ciphertext | tag), todos com chunk_size bytes de
+texto exceto o último (que pode ser vazio).
+"""
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+import os
+
+from AESCipher import AEAD_MODES, AEAD_TAG_SIZE, FRAME_VERSIONS
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+NONCE_PREFIX_SIZE = 7
+MAX_CHUNK_SIZE = 16 * 1024 * 1024  # limita o buffer do receptor (o tamanho vem do cabeçalho)
+MAX_CHUNKS = 1 << 32  # contador de 4 bytes
+
+# Versões dos frames AEAD com o bit de fluxo ligado (0x12 = GCM, 0x13 = ChaCha20-Poly1305)
+STREAM_FLAG = 0x10
+STREAM_VERSIONS = {mode: FRAME_VERSIONS[mode] | STREAM_FLAG for mode in AEAD_MODES}
+STREAM_MODES = {version: mode for mode, version in STREAM_VERSIONS.items()}
+HEADER_SIZE = 1 + 4 + NONCE_PREFIX_SIZE
+
+_AEADS = {'gcm': AESGCM, 'chacha20': ChaCha20Poly1305}
+
+
+def _chunk_nonce(prefix, counter, last):
+    if counter >= MAX_CHUNKS:
+        raise ValueError("Fluxo excede o número máximo de chunks")
+    return prefix + counter.to_bytes(4, 'big') + (b'\x01' if last else b'\x00')
+
+
+def _associated_data(header, aad):
+    return header + aad if aad else header
+
+
+class StreamEncryptor:
+    """Cifra um fluxo incrementalmente: header, depois update() e finalize()"""
+
+    def __init__(self, key, mode='gcm', chunk_size=DEFAULT_CHUNK_SIZE, aad=None):
+        if mode not in STREAM_VERSIONS:
+            raise ValueError(f"Fluxo exige modo AEAD ({', '.join(AEAD_MODES)})")
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk_size deve estar entre 1 e {MAX_CHUNK_SIZE} bytes")
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self._aead = _AEADS[mode](key)
+        self._prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.header = bytes([STREAM_VERSIONS[mode]]) + chunk_size.to_bytes(4, 'big') + self._prefix
+        self._aad = _associated_data(self.header, aad)
+        self._counter = 0
+        self._pending = bytearray()
+        self._finalized = False
+
+    def _seal(self, chunk, last):
+        sealed = self._aead.encrypt(_chunk_nonce(self._prefix, self._counter, last), chunk, self._aad)
+        self._counter += 1
+        return sealed
+
+    def update(self, data):
+        """Cifra os chunks completos disponíveis; o último fica pendente até finalize()"""
+        if self._finalized:
+            raise ValueError("Fluxo já finalizado")
+        data = memoryview(data)
+        out = []
+        pos = 0
+        if self._pending:
+            # Completa o chunk pendente primeiro
+            take = min(self.chunk_size - len(self._pending), len(data))
+            self._pending += data[:take]
+            pos = take
+            if len(self._pending) < self.chunk_size or pos == len(data):
+                return b''
+            out.append(self._seal(bytes(self._pending), last=False))
+            self._pending.clear()
+        # Sempre sobra ao menos um byte: só finalize() sabe qual chunk é o último
+        while len(data) - pos > self.chunk_size:
+            out.append(self._seal(data[pos:pos + self.chunk_size], last=False))
+            pos += self.chunk_size
+        self._pending += data[pos:]
+        return b''.join(out)
+
+    def finalize(self):
+        """Sela o último chunk (possivelmente vazio) com a flag de fim"""
+        if self._finalized:
+            raise ValueError("Fluxo já finalizado")
+        self._finalized = True
+        sealed = self._seal(bytes(self._pending), last=True)
+        self._pending.clear()
+        return sealed
+
+
+class StreamDecryptor:
+    """Verifica e decifra um fluxo incrementalmente; só texto autenticado é devolvido"""
+
+    def __init__(self, key, aad=None):
+        self._key = key
+        self._extra_aad = aad
+        self._aead = None
+        self._header = bytearray()
+        self._pending = bytearray()
+        self._counter = 0
+        self._finalized = False
+        self.mode = None
+        self.chunk_size = None
+
+    def _read_header(self, data, pos):
+        take = min(HEADER_SIZE - len(self._header), len(data) - pos)
+        self._header += data[pos:pos + take]
+        if len(self._header) == HEADER_SIZE:
+            self.mode = STREAM_MODES.get(self._header[0])
+            if self.mode is None:
+                raise ValueError(f"Versão de fluxo desconhecida: {self._header[0]:#04x}")
+            self.chunk_size = int.from_bytes(self._header[1:5], 'big')
+            if not 0 < self.chunk_size <= MAX_CHUNK_SIZE:
+                raise ValueError(f"Tamanho de chunk inválido no cabeçalho: {self.chunk_size}")
+            self._prefix = bytes(self._header[5:])
+            self._aead = _AEADS[self.mode](self._key)
+            self._aad = _associated_data(bytes(self._header), self._extra_aad)
+        return pos + take
+
+    def _open(self, sealed, last):
+        plaintext = self._aead.decrypt(_chunk_nonce(self._prefix, self._counter, last), sealed, self._aad)
+        self._counter += 1
+        return plaintext
+
+    def update(self, data):
+        """Decifra os chunks completos (já verificados); levanta InvalidTag se adulterados"""
+        if self._finalized:
+            raise ValueError("Fluxo já finalizado")
+        data = memoryview(data)
+        pos = 0
+        if self._aead is None:
+            pos = self._read_header(data, pos)
+            if self._aead is None:
+                return b''
+        sealed_size = self.chunk_size + AEAD_TAG_SIZE
+        out = []
+        if self._pending:
+            take = min(sealed_size - len(self._pending), len(data) - pos)
+            self._pending += data[pos:pos + take]
+            pos += take
+            if len(self._pending) < sealed_size or pos == len(data):
+                return b''
+            out.append(self._open(bytes(self._pending), last=False))
+            self._pending.clear()
+        while len(data) - pos > sealed_size:
+            out.append(self._open(data[pos:pos + sealed_size], last=False))
+            pos += sealed_size
+        self._pending += data[pos:]
+        return b''.join(out)
+
+    def finalize(self):
+        """Verifica o último chunk; falha se o fluxo foi truncado"""
+        if self._finalized:
+            raise ValueError("Fluxo já finalizado")
+        self._finalized = True
+        if self._aead is None or len(self._pending) < AEAD_TAG_SIZE:
+            raise ValueError("Fluxo truncado")
+        plaintext = self._open(bytes(self._pending), last=True)
+        self._pending.clear()
+        return plaintext
+
+
+def read_chunks(source, size=DEFAULT_CHUNK_SIZE):
+    """Itera sobre um objeto tipo arquivo em blocos de size bytes"""
+    while True:
+        chunk = source.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def encrypt_chunks(key, chunks, mode='gcm', chunk_size=DEFAULT_CHUNK_SIZE, aad=None):
+    """Gera o fluxo cifrado (cabeçalho e chunks selados) a partir de um iterável de bytes"""
+    encryptor = StreamEncryptor(key, mode, chunk_size, aad)
+    yield encryptor.header
+    for chunk in chunks:
+        sealed = encryptor.update(chunk)
+        if sealed:
+            yield sealed
+    yield encryptor.finalize()
+
+
+def decrypt_chunks(key, chunks, aad=None):
+    """Gera o texto decifrado, chunk a chunk, a partir de um iterável do fluxo cifrado"""
+    decryptor = StreamDecryptor(key, aad)
+    for chunk in chunks:
+        plaintext = decryptor.update(chunk)
+        if plaintext:
+            yield plaintext
+    yield decryptor.finalize()
+
+
+async def aencrypt_chunks(key, chunks, mode='gcm', chunk_size=DEFAULT_CHUNK_SIZE, aad=None):
+    """Versão assíncrona de encrypt_chunks para iteradores assíncronos (ex.: upload em partes)"""
+    encryptor = StreamEncryptor(key, mode, chunk_size, aad)
+    yield encryptor.header
+    async for chunk in chunks:
+        sealed = encryptor.update(chunk)
+        if sealed:
+            yield sealed
+    yield encryptor.finalize()
+
+
+async def adecrypt_chunks(key, chunks, aad=None):
+    """Versão assíncrona de decrypt_chunks"""
+    decryptor = StreamDecryptor(key, aad)
+    async for chunk in chunks:
+        plaintext = decryptor.update(chunk)
+        if plaintext:
+            yield plaintext
+    yield decryptor.finalize()
+
+
+def encrypt_file(key, source, sink, mode='gcm', chunk_size=DEFAULT_CHUNK_SIZE, aad=None):
+    """Cifra o objeto tipo arquivo source em sink com memória constante; retorna bytes escritos"""
+    written = 0
+    for sealed in encrypt_chunks(key, read_chunks(source, chunk_size), mode, chunk_size, aad):
+        sink.write(sealed)
+        written += len(sealed)
+    return written
+
+
+def decrypt_file(key, source, sink, aad=None, read_size=DEFAULT_CHUNK_SIZE):
+    """Verifica e decifra source em sink com memória constante; retorna bytes escritos"""
+    written = 0
+    for plaintext in decrypt_chunks(key, read_chunks(source, read_size), aad):
+        sink.write(plaintext)
+        written += len(plaintext)
+    return written
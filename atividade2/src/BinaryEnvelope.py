@@ -0,0 +1,224 @@
+"""
+Envelope binário versionado da mensagem assinada
+O envelope em dicionário carrega hex, base64, PEM e data ISO, que o Socket.IO
+ainda serializa em JSON. Aqui os campos vão crus: um cabeçalho fixo seguido de
+campos com prefixo de tamanho (big-endian):
+
+    versão (1) | flags (1) | modo (1) | sig_alg (1) | sig_version (1) |
+    timestamp em µs (8) | impressão digital (32) |
+    sender (2 + n) | signature (2 + n) | encrypted_message (4 + n) |
+    [message_hash (32)] [certificate DER (2 + n)] [message (4 + n)]
+    [merkle: raiz (32) | índice (4) | tamanho (4) | irmãos (1 + 32 * k)]
+
+Os opcionais aparecem na ordem acima conforme as flags. O primeiro byte (0xE1)
+nunca inicia um JSON. decode_envelope não copia nada: EnvelopeView guarda só as
+posições dos campos e devolve fatias de memoryview do buffer recebido (o frame
+cifrado vai direto para o AESCipher); a conversão para hex/str acontece apenas
+quando um campo é lido no formato do dicionário.
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+import base64
+import struct
+
+from AESCipher import FRAME_VERSIONS, FRAME_MODES
+from CertificateCache import pem_to_der
+
+ENVELOPE_VERSION = 0xE1
+ENVELOPE_TYPES = (bytes, bytearray, memoryview)
+
+FLAG_HASH = 0x01
+FLAG_CERTIFICATE = 0x02
+FLAG_MESSAGE = 0x04
+FLAG_MERKLE = 0x08
+
+SIG_ALG_IDS = {'rsa': 1, 'ecdsa': 2, 'ed25519': 3}
+SIG_ALG_NAMES = {value: name for name, value in SIG_ALG_IDS.items()}
+
+_HEADER = struct.Struct('!BBBBBq32s')
+_U16 = struct.Struct('!H')
+_U32 = struct.Struct('!I')
+_MERKLE = struct.Struct('!32sIIB')
+DIGEST_SIZE = 32
+
+
+def _timestamp_us(timestamp):
+    moment = datetime.fromisoformat(timestamp)
+    return int(moment.timestamp()) * 1_000_000 + moment.microsecond
+
+
+def _timestamp_iso(timestamp_us):
+    seconds, micros = divmod(timestamp_us, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
+
+
+@lru_cache(maxsize=256)
+def _certificate_der(cert_pem):
+    """DER do PEM do remetente (o mesmo PEM se repete em todas as mensagens dele)"""
+    return pem_to_der(cert_pem)
+
+
+def _raw_frame(encrypted_message):
+    if isinstance(encrypted_message, str):
+        return base64.b64decode(encrypted_message)
+    return encrypted_message
+
+
+def encode_envelope(signed_message, include_message=True):
+    """Serializa o envelope de sign_message/sign_batch (ou um EnvelopeView) em bytes
+
+    include_message=False omite o texto original (o chat já o envia no payload).
+    """
+    if isinstance(signed_message, EnvelopeView):
+        if include_message or 'message' not in signed_message:
+            return bytes(signed_message.buffer)
+        signed_message = signed_message.to_dict()
+    flags = 0
+    message_hash = signed_message.get('message_hash')
+    cert_pem = signed_message.get('certificate')
+    message = signed_message.get('message') if include_message else None
+    merkle = signed_message.get('merkle')
+    flags |= FLAG_HASH if message_hash is not None else 0
+    flags |= FLAG_CERTIFICATE if cert_pem is not None else 0
+    flags |= FLAG_MESSAGE if message is not None else 0
+    flags |= FLAG_MERKLE if merkle is not None else 0
+
+    sender = signed_message['sender'].encode('utf-8')
+    signature = bytes.fromhex(signed_message['signature'])
+    frame = _raw_frame(signed_message['encrypted_message'])
+    parts = [
+        _HEADER.pack(ENVELOPE_VERSION, flags, FRAME_VERSIONS[signed_message.get('mode', 'cbc')],
+                     SIG_ALG_IDS[signed_message.get('sig_alg', 'rsa')], signed_message.get('sig_version', 1),
+                     _timestamp_us(signed_message['timestamp']),
+                     bytes.fromhex(signed_message['cert_fingerprint'])),
+        _U16.pack(len(sender)), sender,
+        _U16.pack(len(signature)), signature,
+        _U32.pack(len(frame)), frame,
+    ]
+    if message_hash is not None:
+        parts.append(bytes.fromhex(message_hash))
+    if cert_pem is not None:
+        der = _certificate_der(cert_pem)
+        parts += [_U16.pack(len(der)), der]
+    if message is not None:
+        text = message.encode('utf-8')
+        parts += [_U32.pack(len(text)), text]
+    if merkle is not None:
+        parts.append(_MERKLE.pack(bytes.fromhex(merkle['root']), merkle['index'], merkle['size'],
+                                  len(merkle['proof'])))
+        parts += [bytes.fromhex(sibling) for sibling in merkle['proof']]
+    return b''.join(parts)
+
+
+def decode_envelope(data):
+    """EnvelopeView sobre os bytes recebidos (sem cópia); ValueError se o envelope for inválido"""
+    return EnvelopeView(data)
+
+
+class EnvelopeView(Mapping):
+    """Envelope binário lido sob demanda, com a mesma interface do dicionário de sign_message
+
+    view[campo] devolve o valor no formato do dicionário (hex, str, PEM, data ISO), exceto
+    'encrypted_message', que é a fatia do frame (memoryview); raw(campo) devolve os bytes
+    crus de signature, message_hash, cert_fingerprint, certificate (DER) e encrypted_message.
+    """
+
+    __slots__ = ('buffer', 'flags', 'mode', 'sig_alg', 'sig_version', 'timestamp_us', '_fields')
+
+    def __init__(self, data):
+        view = memoryview(data)
+        if view.ndim != 1 or view.itemsize != 1:
+            view = view.cast('B')
+        if len(view) < _HEADER.size or view[0] != ENVELOPE_VERSION:
+            raise ValueError("Envelope binário inválido ou de versão desconhecida")
+        _, flags, mode, sig_alg, self.sig_version, self.timestamp_us, _ = _HEADER.unpack_from(view)
+        if mode not in FRAME_MODES or sig_alg not in SIG_ALG_NAMES:
+            raise ValueError("Envelope com modo ou algoritmo desconhecido")
+        self.buffer = view
+        self.flags = flags
+        self.mode = FRAME_MODES[mode]
+        self.sig_alg = SIG_ALG_NAMES[sig_alg]
+        fields = {'cert_fingerprint': (_HEADER.size - DIGEST_SIZE, _HEADER.size)}
+        pos = _HEADER.size
+        try:
+            for name, prefix in (('sender', _U16), ('signature', _U16), ('encrypted_message', _U32)):
+                pos = self._field(fields, name, prefix, pos)
+            if flags & FLAG_HASH:
+                fields['message_hash'] = (pos, pos + DIGEST_SIZE)
+                pos += DIGEST_SIZE
+            if flags & FLAG_CERTIFICATE:
+                pos = self._field(fields, 'certificate', _U16, pos)
+            if flags & FLAG_MESSAGE:
+                pos = self._field(fields, 'message', _U32, pos)
+            if flags & FLAG_MERKLE:
+                count = _MERKLE.unpack_from(view, pos)[3]
+                fields['merkle'] = (pos, pos + _MERKLE.size + count * DIGEST_SIZE)
+                pos = fields['merkle'][1]
+        except struct.error as e:
+            raise ValueError("Envelope binário truncado") from e
+        if pos != len(view):
+            raise ValueError("Envelope binário com tamanho inconsistente")
+        self._fields = fields
+
+    def _field(self, fields, name, prefix, pos):
+        start = pos + prefix.size
+        end = start + prefix.unpack_from(self.buffer, pos)[0]
+        if end > len(self.buffer):
+            raise ValueError("Envelope binário truncado")
+        fields[name] = (start, end)
+        return end
+
+    def raw(self, name):
+        """Bytes crus do campo (memoryview do buffer, sem cópia)"""
+        start, end = self._fields[name]
+        return self.buffer[start:end]
+
+    def __getitem__(self, name):
+        if name == 'mode':
+            return self.mode
+        if name == 'sig_alg':
+            return self.sig_alg
+        if name == 'sig_version':
+            return self.sig_version
+        if name == 'timestamp':
+            return _timestamp_iso(self.timestamp_us)
+        if name == 'encrypted_message':
+            return self.raw(name)
+        if name in ('sender', 'message'):
+            return str(self.raw(name), 'utf-8')
+        if name in ('signature', 'message_hash', 'cert_fingerprint'):
+            return self.raw(name).hex()
+        if name == 'certificate':
+            body = base64.b64encode(self.raw(name)).decode('ascii')
+            lines = '\n'.join(body[i:i + 64] for i in range(0, len(body), 64))
+            return f"-----BEGIN CERTIFICATE-----\n{lines}\n-----END CERTIFICATE-----\n"
+        if name == 'merkle':
+            start, _ = self._fields[name]
+            root, index, size, count = _MERKLE.unpack_from(self.buffer, start)
+            start += _MERKLE.size
+            proof = [self.buffer[i:i + DIGEST_SIZE].hex()
+                     for i in range(start, start + count * DIGEST_SIZE, DIGEST_SIZE)]
+            return {'root': root.hex(), 'index': index, 'size': size, 'proof': proof}
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self._fields or name in ('mode', 'sig_alg', 'sig_version', 'timestamp')
+
+    def __iter__(self):
+        yield from ('mode', 'sig_alg', 'sig_version', 'timestamp')
+        yield from self._fields
+
+    def __len__(self):
+        return len(self._fields) + 4
+
+    def __reduce__(self):
+        # memoryview não é serializável com pickle (ex.: pool de processos do verify_batch)
+        return decode_envelope, (bytes(self.buffer),)
+
+    def to_dict(self):
+        """Envelope no formato de dicionário (encrypted_message em base64, como no JSON)"""
+        signed_message = dict(self.items())
+        signed_message['encrypted_message'] = base64.b64encode(self.raw('encrypted_message')).decode('ascii')
+        return signed_message
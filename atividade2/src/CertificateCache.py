@@ -0,0 +1,275 @@
+"""
+Caches em memória dos certificados usados na assinatura e na verificação
+- PrivateKeyCache: carregar o PKCS#12 roda o KDF da senha e o parse da chave a cada
+  mensagem; aqui a carga acontece uma vez por usuário. A entrada é invalidada quando
+  o arquivo muda (mtime/tamanho), o cache é limitado (LRU) e a primeira carga
+  concorrente do mesmo usuário é feita por uma única thread (lock por usuário).
+- VerificationCache: certificados recebidos indexados pela impressão digital
+  (SHA-256 do DER), com o certificado já parseado, a chave pública e o CN; LRU e
+  expiração no not_valid_after do próprio certificado. Certificados fora do período
+  de validade são recusados (ValueError), e a verificação da mensagem falha.
+"""
+
+from collections import OrderedDict
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+from datetime import timezone
+import base64
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from crypto_logging import get_logger, log_event
+
+_log = get_logger('keycache')
+
+P12_PASSWORD = b"password"
+
+
+class PrivateKeyCache:
+    """Chave privada, certificado, PEM e impressão digital por usuário (invalidação por mtime, LRU)
+
+    Com wipe_load_buffer=True o .p12 é lido direto em um bytearray que é sobrescrito
+    com zeros logo após o parse. Isso limpa só o buffer da carga: a chave em cache é um
+    objeto do OpenSSL, sem bytes acessíveis ao Python, e a remoção do cache apenas solta
+    a referência (não há zeragem na remoção).
+    """
+
+    def __init__(self, cert_dir, max_entries=128, password=P12_PASSWORD, wipe_load_buffer=False):
+        self.cert_dir = cert_dir
+        self.max_entries = max_entries  # 0 desativa o cache (toda assinatura carrega o .p12)
+        self.password = password
+        self.wipe_load_buffer = wipe_load_buffer
+        self._entries = OrderedDict()  # usuário -> (chave, certificado, PEM, impressão digital, carimbo)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def path(self, username):
+        return os.path.join(self.cert_dir, f"{username}.p12")
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+    def _lookup(self, username, stamp):
+        """Entrada válida do cache (ou None), contabilizando acerto/invalidação"""
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        if entry[4] != stamp:
+            del self._entries[username]
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry
+
+    def _load(self, path, stamp):
+        with open(path, "rb") as f:
+            if self.wipe_load_buffer:
+                # readinto: nenhuma cópia intermediária em bytes (imutável) fica para trás
+                raw = bytearray(os.fstat(f.fileno()).st_size)
+                del raw[f.readinto(raw):]
+            else:
+                raw = f.read()
+        try:
+            private_key, cert, _ = pkcs12.load_key_and_certificates(raw, self.password)
+        finally:
+            if self.wipe_load_buffer:
+                raw[:] = bytes(len(raw))
+        der = cert.public_bytes(serialization.Encoding.DER)
+        cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+        return private_key, cert, cert_pem, fingerprint(der), stamp
+
+    def get(self, username):
+        """(chave privada, certificado, PEM, impressão digital) do usuário, ou None se não houver .p12"""
+        path = self.path(username)
+        stamp = self._stamp(path)
+        if stamp is None:
+            self.invalidate(username)
+            return None
+
+        with self._lock:
+            entry = self._lookup(username, stamp)
+            if entry is not None:
+                return entry[:4]
+            load_lock = self._load_locks.setdefault(username, threading.Lock())
+
+        # Apenas uma thread carrega o .p12 de cada usuário; as demais esperam e reaproveitam
+        with load_lock:
+            with self._lock:
+                entry = self._lookup(username, stamp)
+                if entry is not None:
+                    return entry[:4]
+                self.misses += 1
+            entry = self._load(path, stamp)
+            if self.max_entries > 0:
+                with self._lock:
+                    self._entries[username] = entry
+                    self._entries.move_to_end(username)
+                    while len(self._entries) > self.max_entries:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._load_locks.pop(evicted, None)
+                        self.evictions += 1
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'key_loaded', user=username, cached=self.max_entries > 0)
+        return entry[:4]
+
+    def invalidate(self, username=None):
+        """Descarta a entrada do usuário (ou todas)"""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def pem_to_der(cert_pem):
+    """DER de um certificado PEM (só decodifica o base64, sem parse ASN.1)"""
+    if isinstance(cert_pem, bytes):
+        cert_pem = cert_pem.decode('ascii')
+    body = ''.join(line for line in cert_pem.splitlines() if line and not line.startswith('-----'))
+    return base64.b64decode(body)
+
+
+def fingerprint(der):
+    """Impressão digital SHA-256 (hex) do certificado em DER"""
+    return hashlib.sha256(der).hexdigest()
+
+
+def _not_valid_after(cert):
+    expiry = getattr(cert, 'not_valid_after_utc', None)
+    if expiry is None:  # cryptography < 42
+        expiry = cert.not_valid_after.replace(tzinfo=timezone.utc)
+    return expiry.timestamp()
+
+
+def _not_valid_before(cert):
+    start = getattr(cert, 'not_valid_before_utc', None)
+    if start is None:  # cryptography < 42
+        start = cert.not_valid_before.replace(tzinfo=timezone.utc)
+    return start.timestamp()
+
+
+class VerificationCache:
+    """Certificado parseado, chave pública e CN por impressão digital (LRU + expiração do certificado)"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries  # 0 desativa o cache (todo certificado é parseado)
+        self._entries = OrderedDict()  # impressão digital -> (certificado, chave pública, CN, expira_em)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, cert_fingerprint):
+        """(certificado, chave pública, CN) em cache, ou None"""
+        with self._lock:
+            entry = self._entries.get(cert_fingerprint)
+            if entry is None:
+                return None
+            if entry[3] <= time.time():
+                del self._entries[cert_fingerprint]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(cert_fingerprint)
+            self.hits += 1
+            return entry[:3]
+
+    def add_der(self, der, cert_fingerprint=None):
+        """Parseia o certificado DER e o guarda; retorna (certificado, chave pública, CN)
+        
+        Levanta ValueError se o certificado estiver fora do período de validade: assinaturas
+        feitas com ele não são aceitas (no cache, a expiração é conferida em get).
+        """
+        cert = x509.load_der_x509_certificate(der)
+        now = time.time()
+        if not _not_valid_before(cert) <= now < _not_valid_after(cert):
+            with self._lock:
+                self.expirations += 1
+            raise ValueError("Certificado fora do período de validade")
+        names = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+        entry = (cert, cert.public_key(), names[0].value if names else None, _not_valid_after(cert))
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[cert_fingerprint or fingerprint(der)] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry[:3]
+
+    def lookup_pem(self, cert_pem):
+        """(certificado, chave pública, CN) do PEM recebido, parseando apenas na primeira vez"""
+        der = pem_to_der(cert_pem)
+        cert_fingerprint = fingerprint(der)
+        entry = self.get(cert_fingerprint)
+        if entry is not None:
+            return entry
+        with self._lock:
+            self.misses += 1
+        return self.add_der(der, cert_fingerprint)
+
+    def lookup_der(self, der):
+        """(certificado, chave pública, CN) do DER recebido (ex.: envelope binário), sem decodificar PEM"""
+        cert_fingerprint = fingerprint(der)
+        entry = self.get(cert_fingerprint)
+        if entry is not None:
+            return entry
+        with self._lock:
+            self.misses += 1
+        return self.add_der(bytes(der), cert_fingerprint)
+    
+    def lookup_fingerprint(self, cert_fingerprint, resolver):
+        """(certificado, chave pública, CN) pela impressão digital; no miss busca o PEM com resolver
+
+        O PEM obtido só é aceito se a sua impressão digital for a pedida.
+        """
+        entry = self.get(cert_fingerprint)
+        if entry is not None:
+            return entry
+        with self._lock:
+            self.misses += 1
+        cert_pem = resolver(cert_fingerprint) if resolver else None
+        if cert_pem is None:
+            raise LookupError(f"Certificado desconhecido: {cert_fingerprint}")
+        der = pem_to_der(cert_pem)
+        if fingerprint(der) != cert_fingerprint:
+            raise ValueError("Certificado obtido não corresponde à impressão digital")
+        return self.add_der(der, cert_fingerprint)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
 from cryptography.hazmat.primitives.serialization import pkcs12
 from cryptography import x509
 from cryptography.x509.oid import NameOID
@@ -8,21 +8,68 @@ from cryptography.hazmat.backends import default_backend
 
 import os
 
+# Algoritmos de assinatura suportados e a descrição exibida em /performance
+SIG_ALGORITHMS = {
+    'rsa': 'RSA-2048 + PSS',
+    'ecdsa': 'ECDSA P-256 + SHA-256',
+    'ed25519': 'Ed25519',
+}
+DEFAULT_SIG_ALGORITHM = 'rsa'
+
+
+def generate_private_key(algorithm=DEFAULT_SIG_ALGORITHM):
+    """Gera a chave privada do algoritmo de assinatura"""
+    if algorithm == 'rsa':
+        return rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048
+        )
+    if algorithm == 'ecdsa':
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == 'ed25519':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"Algoritmo de assinatura não suportado: {algorithm}")
+
+
+def key_algorithm(key):
+    """Algoritmo de assinatura ('rsa', 'ecdsa' ou 'ed25519') de uma chave privada ou pública"""
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'rsa'
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return 'ecdsa'
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'ed25519'
+    raise ValueError(f"Tipo de chave não suportado: {type(key).__name__}")
+
+
 class CertificateManager:
     """Gerenciador de certificados digitais ad-hoc"""
     
-    def __init__(self, cert_dir="certificates"):
+    def __init__(self, cert_dir="certificates", algorithm=DEFAULT_SIG_ALGORITHM, key_pool=None):
         # Garantir que o diretório seja relativo ao diretório da atividade2
         script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.cert_dir = os.path.join(script_dir, cert_dir)
         os.makedirs(self.cert_dir, exist_ok=True)
+        if algorithm not in SIG_ALGORITHMS:
+            raise ValueError(f"Algoritmo de assinatura não suportado: {algorithm}")
+        # Algoritmo das chaves geradas (as já existentes mantêm o seu)
+        self.algorithm = algorithm
+        # KeyPool com chaves pré-geradas: a emissão só assina o certificado
+        self.key_pool = key_pool
     
-    def generate_certificate(self, username, common_name):
-        """Gera certificado X.509 auto-assinado"""
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
+    def __getstate__(self):
+        # Enviado aos processos do verify_batch: a reserva (threads) fica neste processo
+        state = self.__dict__.copy()
+        state['key_pool'] = None
+        return state
+    
+    def generate_certificate(self, username, common_name, algorithm=None):
+        """Gera certificado X.509 auto-assinado (RSA, ECDSA ou Ed25519)"""
+        algorithm = algorithm or self.algorithm
+        if self.key_pool is not None and self.key_pool.algorithm == algorithm:
+            private_key = self.key_pool.take()
+        else:
+            private_key = generate_private_key(algorithm)
         
         subject = issuer = x509.Name([
             x509.NameAttribute(NameOID.COUNTRY_NAME, "BR"),
@@ -49,7 +96,7 @@ class CertificateManager:
                 x509.DNSName("localhost"),
             ]),
             critical=False,
-        ).sign(private_key, hashes.SHA256())
+        ).sign(private_key, None if algorithm == 'ed25519' else hashes.SHA256())  # Ed25519 não usa hash externo
         
         # Salvar certificado e chave
         cert_path = os.path.join(self.cert_dir, f"{username}.p12")
@@ -0,0 +1,71 @@
+"""
+Diretório de certificados endereçados pela impressão digital (SHA-256 do DER)
+Com ele as mensagens carregam só a impressão digital (64 caracteres) em vez do
+PEM (~1,2 KB). Quem verifica busca o certificado no diretório apenas na primeira
+vez (fetch-on-miss) e confere que o conteúdo recebido tem a impressão digital
+pedida, então um diretório adulterado não consegue trocar o certificado.
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from CertificateCache import pem_to_der, fingerprint
+
+
+class CertificateRegistry:
+    """Impressão digital -> PEM dos certificados publicados (servidor do chat)"""
+
+    def __init__(self):
+        self._certificates = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._certificates)
+
+    def __contains__(self, cert_fingerprint):
+        return cert_fingerprint in self._certificates
+
+    def publish(self, cert_pem, cert_fingerprint=None):
+        """Publica o certificado (idempotente); retorna a impressão digital"""
+        cert_fingerprint = cert_fingerprint or fingerprint(pem_to_der(cert_pem))
+        if cert_fingerprint not in self._certificates:
+            with self._lock:
+                self._certificates.setdefault(cert_fingerprint, cert_pem)
+        return cert_fingerprint
+
+    def lookup(self, cert_fingerprint):
+        """PEM publicado com essa impressão digital, ou None"""
+        self.lookups += 1
+        cert_pem = self._certificates.get(cert_fingerprint)
+        if cert_pem is None:
+            self.misses += 1
+        return cert_pem
+
+    def stats(self):
+        return {'certificates': len(self._certificates), 'lookups': self.lookups, 'misses': self.misses}
+
+
+def http_resolver(base_url, timeout=5):
+    """Resolvedor fetch-on-miss para pares remotos: GET {base_url}/certificates/<impressão digital>"""
+    base_url = base_url.rstrip('/')
+
+    def resolve(cert_fingerprint):
+        try:
+            with urllib.request.urlopen(f"{base_url}/certificates/{cert_fingerprint}", timeout=timeout) as response:
+                return response.read().decode('ascii')
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+    return resolve
+
+
+def envelope_size(signed_message):
+    """Bytes do envelope serializado em JSON (como trafega no Socket.IO); binário: o próprio tamanho"""
+    if isinstance(signed_message, (bytes, bytearray, memoryview)):
+        return len(signed_message)
+    return len(json.dumps(signed_message, separators=(',', ':')).encode('utf-8'))
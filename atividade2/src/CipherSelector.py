@@ -0,0 +1,113 @@
+"""
+Seleção automática do modo de cifragem por calibração na inicialização
+Mede cada modo do AESCipher (pela API binária usada no chat) com o mesmo
+harness do estudo da atividade 1 (CryptoBenchmark.measure_performance) e
+escolhe o AEAD mais rápido no host: em VMs sem AES-NI o ChaCha20-Poly1305
+costuma vencer o AES-GCM com folga. O modo escolhido viaja no byte de versão
+dos frames, então os pares decifram qualquer modo suportado.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from AESCipher import AESCipher, AEAD_MODES, MODES
+from MetricsRing import MetricsRing
+from crypto_logging import get_logger, log_event
+
+_log = get_logger('selector')
+
+# Mensagem típica do chat e um anexo pequeno
+CALIBRATION_SIZES = (256, 64 * 1024)
+CALIBRATION_ITERATIONS = 10
+# Bytes processados por amostra cronometrada (operações curtas são repetidas até atingir)
+CALIBRATION_WORK_BYTES = 256 * 1024
+
+
+def _crypto_benchmark():
+    """CryptoBenchmark da atividade 1 (importado sob demanda, como o chat não depende dele)"""
+    atividade1_src = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))), 'atividade1', 'src')
+    if atividade1_src not in sys.path:
+        sys.path.append(atividade1_src)
+    from crypto_benchmark import CryptoBenchmark
+    return CryptoBenchmark
+
+
+def _repeated(func, repeat):
+    """Executa func repeat vezes por chamada, diluindo o custo fixo do harness (gc, psutil)"""
+    def run(data):
+        for _ in range(repeat):
+            result = func(data)
+        return result
+    return run
+
+
+def calibrate(modes=tuple(MODES), sizes=CALIBRATION_SIZES, iterations=CALIBRATION_ITERATIONS):
+    """Mede encrypt_bytes/decrypt_bytes de cada modo; retorna os resultados do measure_performance
+
+    Tempos e vazões já vêm normalizados por operação.
+    """
+    benchmark = _crypto_benchmark()()
+    benchmark.iterations = iterations
+    results = []
+    for mode in modes:
+        # Buffer próprio: a calibração não entra nas métricas do chat
+        aes_cipher = AESCipher(mode=mode, metrics=MetricsRing(16))
+        for size in sizes:
+            repeat = max(1, CALIBRATION_WORK_BYTES // size)
+            result = benchmark.measure_performance(
+                _repeated(aes_cipher.encrypt_bytes, repeat), _repeated(aes_cipher.decrypt_bytes, repeat),
+                os.urandom(size), MODES[mode], 256)
+            for key in ('encrypt_time_mean', 'encrypt_time_std', 'decrypt_time_mean', 'decrypt_time_std'):
+                result[key] /= repeat
+            result['throughput_encrypt'] *= repeat
+            result['throughput_decrypt'] *= repeat
+            result['mode'] = mode
+            results.append(result)
+    return results
+
+
+def select_mode(results, acceptable=AEAD_MODES):
+    """Modo aceitável com o menor tempo relativo médio (cifrar + decifrar) entre os tamanhos
+
+    Cada tamanho pesa igual: o tempo do modo é dividido pelo melhor tempo naquele tamanho.
+    """
+    totals = {}
+    for result in results:
+        if result['mode'] in acceptable:
+            totals.setdefault(result['data_size'], {})[result['mode']] = (
+                result['encrypt_time_mean'] + result['decrypt_time_mean'])
+    if not totals:
+        raise ValueError("Nenhum modo aceitável foi medido")
+    scores = {}
+    for by_mode in totals.values():
+        best = min(by_mode.values())
+        for mode, elapsed in by_mode.items():
+            scores.setdefault(mode, []).append(elapsed / best)
+    return min(scores, key=lambda mode: sum(scores[mode]) / len(scores[mode]))
+
+
+def auto_select(acceptable=AEAD_MODES, sizes=CALIBRATION_SIZES, iterations=CALIBRATION_ITERATIONS):
+    """Calibra e escolhe o modo; retorna o resumo exibido em /performance"""
+    start = time.perf_counter()
+    results = calibrate(sizes=sizes, iterations=iterations)
+    mode = select_mode(results, acceptable)
+    selection = {
+        'mode': mode,
+        'source': 'calibration',
+        'calibration_seconds': time.perf_counter() - start,
+        'measurements': [{
+            'mode': result['mode'],
+            'data_size': result['data_size'],
+            'encrypt_us': result['encrypt_time_mean'] * 1e6,
+            'decrypt_us': result['decrypt_time_mean'] * 1e6,
+            'throughput_encrypt_mb_s': result['throughput_encrypt'],
+            'throughput_decrypt_mb_s': result['throughput_decrypt'],
+        } for result in results],
+    }
+    if _log.isEnabledFor(logging.INFO):
+        log_event(_log, logging.INFO, 'cipher_selected', mode=MODES[mode],
+                  seconds=f"{selection['calibration_seconds']:.3f}")
+    return selection
@@ -0,0 +1,144 @@
+"""
+Executor das operações criptográficas fora dos handlers do Socket.IO
+Assinar e verificar envolvem duas operações RSA (que liberam o GIL no OpenSSL),
+a carga do PKCS#12 e escrita em disco; rodando no handler, uma mensagem lenta
+trava todos os clientes daquele worker. Aqui elas vão para um pool de threads
+com futures (e awaitables para código assíncrono); o handler só enfileira.
+Cada tarefa registra no buffer de métricas o tempo de espera na fila
+('executor_wait') e o tempo de execução ('executor_run'); a profundidade da
+fila fica disponível em stats(). submit_ordered mantém a ordem de entrega por
+chave (ex.: sala): as tarefas rodam em paralelo, mas os callbacks seguem a
+ordem de submissão.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from MetricsRing import MetricsRing
+from crypto_logging import get_logger, log_event
+
+_log = get_logger('executor')
+
+
+def default_workers():
+    """Um worker por CPU (mínimo 2: o handler nunca espera a criptografia terminar)"""
+    return max(2, os.cpu_count() or 1)
+
+
+class CryptoExecutor:
+    """Pool de threads para sign/verify com métricas de fila; max_workers=0 executa na própria thread"""
+
+    def __init__(self, max_workers=None, metrics=None, name='crypto'):
+        self.max_workers = default_workers() if max_workers is None else max_workers
+        self.metrics = metrics if metrics is not None else MetricsRing()
+        self._pool = (ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+                      if self.max_workers > 0 else None)
+        self._lock = threading.Lock()
+        self.pending = 0  # Tarefas na fila ou em execução
+        self.max_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._ordered = {}  # chave -> deque de (future, callback) ainda não entregues
+        self._delivering = set()  # chaves com uma thread entregando callbacks
+
+    def _run(self, submitted_at, fn, args, kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            log_event(_log, logging.WARNING, 'task_failed', task=getattr(fn, '__name__', repr(fn)), error=repr(e))
+            raise
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+            self.metrics.record('executor_wait', started - submitted_at, 0)
+            self.metrics.record('executor_run', finished - started, 0)
+
+    def submit(self, fn, *args, **kwargs):
+        """Agenda fn(*args, **kwargs); retorna um concurrent.futures.Future"""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+            if self.pending > self.max_pending:
+                self.max_pending = self.pending
+        if self._pool is not None:
+            return self._pool.submit(self._run, submitted_at, fn, args, kwargs)
+        # Modo síncrono (max_workers=0): mesmo contrato, executado na thread chamadora
+        future = Future()
+        try:
+            future.set_result(self._run(submitted_at, fn, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit_ordered(self, key, callback, fn, *args, **kwargs):
+        """Agenda fn e chama callback(resultado) na ordem de submissão entre as tarefas de key
+
+        Tarefas que falharam são puladas (o erro já foi registrado em _run).
+        """
+        future = self.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._ordered.setdefault(key, deque()).append((future, callback))
+        future.add_done_callback(lambda _: self._deliver(key))
+        return future
+
+    def _deliver(self, key):
+        with self._lock:
+            if key in self._delivering:
+                return  # A thread que já está entregando verá esta tarefa concluída
+            self._delivering.add(key)
+        while True:
+            with self._lock:
+                pending = self._ordered.get(key)
+                if not pending or not pending[0][0].done():
+                    if not pending:
+                        self._ordered.pop(key, None)
+                    self._delivering.discard(key)
+                    return
+                future, callback = pending.popleft()
+            if future.exception() is not None:
+                continue
+            try:
+                callback(future.result())
+            except Exception as e:
+                log_event(_log, logging.WARNING, 'callback_failed', key=key, error=repr(e))
+
+    async def run(self, fn, *args, **kwargs):
+        """Versão awaitable de submit para handlers assíncronos"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def sign(self, signer, username, message, cipher=None):
+        """Future de signer.sign_message"""
+        return self.submit(signer.sign_message, username, message, cipher)
+
+    def verify(self, signer, signed_message, cipher=None):
+        """Future de signer.verify_message"""
+        return self.submit(signer.verify_message, signed_message, cipher)
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+    def stats(self):
+        wait = self.metrics.summary().get('executor_wait', {})
+        return {
+            'workers': self.max_workers,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'mean_wait_time': wait.get('mean_time', 0.0),
+            'p99_wait_time': wait.get('p99_time', 0.0),
+        }
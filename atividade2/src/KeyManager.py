@@ -0,0 +1,132 @@
+"""
+Gerenciamento de chaves por sessão/sala para a camada AES
+Cada sessão tem a sua chave; os AESCipher preparados (AESGCM, ChaCha20Poly1305 e
+algoritmo AES já instanciados) ficam em um cache LRU limitado com expiração por
+inatividade (TTL), para que trocar de chave não traga de volta o custo de
+preparar os objetos a cada mensagem. A chave em si nunca é registrada em log.
+"""
+
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+from AESCipher import AESCipher
+from crypto_logging import get_logger, log_event
+
+_log = get_logger('keys')
+
+KEY_SIZE = 32  # AES-256
+
+
+class SessionKeyManager:
+    """Chaves por sessão com cache LRU + TTL de cifradores preparados e métricas de acerto"""
+
+    def __init__(self, mode='gcm', max_cached=1024, ttl_seconds=900, metrics=None):
+        self.mode = mode
+        self.max_cached = max_cached
+        self.ttl_seconds = ttl_seconds
+        self.metrics = metrics  # Buffer compartilhado pelos AESCipher criados (opcional)
+        self._keys = {}
+        self._cache = OrderedDict()  # sessão -> (AESCipher, expira_em), do menos ao mais recente
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, session_id):
+        return session_id in self._keys
+
+    def create_session(self, session_id, key=None):
+        """Registra (ou substitui) a chave da sessão; gera uma chave aleatória se não informada"""
+        key = bytes(key) if key is not None else os.urandom(KEY_SIZE)
+        if len(key) != KEY_SIZE:
+            raise ValueError("A chave deve ter 32 bytes (AES-256)")
+        with self._lock:
+            self._keys[session_id] = key
+            self._cache.pop(session_id, None)
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'session_key', session=session_id, bits=KEY_SIZE * 8)
+        return key
+
+    def rotate(self, session_id):
+        """Troca a chave da sessão (mensagens antigas deixam de ser decifráveis)"""
+        return self.create_session(session_id)
+
+    def drop_session(self, session_id):
+        """Remove a chave e o cifrador em cache da sessão"""
+        with self._lock:
+            self._keys.pop(session_id, None)
+            self._cache.pop(session_id, None)
+
+    def key(self, session_id):
+        return self._keys[session_id]
+
+    def cipher(self, session_id):
+        """AESCipher da sessão (criada na primeira vez), vindo do cache sempre que possível"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                if entry[1] > now:
+                    self.hits += 1
+                    self._cache.move_to_end(session_id)
+                    self._cache[session_id] = (entry[0], now + self.ttl_seconds)
+                    return entry[0]
+                self.expirations += 1
+                del self._cache[session_id]
+            self.misses += 1
+            key = self._keys.get(session_id)
+            if key is None:
+                key = self._keys[session_id] = os.urandom(KEY_SIZE)
+
+        # Preparação fora do lock: não bloqueia as sessões que estão no cache
+        cipher = AESCipher(mode=self.mode, metrics=self.metrics, key=key)
+
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None and entry[0].key == key:
+                return entry[0]  # Outra thread preparou o mesmo cifrador primeiro
+            if self._keys.get(session_id) == key:  # Sessão não foi rotacionada nem removida
+                self._cache[session_id] = (cipher, now + self.ttl_seconds)
+                self._cache.move_to_end(session_id)
+                self._evict(now)
+        return cipher
+
+    def _evict(self, now):
+        # O LRU em ordem de uso também está em ordem de expiração (TTL renovado a cada acesso)
+        while self._cache:
+            session_id, (_, expires_at) = next(iter(self._cache.items()))
+            if expires_at > now and len(self._cache) <= self.max_cached:
+                break
+            del self._cache[session_id]
+            if expires_at <= now:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    def purge_expired(self):
+        """Remove do cache os cifradores expirados; retorna quantos foram removidos"""
+        with self._lock:
+            before = self.expirations
+            self._evict(time.monotonic())
+            return self.expirations - before
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'sessions': len(self._keys),
+            'cached': len(self._cache),
+            'max_cached': self.max_cached,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,143 @@
+"""
+Reserva de chaves privadas pré-geradas para a emissão de certificados
+Gerar uma chave RSA-2048 leva centenas de milissegundos (às vezes segundos) e
+acontecia dentro do /login no primeiro acesso de cada usuário. O KeyPool mantém
+chaves prontas, geradas por threads de fundo (a geração no OpenSSL libera o
+GIL), com marcas d'água: quando a reserva cai para low ou menos, os workers
+geram até chegar a high. Com a reserva vazia, take() gera na hora (como antes)
+e conta uma falta. Se a geração falhar, o worker espera (backoff exponencial,
+até KEYGEN_MAX_BACKOFF segundos) antes de tentar de novo.
+"""
+
+from collections import deque
+import logging
+import threading
+import time
+
+from CertificateManager import DEFAULT_SIG_ALGORITHM, SIG_ALGORITHMS, generate_private_key
+from MetricsRing import MetricsRing
+from crypto_logging import get_logger, log_event
+
+_log = get_logger('keypool')
+
+DEFAULT_LOW_WATERMARK = 2
+DEFAULT_HIGH_WATERMARK = 8
+# Espera após uma falha de geração: dobra a cada falha seguida, até o teto
+KEYGEN_BACKOFF = 0.1
+KEYGEN_MAX_BACKOFF = 30.0
+
+
+class KeyPool:
+    """Chaves de um algoritmo geradas em segundo plano entre as marcas low e high"""
+
+    def __init__(self, algorithm=DEFAULT_SIG_ALGORITHM, low=DEFAULT_LOW_WATERMARK, high=DEFAULT_HIGH_WATERMARK,
+                 workers=1, metrics=None):
+        if algorithm not in SIG_ALGORITHMS:
+            raise ValueError(f"Algoritmo de assinatura não suportado: {algorithm}")
+        if not 0 <= low < high:
+            raise ValueError("As marcas devem satisfazer 0 <= low < high")
+        if workers < 1:
+            raise ValueError("workers deve ser pelo menos 1")
+        self.algorithm = algorithm
+        self.low = low
+        self.high = high
+        self.metrics = metrics if metrics is not None else MetricsRing()
+        self._keys = deque()
+        self._cond = threading.Condition()
+        self._refilling = True  # Enche até high ao iniciar
+        self._generating = 0  # Chaves em geração pelos workers
+        self._closed = False
+        self._consecutive_failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self._threads = [threading.Thread(target=self._run, name=f'key-pool-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _generate(self, operation):
+        start = time.perf_counter()
+        key = generate_private_key(self.algorithm)
+        self.metrics.record(operation, time.perf_counter() - start, 0)
+        return key
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not (self._refilling and
+                                                len(self._keys) + self._generating < self.high):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._generating += 1
+            try:
+                key = self._generate('keygen_pool')
+            except Exception as e:
+                log_event(_log, logging.WARNING, 'keygen_failed', algorithm=self.algorithm, error=repr(e))
+                key = None
+            with self._cond:
+                self._generating -= 1
+                if key is not None:
+                    self._keys.append(key)
+                    self.generated += 1
+                    self._consecutive_failures = 0
+                if len(self._keys) >= self.high:
+                    self._refilling = False
+                self._cond.notify_all()
+                if key is None:
+                    # Sem espera, uma falha persistente vira um laço quente que inunda o log
+                    self.failures += 1
+                    self._consecutive_failures += 1
+                    delay = min(KEYGEN_MAX_BACKOFF, KEYGEN_BACKOFF * 2 ** (self._consecutive_failures - 1))
+                    self._cond.wait_for(lambda: self._closed, delay)
+
+    def take(self):
+        """Chave pronta da reserva; se estiver vazia, gera uma na thread chamadora"""
+        with self._cond:
+            key = self._keys.popleft() if self._keys else None
+            if key is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if len(self._keys) <= self.low and not self._refilling:
+                self._refilling = True
+                self._cond.notify_all()
+        if key is None:
+            if _log.isEnabledFor(logging.DEBUG):
+                log_event(_log, logging.DEBUG, 'pool_empty', algorithm=self.algorithm)
+            key = self._generate('keygen_inline')
+        return key
+
+    def wait_ready(self, timeout=None):
+        """Espera a reserva chegar a high (ex.: antes de um teste de carga); retorna se chegou"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._closed or len(self._keys) >= self.high, timeout)
+
+    def close(self):
+        """Encerra os workers (a geração em andamento termina antes)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self):
+        takes = self.hits + self.misses
+        return {
+            'algorithm': self.algorithm,
+            'ready': len(self._keys),
+            'low': self.low,
+            'high': self.high,
+            'workers': len(self._threads),
+            'refilling': self._refilling,
+            'generated': self.generated,
+            'failures': self.failures,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / takes if takes else 0.0,
+        }
@@ -0,0 +1,241 @@
+"""
+Histogramas de latência log-lineares (estilo HDR) e agregação em streaming
+Permite analisar logs de métricas do chat de qualquer tamanho com memória limitada
+"""
+
+import math
+import numpy as np
+import pandas as pd
+
+# 32 sub-buckets lineares no início e 16 por potência de 2 acima deles (erro relativo máximo ~3%)
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+MAX_EXPONENT = 40  # 2^45 µs ≈ 1 ano: suficiente para qualquer latência real
+BUCKET_COUNT = SUB_BUCKET_COUNT + MAX_EXPONENT * SUB_BUCKET_HALF
+
+
+def bucket_index(values):
+    """Converte valores inteiros não negativos em índices de bucket log-linear"""
+    values = np.maximum(np.asarray(values, dtype=np.int64), 0)
+    _, exponents = np.frexp(values.astype(np.float64))
+    shift = np.clip(exponents - SUB_BUCKET_BITS, 0, MAX_EXPONENT)
+    index = np.where(
+        shift == 0,
+        values,
+        SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + np.right_shift(values, shift) - SUB_BUCKET_HALF
+    )
+    return np.minimum(index, BUCKET_COUNT - 1)
+
+
+def bucket_bounds(index):
+    """Retorna (limite inferior, largura) de cada bucket, na unidade inteira do histograma"""
+    index = np.asarray(index, dtype=np.int64)
+    offset = np.maximum(index - SUB_BUCKET_COUNT, 0)
+    shift = np.where(index < SUB_BUCKET_COUNT, 0, offset // SUB_BUCKET_HALF + 1)
+    sub_bucket = np.where(index < SUB_BUCKET_COUNT, index, offset % SUB_BUCKET_HALF + SUB_BUCKET_HALF)
+    return np.left_shift(sub_bucket, shift), np.left_shift(np.ones_like(shift), shift)
+
+
+class LatencyHistogram:
+    """Histograma de latências mesclável com memória fixa (~5 KB)"""
+
+    def __init__(self, unit=1e-6):
+        # Valores são registrados em segundos e quantizados na unidade (padrão: µs)
+        self.unit = unit
+        self.counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.total_m2 = 0.0  # Soma dos quadrados dos desvios em relação à média (Welford/Chan)
+        self.min_value = math.inf
+        self.max_value = -math.inf
+
+    def record_many(self, values):
+        """Registra um vetor de latências (em segundos)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        quantized = np.floor(values / self.unit).astype(np.int64)
+        self.counts += np.bincount(bucket_index(quantized), minlength=BUCKET_COUNT)
+        batch_sum = float(values.sum())
+        batch_m2 = float(np.square(values - batch_sum / values.size).sum())
+        self._combine(int(values.size), batch_sum, batch_m2)
+        self.min_value = min(self.min_value, float(values.min()))
+        self.max_value = max(self.max_value, float(values.max()))
+
+    def record(self, value):
+        """Registra uma única latência (em segundos)"""
+        self.record_many([value])
+
+    def merge(self, other):
+        """Mescla outro histograma (mesma unidade) neste"""
+        if other.unit != self.unit:
+            raise ValueError("Histogramas com unidades diferentes não podem ser mesclados")
+        self.counts += other.counts
+        self._combine(other.total_count, other.total_sum, other.total_m2)
+        self.min_value = min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+        return self
+
+    def _combine(self, count, total, m2):
+        """Soma contagem, soma e M2 de outro conjunto (fórmula de Chan: sem cancelamento de E[x²]−E[x]²)"""
+        if count == 0:
+            return
+        if self.total_count:
+            delta = total / count - self.mean()
+            m2 += delta * delta * self.total_count * count / (self.total_count + count)
+        self.total_count += count
+        self.total_sum += total
+        self.total_m2 += m2
+
+    def mean(self):
+        """Média exata (acumulada fora dos buckets)"""
+        return self.total_sum / self.total_count if self.total_count else float('nan')
+
+    def std(self):
+        """Desvio padrão amostral exato (ddof=1, como no pandas)"""
+        if self.total_count < 2:
+            return float('nan')
+        return math.sqrt(self.total_m2 / (self.total_count - 1))
+
+    def percentile(self, q):
+        """Percentil aproximado (erro relativo limitado pela resolução dos buckets)"""
+        if self.total_count == 0:
+            return float('nan')
+        rank = max(1, math.ceil(q / 100 * self.total_count))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        low, width = bucket_bounds(index)
+        value = (float(low) + float(width) / 2) * self.unit
+        return min(max(value, self.min_value), self.max_value)
+
+    def buckets(self):
+        """Retorna (valores centrais, larguras, contagens) dos buckets não vazios, em segundos"""
+        index = np.nonzero(self.counts)[0]
+        low, width = bucket_bounds(index)
+        return (low + width / 2) * self.unit, width * self.unit, self.counts[index]
+
+    def box_stats(self, label):
+        """Estatísticas no formato de Axes.bxp (percentis 5/25/50/75/95)"""
+        return {
+            'label': label,
+            'whislo': self.percentile(5),
+            'q1': self.percentile(25),
+            'med': self.percentile(50),
+            'q3': self.percentile(75),
+            'whishi': self.percentile(95),
+            'mean': self.mean(),
+            'fliers': []
+        }
+
+
+class ChatMetricsAggregator:
+    """Agregador em streaming de data/real_chat_metrics.csv com memória limitada"""
+
+    def __init__(self, window_seconds=60, max_windows=240):
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        self.histograms = {}     # operação -> LatencyHistogram
+        self.windows = {}        # índice da janela -> {operação: LatencyHistogram}
+        self.user_totals = {}    # (usuário, operação) -> [contagem, soma dos tempos]
+        self.size_totals = {}    # (operação, bucket de tamanho) -> [contagem, soma dos tempos, soma dos tamanhos]
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.rows = 0
+
+    def consume_csv(self, path, chunksize=100_000):
+        """Lê o CSV em blocos, sem nunca carregar o arquivo inteiro"""
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            self.consume(chunk)
+        return self
+
+    def consume(self, chunk):
+        """Agrega um bloco (DataFrame) de métricas"""
+        if chunk.empty:
+            return
+        chunk = chunk.copy()
+        epoch = (pd.to_datetime(chunk['timestamp']) - pd.Timestamp(0)).dt.total_seconds()
+        chunk['epoch'] = epoch
+        self.rows += len(chunk)
+        self.first_timestamp = min(epoch.min(), self.first_timestamp) if self.first_timestamp is not None else epoch.min()
+        self.last_timestamp = max(epoch.max(), self.last_timestamp) if self.last_timestamp is not None else epoch.max()
+
+        for operation, group in chunk.groupby('operation'):
+            self.histograms.setdefault(operation, LatencyHistogram()).record_many(group['time'].values)
+
+        chunk['window'] = np.floor(chunk['epoch'] / self.window_seconds).astype(np.int64)
+        for (window, operation), group in chunk.groupby(['window', 'operation']):
+            window_hists = self.windows.setdefault(int(window), {})
+            window_hists.setdefault(operation, LatencyHistogram()).record_many(group['time'].values)
+
+        if 'username' in chunk.columns:
+            user_stats = chunk.groupby(['username', 'operation'])['time'].agg(['count', 'sum'])
+            for key, row in user_stats.iterrows():
+                totals = self.user_totals.setdefault(key, [0, 0.0])
+                totals[0] += int(row['count'])
+                totals[1] += float(row['sum'])
+
+        # Usar message_size_chars se disponível, senão usar message_size (compatibilidade)
+        size_col = 'message_size_chars' if 'message_size_chars' in chunk.columns else 'message_size'
+        if size_col in chunk.columns:
+            chunk['size_bucket'] = bucket_index(chunk[size_col].fillna(0).values)
+            size_stats = chunk.groupby(['operation', 'size_bucket']).agg(
+                count=('time', 'count'), time_sum=('time', 'sum'), size_sum=(size_col, 'sum'))
+            for key, row in size_stats.iterrows():
+                totals = self.size_totals.setdefault((key[0], int(key[1])), [0, 0.0, 0.0])
+                totals[0] += int(row['count'])
+                totals[1] += float(row['time_sum'])
+                totals[2] += float(row['size_sum'])
+
+        while len(self.windows) > self.max_windows:
+            self._coarsen_windows()
+
+    def _coarsen_windows(self):
+        """Dobra o tamanho da janela mesclando janelas adjacentes (mantém a memória limitada)"""
+        self.window_seconds *= 2
+        merged = {}
+        for window, window_hists in self.windows.items():
+            target = merged.setdefault(window // 2, {})
+            for operation, hist in window_hists.items():
+                if operation in target:
+                    target[operation].merge(hist)
+                else:
+                    target[operation] = hist
+        self.windows = merged
+
+    def operations(self):
+        return sorted(self.histograms)
+
+    def histogram(self, operation):
+        """Histograma global de uma operação (vazio se não houver dados)"""
+        return self.histograms.get(operation, LatencyHistogram())
+
+    def window_series(self, operation, percentiles=(50, 99)):
+        """Série temporal por janela: (segundos desde o início, {percentil: valores})"""
+        starts, values = [], {q: [] for q in percentiles}
+        for window in sorted(self.windows):
+            hist = self.windows[window].get(operation)
+            if hist is None or hist.total_count == 0:
+                continue
+            starts.append(window * self.window_seconds - self.first_timestamp)
+            for q in percentiles:
+                values[q].append(hist.percentile(q))
+        return np.maximum(np.array(starts), 0), {q: np.array(v) for q, v in values.items()}
+
+    def user_means(self):
+        """Tempo médio por usuário e operação (DataFrame usuário x operação)"""
+        rows = [
+            {'username': user, 'operation': operation, 'time': total / count}
+            for (user, operation), (count, total) in self.user_totals.items() if count
+        ]
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows).pivot(index='username', columns='operation', values='time').fillna(0)
+
+    def size_series(self, operation):
+        """Tamanho médio e tempo médio por bucket de tamanho de mensagem"""
+        items = sorted((bucket, totals) for (op, bucket), totals in self.size_totals.items() if op == operation)
+        sizes = np.array([totals[2] / totals[0] for _, totals in items])
+        times = np.array([totals[1] / totals[0] for _, totals in items])
+        counts = np.array([totals[0] for _, totals in items])
+        return sizes, times, counts
@@ -0,0 +1,173 @@
+"""
+Assinatura em lote com árvore de Merkle para remetentes de alta taxa (bots, pontes)
+As mensagens de uma janela curta (window_ms ou max_batch mensagens) viram folhas
+de uma árvore de Merkle e só a raiz é assinada; cada envelope leva a prova de
+inclusão (irmãos do caminho até a raiz). Hashes com separação de domínio como
+no RFC 6962: folha = SHA-256(0x00 | dados), nó = SHA-256(0x01 | esq | dir); um
+nó sem irmão sobe sem ser hasheado. A folha é o mesmo dado que a assinatura
+individual cobriria (digest do texto no CBC, transcript com o hash do frame no AEAD).
+"""
+
+from concurrent.futures import Future
+import hashlib
+import threading
+import time
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def leaf_hash(data):
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_transcript(root):
+    """Dados assinados no lote: a raiz com rótulo próprio (não se confunde com um digest de mensagem)"""
+    return b'chat-merkle-v1|' + root
+
+
+def build_tree(leaves):
+    """(raiz, provas) para os dados das folhas; a prova i lista os irmãos da folha i até a raiz"""
+    if not leaves:
+        raise ValueError("Lote vazio")
+    level = [leaf_hash(data) for data in leaves]
+    proofs = [[] for _ in leaves]
+    positions = list(range(len(leaves)))  # Posição de cada folha no nível atual
+    while len(level) > 1:
+        for leaf, position in enumerate(positions):
+            sibling = position ^ 1
+            if sibling < len(level):
+                proofs[leaf].append(level[sibling])
+        level = [node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        positions = [position // 2 for position in positions]
+    return level[0], proofs
+
+
+def root_from_proof(data, index, size, proof):
+    """Raiz implicada pela folha data na posição index de uma árvore com size folhas"""
+    if not 0 <= index < size:
+        raise ValueError("Índice fora da árvore")
+    node = leaf_hash(data)
+    siblings = iter(proof)
+    while size > 1:
+        if index ^ 1 < size:
+            sibling = next(siblings)
+            node = node_hash(sibling, node) if index & 1 else node_hash(node, sibling)
+        index //= 2
+        size = (size + 1) // 2
+    if next(siblings, None) is not None:
+        raise ValueError("Prova com irmãos excedentes")
+    return node
+
+
+class _PendingBatch:
+    __slots__ = ('username', 'cipher', 'messages', 'futures', 'deadline')
+
+    def __init__(self, username, cipher, deadline):
+        self.username = username
+        self.cipher = cipher
+        self.messages = []
+        self.futures = []
+        self.deadline = deadline
+
+
+class BatchSigner:
+    """Acumula mensagens por remetente e assina cada janela com uma única assinatura (sign_batch)
+
+    submit() devolve um Future com o envelope; uma thread de fundo fecha o lote quando a
+    janela expira ou quando ele atinge max_batch mensagens.
+    """
+
+    def __init__(self, signer, window_ms=5.0, max_batch=64):
+        if max_batch < 1:
+            raise ValueError("max_batch deve ser pelo menos 1")
+        self.signer = signer
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = {}  # (usuário, cifrador) -> _PendingBatch
+        self._full = []  # Lotes que atingiram max_batch, já fechados para novas mensagens
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.messages = 0
+        self._thread = threading.Thread(target=self._run, name='merkle-batch', daemon=True)
+        self._thread.start()
+
+    def submit(self, username, message, cipher=None):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchSigner encerrado")
+            # O próprio cifrador na chave (hash por identidade): o lote o mantém vivo, então
+            # um cifrador novo nunca cai no lote de outro, como aconteceria com um id() reaproveitado
+            key = (username, cipher)
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = _PendingBatch(username, cipher, time.monotonic() + self.window)
+            batch.messages.append(message)
+            batch.futures.append(future)
+            if len(batch.messages) >= self.max_batch:
+                self._full.append(self._pending.pop(key))
+                self._cond.notify()
+            elif len(batch.messages) == 1:
+                self._cond.notify()
+        return future
+
+    def sign(self, username, message, cipher=None):
+        """Versão bloqueante de submit"""
+        return self.submit(username, message, cipher).result()
+
+    def _take_ready(self):
+        """Lotes prontos (janela expirada, cheios ou encerramento); espera se não houver"""
+        while True:
+            now = time.monotonic()
+            ready = [key for key, batch in self._pending.items() if self._closed or batch.deadline <= now]
+            if ready or self._full:
+                batches, self._full = self._full, []
+                return batches + [self._pending.pop(key) for key in ready]
+            if self._closed:
+                return None
+            timeout = min(batch.deadline for batch in self._pending.values()) - now if self._pending else None
+            self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batches = self._take_ready()
+            if batches is None:
+                return
+            for batch in batches:
+                self._sign(batch)
+
+    def _sign(self, batch):
+        try:
+            envelopes = self.signer.sign_batch(batch.username, batch.messages, cipher=batch.cipher)
+        except Exception as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.messages += len(batch.messages)
+        for i, future in enumerate(batch.futures):
+            future.set_result(envelopes[i] if envelopes else None)
+
+    def close(self):
+        """Assina o que estiver pendente e encerra a thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'messages': self.messages,
+            'mean_batch_size': self.messages / self.batches if self.batches else 0.0,
+        }
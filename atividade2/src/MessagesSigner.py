@@ -1,251 +1,550 @@
 from datetime import datetime
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, ec
+from cryptography.hazmat.primitives.asymmetric import utils as asym_utils
+from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
-from cryptography.x509.oid import NameOID
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import base64
 import hashlib
-import time
-import psutil
-from cryptography import x509
+import multiprocessing
 import os
-from utils import save_chat_metric
+import threading
+import time
+import logging
+import utils
+from utils import save_chat_metric, profile_call
+from AESCipher import AESCipher, AEAD_MODES
+from crypto_logging import get_logger, log_event, TRACE
+from MetricsRing import MetricsRing
+from CertificateCache import PrivateKeyCache, VerificationCache
+from CertificateManager import key_algorithm
+from ResourceAccounting import OperationAccounting
+from MerkleBatch import build_tree, merkle_transcript, root_from_proof
+from BinaryEnvelope import ENVELOPE_TYPES, EnvelopeView, decode_envelope
+
+_log = get_logger('signer')
+
+# Versões do esquema de assinatura (campo 'sig_version'; ausente = 1)
+# 1: assina a string hex do hash SHA-256 (que RSA/ECDSA hasheiam de novo)
+# 2: assina o digest binário diretamente (Prehashed), sem a segunda passagem
+SIG_VERSION_HEX = 1
+SIG_VERSION_PREHASHED = 2
+SIG_VERSIONS = (SIG_VERSION_HEX, SIG_VERSION_PREHASHED)
+
+# Mensagens por tarefa enviada ao pool de processos do verify_batch
+BATCH_CHUNK_SIZE = 256
+
+# Raízes de Merkle já verificadas mantidas por MessageSigner (LRU)
+VERIFIED_ROOTS_MAX = 4096
+
+# MessageSigner de cada processo do pool do verify_batch (criado no inicializador)
+_batch_signer = None
+
+
+def _init_batch_worker(cert_manager, mode, key, collect_metrics):
+    global _batch_signer
+    utils.collect_metrics = collect_metrics
+    _batch_signer = MessageSigner(cert_manager, AESCipher(mode=mode, key=key))
+
+
+def _verify_chunk(cert_pem, signed_messages):
+    """Verifica um bloco de mensagens do mesmo certificado (parseado uma vez por processo)"""
+    try:
+        certificate = _batch_signer.verify_cache.lookup_pem(cert_pem)
+    except ValueError as e:  # Ex.: certificado expirado
+        log_event(_log, logging.WARNING, 'verify_failed', messages=len(signed_messages), error=repr(e))
+        return [False] * len(signed_messages)
+    return [_batch_signer._verify_message(signed_message, certificate=certificate)
+            for signed_message in signed_messages]
+
+
+def _sign(private_key, data, algorithm):
+    """Assina com RSA-PSS, ECDSA ou Ed25519 conforme a chave
+    
+    algorithm é o hash (ou Prehashed) usado por RSA e ECDSA; o Ed25519 assina os bytes
+    recebidos diretamente (o digest na sig_version 2, a string hex na 1).
+    """
+    sig_alg = key_algorithm(private_key)
+    if sig_alg == 'rsa':
+        return private_key.sign(
+            data,
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            algorithm
+        )
+    if sig_alg == 'ecdsa':
+        return private_key.sign(data, ec.ECDSA(algorithm))
+    return private_key.sign(data)
+
+
+def _verify(public_key, signature, data, algorithm):
+    """Verifica a assinatura de _sign; levanta InvalidSignature se inválida"""
+    sig_alg = key_algorithm(public_key)
+    if sig_alg == 'rsa':
+        public_key.verify(
+            signature,
+            data,
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            algorithm
+        )
+    elif sig_alg == 'ecdsa':
+        public_key.verify(signature, data, ec.ECDSA(algorithm))
+    else:
+        public_key.verify(signature, data)
+
+
+def aead_transcript(mode, frame):
+    """Dados assinados no modo AEAD: SHA-256 do frame inteiro (versão | nonce | ciphertext | tag)
+    
+    Só nonce | tag não basta: GCM e Poly1305 não comprometem a chave, e todos da sala têm a
+    chave simétrica, então poderiam montar outro ciphertext com a mesma tag e reaproveitar
+    a assinatura de outro remetente. O ciphertext precisa estar no que é assinado.
+    """
+    return b'chat-aead-v2|' + mode.encode('ascii') + b'|' + hashlib.sha256(frame).digest()
+
+
+def _frame_bytes(encrypted_message):
+    """Frame cifrado em bytes a partir da forma texto (base64) ou binária"""
+    if isinstance(encrypted_message, str):
+        return base64.b64decode(encrypted_message)
+    return encrypted_message
 
 class MessageSigner:
     """Assinador de mensagens digitais com integridade (SHA-256)"""
     
-    def __init__(self, cert_manager, aes_cipher):
+    def __init__(self, cert_manager, aes_cipher, profile_dir=None, binary=False, metrics=None, key_cache=None,
+                 verify_cache=None, registry=None, cert_resolver=None, sig_version=SIG_VERSION_PREHASHED,
+                 accounting=None):
+        if sig_version not in SIG_VERSIONS:
+            raise ValueError(f"Versão de assinatura não suportada: {sig_version}")
         self.cert_manager = cert_manager
         self.aes_cipher = aes_cipher
-        self.performance_data = []
+        # Chaves privadas carregadas uma vez por usuário (invalidadas se o .p12 mudar)
+        self.key_cache = key_cache if key_cache is not None else PrivateKeyCache(cert_manager.cert_dir)
+        # Certificados recebidos já parseados, por impressão digital SHA-256
+        self.verify_cache = verify_cache if verify_cache is not None else VerificationCache()
+        # Com um CertificateRegistry o envelope leva só a impressão digital (sem o PEM);
+        # cert_resolver busca o PEM de uma impressão digital desconhecida (fetch-on-miss)
+        self.registry = registry
+        self.cert_resolver = cert_resolver or (registry.lookup if registry is not None else None)
+        # Buffer circular de métricas (pode ser compartilhado com o AESCipher)
+        self.metrics = metrics if metrics is not None else MetricsRing()
+        # Duração e CPU da thread por operação (sem leituras do sistema inteiro)
+        self.accounting = accounting if accounting is not None else OperationAccounting()
+        # Se definido, cada sign/verify é perfilado com cProfile e salvo neste diretório
+        self.profile_dir = profile_dir
+        # Com binary=True, 'encrypted_message' é o frame em bytes (sem base64)
+        self.binary = binary
+        # Versão do esquema usada nas novas assinaturas (a verificação aceita todas)
+        self.sig_version = sig_version
+        # (impressão digital, raiz) dos lotes de Merkle cuja assinatura já foi verificada
+        self.verified_roots = OrderedDict()
+        self._roots_lock = threading.Lock()
+        self.root_hits = 0
+        self.root_misses = 0
     
-    def compute_hash(self, message):
-        """Calcula hash SHA-256 da mensagem para integridade"""
-        print(f"\n[INTEGRIDADE - SHA-256] Calculando hash")
-        print(f"[SHA256] Mensagem: '{message}' ({len(message)} chars)")
-        
-        start_time = time.time()
+    @property
+    def performance_data(self):
+        """Métricas no formato antigo (lista de dicionários), geradas sob demanda"""
+        return self.metrics.to_dicts()
+    
+    def compute_digest(self, message):
+        """Calcula o digest SHA-256 (binário, 32 bytes) da mensagem para integridade"""
+        start_time = time.perf_counter()
         
         message_bytes = message.encode('utf-8')
-        print(f"[SHA256] Bytes da mensagem: {len(message_bytes)} bytes")
         
-        hash_obj = hashlib.sha256(message_bytes)
-        hash_digest = hash_obj.hexdigest()
+        hash_digest = hashlib.sha256(message_bytes).digest()
         
-        end_time = time.time()
+        end_time = time.perf_counter()
         time_taken = end_time - start_time
         
-        print(f"[SHA256] ✅ Hash calculado em {time_taken:.6f}s")
-        print(f"[SHA256] Hash SHA-256: {hash_digest}")
+        if _log.isEnabledFor(TRACE):
+            log_event(_log, TRACE, 'hash', algorithm='SHA-256', message_bytes=len(message_bytes),
+                      digest=hash_digest.hex(), seconds=f"{time_taken:.6f}")
         
-        self.performance_data.append({
-            'operation': 'hash',
-            'time': time_taken,
-            'message_size': len(message_bytes),
-            'timestamp': datetime.now().isoformat()
-        })
+        self.metrics.record('hash', time_taken, len(message_bytes))
         
         return hash_digest
     
-    def sign_message(self, username, message):
-        """
-        Processa mensagem com tripla segurança:
-        1. SIGILO: Cifra com AES-256
-        2. INTEGRIDADE: Hash SHA-256
-        3. AUTENTICIDADE: Assinatura RSA
+    def compute_hash(self, message):
+        """Calcula hash SHA-256 da mensagem para integridade (hex)"""
+        return self.compute_digest(message).hex()
+    
+    def sign_message(self, username, message, cipher=None):
+        """Assina a mensagem (perfilando com cProfile se profile_dir estiver definido)
+        
+        cipher substitui o AESCipher padrão (ex.: o da sala, vindo do SessionKeyManager).
         """
-        print(f"\n{'='*80}")
-        print(f"[CHAT] {username} está enviando mensagem: '{message}'")
-        print(f"{'='*80}")
+        if self.profile_dir is None:
+            return self._sign_message(username, message, cipher)
+        return profile_call(self.profile_dir, f"sign_{username}", self._sign_message, username, message, cipher)
+    
+    def verify_message(self, signed_message, cipher=None):
+        """Verifica a mensagem (perfilando com cProfile se profile_dir estiver definido)
         
-        start_time = time.time()
-        start_cpu = psutil.cpu_percent()
-        start_memory = psutil.virtual_memory().used
+        signed_message é o dicionário de sign_message ou o envelope binário (bytes/EnvelopeView).
+        """
+        if self.profile_dir is None:
+            return self._verify_message(signed_message, cipher)
+        if isinstance(signed_message, ENVELOPE_TYPES):
+            signed_message = decode_envelope(signed_message)
+        sender = signed_message.get('sender', 'desconhecido')
+        return profile_call(self.profile_dir, f"verify_{sender}", self._verify_message, signed_message, cipher)
+    
+    def verify_batch(self, signed_messages, cipher=None, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+        """Verifica várias mensagens (ex.: histórico na reconexão); retorna os resultados na mesma ordem
         
-        cert_path = os.path.join(self.cert_manager.cert_dir, f"{username}.p12")
-        print(f"[CERT] Carregando certificado: {cert_path}")
+        As mensagens são agrupadas pelo certificado do remetente, que é obtido e parseado uma
+        vez por grupo; os grupos são divididos em blocos de chunk_size mensagens e distribuídos
+        em um pool de workers processos (padrão: um por CPU; com 1 ou menos, ou um único
+        bloco, a verificação roda neste processo).
+        """
+        start_time = time.perf_counter()
+        aes_cipher = cipher or self.aes_cipher
+        signed_messages = list(signed_messages)
+        results = [False] * len(signed_messages)
         
-        if not os.path.exists(cert_path):
-            print(f"[CERT] ❌ Certificado não encontrado para {username}")
-            return None
+        groups = {}  # PEM -> índices das mensagens
+        resolved = {}  # impressão digital -> PEM (certificados por referência)
+        for index, signed_message in enumerate(signed_messages):
+            if isinstance(signed_message, ENVELOPE_TYPES):
+                # Envelope binário: decodificado uma vez aqui (sem cópia) e reaproveitado
+                try:
+                    signed_message = signed_messages[index] = decode_envelope(signed_message)
+                except ValueError as e:
+                    log_event(_log, logging.WARNING, 'verify_failed', sender='desconhecido', error=repr(e))
+                    continue
+            cert_pem = signed_message.get('certificate')
+            if cert_pem is None:
+                try:
+                    cert_fingerprint = signed_message['cert_fingerprint']
+                    cert_pem = resolved.get(cert_fingerprint)
+                    if cert_pem is None:
+                        cert, _, _ = self.verify_cache.lookup_fingerprint(cert_fingerprint, self.cert_resolver)
+                        cert_pem = resolved[cert_fingerprint] = cert.public_bytes(
+                            serialization.Encoding.PEM).decode()
+                except Exception as e:
+                    log_event(_log, logging.WARNING, 'verify_failed',
+                              sender=signed_message.get('sender', 'desconhecido'), error=repr(e))
+                    continue
+            groups.setdefault(cert_pem, []).append(index)
         
-        with open(cert_path, "rb") as f:
-            private_key, cert, _ = pkcs12.load_key_and_certificates(
-                f.read(), b"password"
-            )
+        jobs = [(cert_pem, indices[i:i + chunk_size])
+                for cert_pem, indices in groups.items() for i in range(0, len(indices), chunk_size)]
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        if workers <= 1 or len(jobs) <= 1:
+            for cert_pem, indices in jobs:
+                try:
+                    certificate = self.verify_cache.lookup_pem(cert_pem)
+                except ValueError as e:  # Ex.: certificado expirado; o bloco fica False
+                    log_event(_log, logging.WARNING, 'verify_failed', messages=len(indices), error=repr(e))
+                    continue
+                for index in indices:
+                    results[index] = self._verify_message(signed_messages[index], cipher, certificate)
+        else:
+            # spawn: o chat tem threads ativas, e fork copiaria locks possivelmente travados
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_batch_worker,
+                                     initargs=(self.cert_manager, aes_cipher.mode, aes_cipher.key,
+                                               utils.collect_metrics)) as pool:
+                futures = [pool.submit(_verify_chunk, cert_pem, [signed_messages[i] for i in indices])
+                           for cert_pem, indices in jobs]
+                for (_, indices), future in zip(jobs, futures):
+                    for index, valid in zip(indices, future.result()):
+                        results[index] = valid
         
-        # Extrair informações do certificado
-        subject = cert.subject
-        common_name = None
-        for attribute in subject:
-            if attribute.oid == NameOID.COMMON_NAME:
-                common_name = attribute.value
-                break
+        time_taken = time.perf_counter() - start_time
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'verify_batch', messages=len(signed_messages),
+                      certificates=len(groups), chunks=len(jobs), workers=workers,
+                      seconds=f"{time_taken:.6f}")
+        self.metrics.record('verify_batch', time_taken, len(signed_messages), batch_size=len(signed_messages))
+        return results
+    
+    def sign_batch(self, username, messages, cipher=None):
+        """Assina um lote de mensagens do mesmo remetente com uma única assinatura
         
-        print(f"[CERT] ✅ Certificado carregado para: {common_name}")
-        print(f"[CERT] Chave privada RSA: {private_key.key_size} bits")
+        Os dados que cada mensagem assinaria sozinha viram folhas de uma árvore de Merkle;
+        só a raiz é assinada e cada envelope leva a raiz, a sua posição e a prova de
+        inclusão (campo 'merkle'). Retorna os envelopes na ordem recebida, ou None.
+        """
+        started = self.accounting.start()
         
-        # 1. INTEGRIDADE: Calcular hash da mensagem original
-        message_hash = self.compute_hash(message)
+        loaded = self.key_cache.get(username)
         
-        # 2. SIGILO: Cifrar mensagem com AES-256
-        encrypted_message = self.aes_cipher.encrypt(message)
+        if loaded is None:
+            log_event(_log, logging.WARNING, 'certificate_missing', user=username)
+            return None
         
-        # 3. AUTENTICIDADE: Assinar o hash com RSA (não a mensagem cifrada)
-        print(f"\n[AUTENTICIDADE - RSA-2048] Assinando hash")
-        print(f"[RSA] Usuário: {username} ({common_name})")
-        print(f"[RSA] Chave privada: {private_key.key_size} bits")
-        print(f"[RSA] Hash a assinar: {message_hash}")
+        private_key, cert, cert_pem, cert_fingerprint = loaded
+        aes_cipher = cipher or self.aes_cipher
+        protected = [self._protect(username, message, aes_cipher) for message in messages]
+        root, proofs = build_tree([item[3] for item in protected])
         
-        hash_bytes = message_hash.encode('utf-8')
+        sig_alg = key_algorithm(private_key)
+        signature = _sign(private_key, merkle_transcript(root), hashes.SHA256())
         
-        sign_start = time.time()
-        signature = private_key.sign(
-            hash_bytes,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        sign_end = time.time()
+        envelopes = []
+        for index, (message, item, proof) in enumerate(zip(messages, protected, proofs)):
+            mode, encrypted_message, message_hash = item[:3]
+            signed_message = self._envelope(username, message, mode, encrypted_message, message_hash,
+                                            signature, sig_alg, cert_pem, cert_fingerprint)
+            signed_message['merkle'] = {
+                'root': root.hex(),
+                'index': index,
+                'size': len(messages),
+                'proof': [sibling.hex() for sibling in proof]
+            }
+            envelopes.append(signed_message)
         
-        print(f"[RSA] ✅ Assinatura criada em {sign_end - sign_start:.6f}s")
-        print(f"[RSA] Assinatura: {signature[:16].hex()}...{signature[-16:].hex()} ({len(signature)} bytes)")
+        time_taken, cpu_usage = self.accounting.end(started)
         
-        end_time = time.time()
-        end_cpu = psutil.cpu_percent()
-        end_memory = psutil.virtual_memory().used
-        time_taken = end_time - start_time
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'sign_batch', user=username, sig_alg=sig_alg,
+                      messages=len(messages), root=root.hex(), seconds=f"{time_taken:.6f}")
         
-        print(f"\n[RESUMO] Tripla segurança aplicada em {time_taken:.6f}s:")
-        print(f"  1. ✅ SIGILO: AES-256-CBC")
-        print(f"  2. ✅ INTEGRIDADE: SHA-256")
-        print(f"  3. ✅ AUTENTICIDADE: RSA-2048 + PSS")
-        print(f"{'='*80}")
-        
-        # Coletar métricas do sistema
-        self.performance_data.append({
-            'operation': 'sign_complete',
-            'time': time_taken,
-            'cpu_usage': end_cpu - start_cpu,
-            'memory_usage': end_memory - start_memory,
-            'message_size': len(message.encode('utf-8')),
-            'timestamp': datetime.now().isoformat()
-        })
+        message_bytes = sum(len(message.encode('utf-8')) for message in messages)
+        self.metrics.record('sign_batch', time_taken, message_bytes, cpu_usage=cpu_usage,
+                            batch_size=len(messages))
         
-        # Coletar métrica real do chat
-        save_chat_metric('sign', username, message, time_taken, True)
+        # Métrica do chat por mensagem, com o custo do lote dividido igualmente
+        for message in messages:
+            save_chat_metric('sign', username, message, time_taken / len(messages), True)
         
-        return {
+        return envelopes
+    
+    def _verify_root(self, cert, public_key, signature, merkle):
+        """Confere a assinatura da raiz de um lote de Merkle (uma vez por raiz, depois em cache)"""
+        root = bytes.fromhex(merkle['root'])
+        key = (cert.fingerprint(hashes.SHA256()), root)
+        with self._roots_lock:
+            if key in self.verified_roots:
+                self.verified_roots.move_to_end(key)
+                self.root_hits += 1
+                return
+            self.root_misses += 1
+        _verify(public_key, signature, merkle_transcript(root), hashes.SHA256())
+        with self._roots_lock:
+            self.verified_roots[key] = True
+            while len(self.verified_roots) > VERIFIED_ROOTS_MAX:
+                self.verified_roots.popitem(last=False)
+    
+    def _protect(self, username, message, aes_cipher):
+        """Cifra e calcula os dados a assinar: (modo, cifrado, hash hex ou None, dados, algoritmo de hash)"""
+        mode = aes_cipher.mode
+        if aes_cipher.is_aead:
+            # 1+2. SIGILO e INTEGRIDADE em uma passagem; o remetente entra como AAD
+            frame, _, _ = aes_cipher.encrypt_aead(message, aad=username.encode('utf-8'), binary=True)
+            encrypted_message = frame if self.binary else base64.b64encode(frame).decode('utf-8')
+            message_hash = None
+            # O transcript é curto e hasheado uma única vez na assinatura (equivale nas duas versões)
+            signed_data, algorithm = aead_transcript(mode, frame), hashes.SHA256()
+        else:
+            # 1. INTEGRIDADE: Calcular hash da mensagem original
+            digest = self.compute_digest(message)
+            message_hash = digest.hex()
+            
+            # 2. SIGILO: Cifrar mensagem com AES-256
+            if self.binary:
+                encrypted_message = aes_cipher.encrypt_bytes(message.encode('utf-8'))
+            else:
+                encrypted_message = aes_cipher.encrypt(message)
+            
+            # 3. AUTENTICIDADE: Assinar o hash (não a mensagem cifrada)
+            if self.sig_version == SIG_VERSION_PREHASHED:
+                signed_data, algorithm = digest, asym_utils.Prehashed(hashes.SHA256())
+            else:
+                signed_data, algorithm = message_hash.encode('utf-8'), hashes.SHA256()
+        return mode, encrypted_message, message_hash, signed_data, algorithm
+    
+    def _envelope(self, username, message, mode, encrypted_message, message_hash, signature, sig_alg,
+                  cert_pem, cert_fingerprint):
+        """Monta o envelope da mensagem assinada (publica o certificado se houver diretório)"""
+        signed_message = {
             'message': message,  # Original para exibição local
-            'encrypted_message': encrypted_message,  # Mensagem cifrada
-            'message_hash': message_hash,  # Hash para verificação de integridade
-            'signature': signature.hex(),  # Assinatura RSA
-            'certificate': cert.public_bytes(serialization.Encoding.PEM).decode(),
+            'mode': mode,  # Modo de proteção (cbc, gcm ou chacha20)
+            'encrypted_message': encrypted_message,  # Mensagem cifrada (frame em base64 ou bytes)
+            'signature': signature.hex(),  # Assinatura (RSA, ECDSA ou Ed25519)
+            'sig_alg': sig_alg,  # Algoritmo da assinatura (ausente = rsa)
+            'sig_version': self.sig_version,  # Esquema da assinatura (1 = hash hex, 2 = digest)
+            'cert_fingerprint': cert_fingerprint,  # SHA-256 do certificado (DER)
             'timestamp': datetime.now().isoformat(),
             'sender': username
         }
+        if self.registry is not None:
+            self.registry.publish(cert_pem, cert_fingerprint)
+        else:
+            signed_message['certificate'] = cert_pem  # Certificado embutido (formato original)
+        if message_hash is not None:
+            signed_message['message_hash'] = message_hash  # Hash para verificação de integridade
+        return signed_message
+    
+    def _sign_message(self, username, message, cipher=None):
+        """
+        Processa mensagem com tripla segurança:
+        1. SIGILO: Cifra com AES-256
+        2. INTEGRIDADE: Hash SHA-256
+        3. AUTENTICIDADE: Assinatura RSA (ou ECDSA/Ed25519, conforme a chave do usuário)
+        
+        Nos modos AEAD (GCM/ChaCha20-Poly1305) sigilo e integridade vêm de uma única
+        passagem, e a assinatura RSA cobre o transcript (SHA-256 do frame cifrado) em vez do hash.
+        """
+        started = self.accounting.start()
+        
+        loaded = self.key_cache.get(username)
+        
+        if loaded is None:
+            log_event(_log, logging.WARNING, 'certificate_missing', user=username)
+            return None
+        
+        private_key, cert, cert_pem, cert_fingerprint = loaded
+        
+        mode, encrypted_message, message_hash, signed_data, algorithm = self._protect(
+            username, message, cipher or self.aes_cipher)
+        
+        sig_alg = key_algorithm(private_key)
+        sign_start = time.perf_counter()
+        signature = _sign(private_key, signed_data, algorithm)
+        sign_end = time.perf_counter()
+        
+        time_taken, cpu_usage = self.accounting.end(started)
+        
+        if _log.isEnabledFor(logging.DEBUG):
+            log_event(_log, logging.DEBUG, 'sign', user=username, sig_alg=sig_alg,
+                      key_bits=getattr(private_key, 'key_size', 256), message_bytes=len(message.encode('utf-8')),
+                      sig_seconds=f"{sign_end - sign_start:.6f}",
+                      seconds=f"{time_taken:.6f}")
+        if _log.isEnabledFor(TRACE):
+            log_event(_log, TRACE, 'sign_detail', mode=mode, hash=message_hash,
+                      signature=f"{signature[:16].hex()}...{signature[-16:].hex()}", signature_bytes=len(signature))
+        
+        # Coletar métricas da operação (CPU da thread; memória vem do ResourceSampler)
+        self.metrics.record('sign_complete', time_taken, len(message.encode('utf-8')), cpu_usage=cpu_usage)
+        
+        # Coletar métrica real do chat
+        save_chat_metric('sign', username, message, time_taken, True)
+        
+        return self._envelope(username, message, mode, encrypted_message, message_hash,
+                              signature, sig_alg, cert_pem, cert_fingerprint)
     
-    def verify_message(self, signed_message):
+    def _verify_message(self, signed_message, cipher=None, certificate=None):
         """
         Verifica tripla segurança:
         1. SIGILO: Decifra com AES-256
         2. INTEGRIDADE: Valida hash SHA-256
-        3. AUTENTICIDADE: Verifica assinatura RSA
+        3. AUTENTICIDADE: Verifica assinatura RSA (ou ECDSA/Ed25519)
+        
+        certificate: (certificado, chave pública, CN) já resolvido pelo verify_batch
         """
+        if isinstance(signed_message, ENVELOPE_TYPES):
+            try:
+                signed_message = decode_envelope(signed_message)
+            except ValueError as e:
+                log_event(_log, logging.WARNING, 'verify_failed', sender='desconhecido', error=repr(e))
+                return False
         sender = signed_message.get('sender', 'desconhecido')
-        print(f"\n{'='*80}")
-        print(f"[CHAT] Verificando mensagem de {sender}")
-        print(f"{'='*80}")
+        aes_cipher = cipher or self.aes_cipher
         
-        start_time = time.time()
-        start_cpu = psutil.cpu_percent()
-        start_memory = psutil.virtual_memory().used
+        started = self.accounting.start()
         
         try:
-            cert_pem = signed_message['certificate']
-            cert = x509.load_pem_x509_certificate(cert_pem.encode())
-            public_key = cert.public_key()
-            
-            # Extrair informações do certificado
-            subject = cert.subject
-            common_name = None
-            for attribute in subject:
-                if attribute.oid == NameOID.COMMON_NAME:
-                    common_name = attribute.value
-                    break
-            
-            print(f"[CERT] Certificado do remetente: {common_name}")
-            print(f"[CERT] Chave pública RSA: {public_key.key_size} bits")
+            if certificate is not None:
+                cert, public_key, common_name = certificate
+            elif isinstance(signed_message, EnvelopeView) and 'certificate' in signed_message:
+                # Envelope binário leva o DER: sem montar nem decodificar o PEM
+                cert, public_key, common_name = self.verify_cache.lookup_der(signed_message.raw('certificate'))
+            elif 'certificate' in signed_message:
+                cert, public_key, common_name = self.verify_cache.lookup_pem(signed_message['certificate'])
+            else:
+                cert, public_key, common_name = self.verify_cache.lookup_fingerprint(
+                    signed_message['cert_fingerprint'], self.cert_resolver)
             
-            # 1. SIGILO: Decifrar mensagem AES-256
-            encrypted_message = signed_message['encrypted_message']
-            decrypted_message = self.aes_cipher.decrypt(encrypted_message)
-            
-            if decrypted_message is None:
-                print(f"[VERIFY] ❌ Falha na decifragem AES")
+            # Mensagens sem 'mode' são do formato original (CBC + SHA-256)
+            mode = signed_message.get('mode', 'cbc')
+            # Mensagens sem 'sig_version' assinam a string hex do hash (versão 1)
+            sig_version = signed_message.get('sig_version', SIG_VERSION_HEX)
+            if sig_version not in SIG_VERSIONS:
+                log_event(_log, logging.WARNING, 'verify_failed', sender=sender, reason='sig_version')
                 return False
-            
-            # 2. INTEGRIDADE: Verificar hash SHA-256
-            print(f"\n[INTEGRIDADE - SHA-256] Verificando integridade")
-            computed_hash = self.compute_hash(decrypted_message)
-            received_hash = signed_message['message_hash']
-            
-            print(f"[SHA256] Hash recebido:  {received_hash}")
-            print(f"[SHA256] Hash calculado: {computed_hash}")
-            
-            if computed_hash != received_hash:
-                print("[SHA256] ❌ Falha na verificação de integridade (hash)")
+            # O algoritmo declarado precisa ser o da chave do certificado (ausente = rsa)
+            if signed_message.get('sig_alg', 'rsa') != key_algorithm(public_key):
+                log_event(_log, logging.WARNING, 'verify_failed', sender=sender, reason='sig_alg')
                 return False
+            encrypted_message = signed_message['encrypted_message']
+            received_hash = None
             
-            print(f"[SHA256] ✅ Integridade verificada com sucesso")
-            
-            # 3. AUTENTICIDADE: Verificar assinatura RSA
-            print(f"\n[AUTENTICIDADE - RSA-2048] Verificando assinatura")
-            print(f"[RSA] Remetente: {sender} ({common_name})")
-            print(f"[RSA] Chave pública: {public_key.key_size} bits")
-            
-            hash_bytes = received_hash.encode('utf-8')
-            signature = bytes.fromhex(signed_message['signature'])
-            
-            print(f"[RSA] Assinatura a verificar: {signature[:16].hex()}...{signature[-16:].hex()}")
+            if mode in AEAD_MODES:
+                # 1+2. SIGILO e INTEGRIDADE: a tag AEAD cobre ciphertext e remetente
+                frame = _frame_bytes(encrypted_message)
+                decrypted_message, _, _ = aes_cipher.decrypt_aead(
+                    frame, aad=signed_message['sender'].encode('utf-8'), mode=mode)
+                if decrypted_message is None:
+                    log_event(_log, logging.WARNING, 'verify_failed', sender=sender, reason='aead_decrypt')
+                    return False
+                # A assinatura cobre o frame recebido (ciphertext incluído), não só a tag
+                signed_data, algorithm = aead_transcript(mode, frame), hashes.SHA256()
+            else:
+                # 1. SIGILO: Decifrar mensagem AES-256
+                decrypted_message = aes_cipher.decrypt(encrypted_message, mode='cbc')
+                
+                if decrypted_message is None:
+                    log_event(_log, logging.WARNING, 'verify_failed', sender=sender, reason='aes_decrypt')
+                    return False
+                
+                # 2. INTEGRIDADE: Verificar hash SHA-256
+                digest = self.compute_digest(decrypted_message)
+                received_hash = signed_message['message_hash']
+                
+                if digest.hex() != received_hash:
+                    log_event(_log, logging.WARNING, 'verify_failed', sender=sender, reason='hash_mismatch')
+                    return False
+                if sig_version == SIG_VERSION_PREHASHED:
+                    signed_data, algorithm = digest, asym_utils.Prehashed(hashes.SHA256())
+                else:
+                    signed_data, algorithm = received_hash.encode('utf-8'), hashes.SHA256()
             
-            verify_start = time.time()
-            public_key.verify(
-                signature,
-                hash_bytes,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            verify_end = time.time()
+            # 3. AUTENTICIDADE: Verificar assinatura
+            if isinstance(signed_message, EnvelopeView):
+                signature = bytes(signed_message.raw('signature'))
+            else:
+                signature = bytes.fromhex(signed_message['signature'])
             
-            print(f"[RSA] ✅ Assinatura verificada em {verify_end - verify_start:.6f}s")
+            verify_start = time.perf_counter()
+            merkle = signed_message.get('merkle')
+            if merkle is None:
+                _verify(public_key, signature, signed_data, algorithm)
+            else:
+                # Lote de Merkle: a prova liga a mensagem à raiz, e a raiz é que foi assinada
+                root = root_from_proof(signed_data, merkle['index'], merkle['size'],
+                                       [bytes.fromhex(sibling) for sibling in merkle['proof']])
+                if root.hex() != merkle['root']:
+                    log_event(_log, logging.WARNING, 'verify_failed', sender=sender, reason='merkle_proof')
+                    return False
+                self._verify_root(cert, public_key, signature, merkle)
+            verify_end = time.perf_counter()
             
-            end_time = time.time()
-            end_cpu = psutil.cpu_percent()
-            end_memory = psutil.virtual_memory().used
-            time_taken = end_time - start_time
+            time_taken, cpu_usage = self.accounting.end(started)
             
-            print(f"\n[RESUMO] Tripla verificação concluída em {time_taken:.6f}s:")
-            print(f"  1. ✅ SIGILO: Mensagem decifrada com AES-256-CBC")
-            print(f"  2. ✅ INTEGRIDADE: Hash SHA-256 válido")
-            print(f"  3. ✅ AUTENTICIDADE: Assinatura RSA-2048 válida")
-            print(f"[VERIFY] ✅ MENSAGEM AUTÊNTICA E ÍNTEGRA")
-            print(f"{'='*80}")
+            if _log.isEnabledFor(logging.DEBUG):
+                log_event(_log, logging.DEBUG, 'verify', sender=sender, common_name=common_name,
+                          sig_alg=key_algorithm(public_key), key_bits=getattr(public_key, 'key_size', 256),
+                          sig_seconds=f"{verify_end - verify_start:.6f}", seconds=f"{time_taken:.6f}")
+            if _log.isEnabledFor(TRACE):
+                log_event(_log, TRACE, 'verify_detail', mode=mode, hash=received_hash,
+                          signature=f"{signature[:16].hex()}...{signature[-16:].hex()}")
             
-            # Coletar métricas do sistema
-            self.performance_data.append({
-                'operation': 'verify_complete',
-                'time': time_taken,
-                'cpu_usage': end_cpu - start_cpu,
-                'memory_usage': end_memory - start_memory,
-                'message_size': len(decrypted_message.encode('utf-8')),
-                'timestamp': datetime.now().isoformat()
-            })
+            # Coletar métricas da operação (CPU da thread; memória vem do ResourceSampler)
+            self.metrics.record('verify_complete', time_taken, len(decrypted_message.encode('utf-8')),
+                                cpu_usage=cpu_usage)
             
             # Coletar métrica real do chat
             save_chat_metric('verify', signed_message.get('sender', 'unknown'), 
@@ -253,11 +552,8 @@ class MessageSigner:
             
             return True
         except Exception as e:
-            print(f"[VERIFY] ❌ Erro na verificação: {e}")
-            print(f"[VERIFY] ❌ MENSAGEM REJEITADA")
-            print(f"{'='*80}")
-            end_time = time.time()
-            time_taken = end_time - start_time
+            log_event(_log, logging.WARNING, 'verify_failed', sender=sender, error=repr(e))
+            time_taken, _ = self.accounting.end(started)
             save_chat_metric('verify', signed_message.get('sender', 'unknown'), 
                            signed_message.get('message', ''), time_taken, False)
             return False
\ No newline at end of file
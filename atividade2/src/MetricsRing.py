@@ -0,0 +1,154 @@
+"""
+Buffer circular de métricas de operações (AES, hash, assinatura, verificação)
+Capacidade fixa em arrays numpy tipados: registrar é O(1) e não aloca; os resumos
+para /performance são calculados de forma vetorizada. A lista de dicionários do
+formato antigo (performance_data) é gerada apenas sob demanda.
+"""
+
+from datetime import datetime
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CAPACITY = 65536
+
+# Registro global de operações -> código (uint8), compartilhado por todos os buffers
+OPERATIONS = []
+_OPERATION_CODES = {}
+_registry_lock = threading.Lock()
+
+
+def operation_code(operation):
+    """Código numérico da operação (registrado na primeira vez em que aparece)"""
+    code = _OPERATION_CODES.get(operation)
+    if code is None:
+        with _registry_lock:
+            code = _OPERATION_CODES.get(operation)
+            if code is None:
+                if len(OPERATIONS) > np.iinfo(np.uint8).max:
+                    raise ValueError("Número máximo de operações distintas excedido")
+                code = len(OPERATIONS)
+                OPERATIONS.append(operation)
+                _OPERATION_CODES[operation] = code
+    return code
+
+
+class MetricsRing:
+    """Últimas capacity operações: código, instante (ns monotônico), duração, tamanho e extras"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.operation = np.zeros(capacity, dtype=np.uint8)
+        self.timestamp_ns = np.zeros(capacity, dtype=np.int64)
+        self.time = np.zeros(capacity, dtype=np.float64)
+        self.message_size = np.zeros(capacity, dtype=np.int64)
+        # Colunas opcionais: NaN / 0 indicam ausência no registro
+        self.cpu_usage = np.full(capacity, np.nan, dtype=np.float64)
+        self.memory_usage = np.full(capacity, np.nan, dtype=np.float64)
+        self.batch_size = np.zeros(capacity, dtype=np.int32)
+        self.total = 0  # Registros desde a criação (inclui os já sobrescritos)
+        self._lock = threading.Lock()
+        # Converte o relógio monotônico em horário de parede na visão de compatibilidade
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def dropped(self):
+        """Registros descartados por falta de espaço"""
+        return max(0, self.total - self.capacity)
+
+    def record(self, operation, duration, size, cpu_usage=np.nan, memory_usage=np.nan, batch_size=0):
+        """Registra uma operação em O(1), sobrescrevendo a mais antiga quando cheio"""
+        code = operation_code(operation)
+        now = time.monotonic_ns()
+        with self._lock:
+            i = self.total % self.capacity
+            self.total += 1
+            self.operation[i] = code
+            self.timestamp_ns[i] = now
+            self.time[i] = duration
+            self.message_size[i] = size
+            self.cpu_usage[i] = cpu_usage
+            self.memory_usage[i] = memory_usage
+            self.batch_size[i] = batch_size
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+            self.cpu_usage.fill(np.nan)
+            self.memory_usage.fill(np.nan)
+            self.batch_size.fill(0)
+
+    def column(self, name):
+        """Coluna em ordem cronológica (cópia apenas quando o buffer já deu a volta)"""
+        values = getattr(self, name)
+        if self.total <= self.capacity:
+            return values[:self.total]
+        head = self.total % self.capacity
+        return np.concatenate((values[head:], values[:head]))
+
+    def select(self, operation, name='time'):
+        """Valores da coluna name apenas para a operação indicada"""
+        code = _OPERATION_CODES.get(operation)
+        if code is None:
+            return np.empty(0, dtype=getattr(self, name).dtype)
+        n = len(self)
+        return getattr(self, name)[:n][self.operation[:n] == code]
+
+    def summary(self, percentiles=(50, 99)):
+        """Resumo vetorizado por operação: contagem, média/percentis de tempo e bytes processados"""
+        n = len(self)
+        codes = self.operation[:n]
+        durations = self.time[:n]
+        counts = np.bincount(codes, minlength=len(OPERATIONS))
+        time_sums = np.bincount(codes, weights=durations, minlength=len(OPERATIONS))
+        size_sums = np.bincount(codes, weights=self.message_size[:n], minlength=len(OPERATIONS))
+
+        result = {}
+        for code in np.flatnonzero(counts):
+            op_times = durations[codes == code]
+            stats = {
+                'count': int(counts[code]),
+                'mean_time': float(time_sums[code] / counts[code]),
+                'total_size': int(size_sums[code]),
+            }
+            for p, value in zip(percentiles, np.percentile(op_times, percentiles)):
+                stats[f'p{p}_time'] = float(value)
+            result[OPERATIONS[code]] = stats
+        return result
+
+    def mean_time(self, operation):
+        """Tempo médio da operação (0 se não houver registros)"""
+        times = self.select(operation)
+        return float(times.mean()) if len(times) else 0.0
+
+    def to_dicts(self):
+        """Visão de compatibilidade: lista de dicionários no formato do antigo performance_data
+
+        cpu_usage só aparece nos registros que o têm: em sign/verify a CPU é amostrada
+        (OperationAccounting.cpu_sample_every), então médias devem usar só esses registros.
+        """
+        columns = {name: self.column(name).tolist()
+                   for name in ('operation', 'timestamp_ns', 'time', 'message_size',
+                                'cpu_usage', 'memory_usage', 'batch_size')}
+        records = []
+        for i in range(len(columns['operation'])):
+            record = {
+                'operation': OPERATIONS[columns['operation'][i]],
+                'time': columns['time'][i],
+                'message_size': columns['message_size'][i],
+                'timestamp': datetime.fromtimestamp(
+                    (columns['timestamp_ns'][i] + self._wall_offset_ns) / 1e9).isoformat()
+            }
+            # Campos opcionais só aparecem nos registros que os possuem (NaN != NaN)
+            if columns['cpu_usage'][i] == columns['cpu_usage'][i]:
+                record['cpu_usage'] = columns['cpu_usage'][i]
+            if columns['memory_usage'][i] == columns['memory_usage'][i]:
+                record['memory_usage'] = columns['memory_usage'][i]
+            if columns['batch_size'][i]:
+                record['batch_size'] = columns['batch_size'][i]
+            records.append(record)
+        return records
@@ -0,0 +1,204 @@
+"""
+Motor de cifragem AES paralelo (multi-core) para buffers grandes
+Divide o buffer em segmentos alinhados a 16 bytes, calcula o contador CTR de cada
+segmento e cifra os segmentos em um pool de threads (as chamadas ao OpenSSL liberam
+o GIL), escrevendo em um único buffer de saída pré-alocado. No modo GCM os GHASH
+parciais de cada segmento são combinados em GF(2^128) para obter a tag final.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
+import hmac
+import os
+
+BLOCK_SIZE = 16
+GCM_NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+GCM_MAX_BLOCKS = (1 << 32) - 2  # limite do contador de 32 bits do GCM
+# O GHASH parcial de cada parte passa pelo AAD do AESGCM, limitado a 2^31 - 1 bytes:
+# nenhum segmento (nem pedaço do AAD) passa deste tamanho, alinhado ao bloco
+MAX_SEGMENT_SIZE = ((1 << 31) - 1) // BLOCK_SIZE * BLOCK_SIZE
+
+# Polinômio de redução do GCM (x^128 + x^7 + x^2 + x + 1), em ordem de bits refletida
+_GF_R = 0xE1 << 120
+
+
+def gf_mult(x, y):
+    """Multiplicação em GF(2^128) com a convenção de bits do GCM (NIST SP 800-38D)"""
+    z = 0
+    v = y
+    for i in range(127, -1, -1):
+        if (x >> i) & 1:
+            z ^= v
+        v = (v >> 1) ^ _GF_R if v & 1 else v >> 1
+    return z
+
+
+def gf_pow(x, exponent):
+    """Exponenciação em GF(2^128) por quadrados sucessivos"""
+    result = 1 << 127  # elemento neutro (bit mais à esquerda)
+    while exponent:
+        if exponent & 1:
+            result = gf_mult(result, x)
+        x = gf_mult(x, x)
+        exponent >>= 1
+    return result
+
+
+def _blocks(length):
+    return (length + BLOCK_SIZE - 1) // BLOCK_SIZE
+
+
+class ParallelAESCipher:
+    """Cifragem AES-CTR/ECB/GCM de buffers grandes distribuída entre núcleos"""
+
+    def __init__(self, key, workers=None, min_segment_size=256 * 1024, max_segment_size=MAX_SEGMENT_SIZE):
+        self.key = key
+        self.workers = workers or os.cpu_count() or 1
+        # Abaixo deste tamanho por segmento o custo das threads supera o ganho
+        self.min_segment_size = min_segment_size
+        # Acima deste, o buffer é dividido em mais segmentos que workers (limite do AAD no GHASH)
+        self.max_segment_size = min(max_segment_size, MAX_SEGMENT_SIZE) // BLOCK_SIZE * BLOCK_SIZE
+        if self.max_segment_size < BLOCK_SIZE:
+            raise ValueError("max_segment_size deve ter pelo menos um bloco")
+        self.executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._aes = algorithms.AES(key)
+        self._aesgcm = AESGCM(key)
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def segments(self, length):
+        """Divide [0, length) em segmentos alinhados ao bloco, um por worker (até max_segment_size cada)"""
+        segment = max(self.min_segment_size, -(-length // self.workers))
+        segment = min(_blocks(segment) * BLOCK_SIZE, self.max_segment_size)
+        return [(start, min(start + segment, length)) for start in range(0, length, segment)] or [(0, 0)]
+
+    def _run(self, task, segments):
+        """Executa task(início, fim) para cada segmento, em paralelo quando houver mais de um"""
+        if self.executor is None or len(segments) == 1:
+            return [task(start, end) for start, end in segments]
+        return list(self.executor.map(lambda bounds: task(*bounds), segments))
+
+    def _apply(self, make_mode, data):
+        """Cifra data segmento a segmento em um buffer de saída compartilhado"""
+        data = memoryview(data)
+        length = len(data)
+        # Folga de um bloco: versões antigas do cryptography exigem len(buf) >= len(data) + 15
+        output = bytearray(length + BLOCK_SIZE - 1)
+        out_view = memoryview(output)
+
+        def task(start, end):
+            ctx = Cipher(self._aes, make_mode(start // BLOCK_SIZE)).encryptor()
+            ctx.update_into(data[start:end], out_view[start:end + BLOCK_SIZE - 1])
+
+        self._run(task, self.segments(length))
+        out_view.release()
+        del output[length:]
+        return output
+
+    def encrypt_ctr(self, data, nonce):
+        """AES-CTR; nonce é o bloco de contador inicial (16 bytes). Decifrar é a mesma operação."""
+        base = int.from_bytes(nonce, 'big')
+        return self._apply(
+            lambda block: modes.CTR(((base + block) % (1 << 128)).to_bytes(BLOCK_SIZE, 'big')), data)
+
+    decrypt_ctr = encrypt_ctr
+
+    def encrypt_ecb(self, data):
+        """AES-ECB (data deve ser múltiplo de 16 bytes; padding fica a cargo do chamador)"""
+        if len(data) % BLOCK_SIZE:
+            raise ValueError("ECB exige dados múltiplos de 16 bytes")
+        return self._apply(lambda block: modes.ECB(), data)
+
+    def decrypt_ecb(self, data):
+        if len(data) % BLOCK_SIZE:
+            raise ValueError("ECB exige dados múltiplos de 16 bytes")
+        data = memoryview(data)
+        output = bytearray(len(data) + BLOCK_SIZE - 1)
+        out_view = memoryview(output)
+
+        def task(start, end):
+            ctx = Cipher(self._aes, modes.ECB()).decryptor()
+            ctx.update_into(data[start:end], out_view[start:end + BLOCK_SIZE - 1])
+
+        self._run(task, self.segments(len(data)))
+        out_view.release()
+        del output[len(data):]
+        return output
+
+    def _encrypt_block(self, block):
+        ctx = Cipher(self._aes, modes.ECB()).encryptor()
+        return int.from_bytes(ctx.update(block) + ctx.finalize(), 'big')
+
+    def _gcm_counter_mode(self, nonce):
+        # Contador do GCM: nonce || inc32(J0), com J0 = nonce || 1; o 1º bloco de dados usa 2
+        def make_mode(block):
+            return modes.CTR(nonce + ((2 + block) & 0xFFFFFFFF).to_bytes(4, 'big'))
+        return make_mode
+
+    def _gcm_tag(self, nonce, ciphertext, aad):
+        """Calcula a tag GCM combinando GHASH parciais dos segmentos (calculados em paralelo)"""
+        h = self._encrypt_block(bytes(BLOCK_SIZE))
+        fake_nonce = bytes(GCM_NONCE_SIZE)
+        fake_ej0 = self._encrypt_block(fake_nonce + b'\x00\x00\x00\x01')
+        ciphertext = memoryview(ciphertext)
+        aad = memoryview(aad)
+
+        # Cada parte (AAD e segmentos do ciphertext) é preenchida até o bloco separadamente;
+        # cortes alinhados ao bloco não mudam o GHASH, então o AAD grande vira vários pedaços
+        parts = [(aad, (start, min(start + self.max_segment_size, len(aad))))
+                 for start in range(0, len(aad), self.max_segment_size)]
+        parts += [(ciphertext, bounds) for bounds in self.segments(len(ciphertext)) if bounds[1] > bounds[0]]
+
+        def partial_ghash(part):
+            # AESGCM(nonce fixo, texto vazio, aad=parte) = GHASH(parte || L') ^ E(J0');
+            # removendo E(J0') e L'·H obtém-se G = S·H, o estado GHASH da parte vezes H
+            source, bounds = part
+            payload = source[bounds[0]:bounds[1]]
+            tag = int.from_bytes(self._aesgcm.encrypt(fake_nonce, b'', bytes(payload)), 'big')
+            length_block = (len(payload) * 8) << 64
+            return tag ^ fake_ej0 ^ gf_mult(length_block, h), _blocks(len(payload))
+
+        if self.executor is None or len(parts) <= 1:
+            partials = [partial_ghash(part) for part in parts]
+        else:
+            partials = list(self.executor.map(partial_ghash, parts))
+
+        # S·H = soma de G_j · H^(blocos após a parte j)
+        state = 0
+        blocks_after = 0
+        for g, blocks in reversed(partials):
+            state ^= gf_mult(g, gf_pow(h, blocks_after)) if blocks_after else g
+            blocks_after += blocks
+
+        length_block = ((len(aad) * 8) << 64) | (len(ciphertext) * 8)
+        ej0 = self._encrypt_block(nonce + b'\x00\x00\x00\x01')
+        tag = state ^ gf_mult(length_block, h) ^ ej0
+        return tag.to_bytes(GCM_TAG_SIZE, 'big')
+
+    def encrypt_gcm(self, data, nonce, aad=b''):
+        """AES-GCM paralelo; retorna (ciphertext, tag) compatíveis com AESGCM"""
+        if len(nonce) != GCM_NONCE_SIZE:
+            raise ValueError("GCM paralelo exige nonce de 12 bytes")
+        if _blocks(len(data)) > GCM_MAX_BLOCKS:
+            raise ValueError("Dados excedem o limite do GCM (~64 GiB)")
+        ciphertext = self._apply(self._gcm_counter_mode(nonce), data)
+        return ciphertext, self._gcm_tag(nonce, ciphertext, aad)
+
+    def decrypt_gcm(self, ciphertext, nonce, tag, aad=b''):
+        """Verifica a tag (antes de decifrar) e decifra em paralelo"""
+        if len(nonce) != GCM_NONCE_SIZE:
+            raise ValueError("GCM paralelo exige nonce de 12 bytes")
+        if not hmac.compare_digest(self._gcm_tag(nonce, ciphertext, aad), tag):
+            raise InvalidTag()
+        return self._apply(self._gcm_counter_mode(nonce), ciphertext)
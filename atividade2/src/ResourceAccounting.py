@@ -0,0 +1,93 @@
+"""
+Contabilização de recursos por operação sem leituras do sistema inteiro
+Por mensagem, apenas relógios baratos (sem /proc): o tempo de parede monotônico
+(perf_counter_ns) e o tempo de CPU da própria thread (thread_time_ns). O uso de
+CPU registrado é a fração de um núcleo que a thread consumiu durante a operação.
+thread_time_ns é uma chamada de sistema (sem vDSO), então a CPU é lida em uma a
+cada cpu_sample_every operações; nas demais o registro fica sem CPU (NaN), como
+o buffer de métricas já trata. Memória não tem leitura barata e significativa
+por mensagem; ela vem do ResourceSampler opcional, que amostra CPU e memória
+residente do processo em uma thread de fundo e grava no mesmo buffer de
+métricas (operação 'process_sample').
+"""
+
+from time import perf_counter_ns, thread_time_ns
+import threading
+
+import psutil
+
+# Operações por leitura de CPU da thread (1 = todas)
+DEFAULT_CPU_SAMPLE_EVERY = 16
+
+_NAN = float('nan')
+
+
+class OperationAccounting:
+    """Tempo de parede de toda operação e CPU da thread em uma a cada cpu_sample_every"""
+
+    def __init__(self, cpu_sample_every=DEFAULT_CPU_SAMPLE_EVERY):
+        if cpu_sample_every < 1:
+            raise ValueError("cpu_sample_every deve ser pelo menos 1")
+        self.cpu_sample_every = cpu_sample_every
+        # Contagem regressiva até a próxima leitura de CPU (a primeira operação é amostrada).
+        # Sem lock: threads concorrentes podem deslocar uma amostra, nunca travar a contagem.
+        self._countdown = 1
+
+    def start(self):
+        """Marca o início da operação: (parede, CPU da thread) em ns; CPU é None se não amostrada"""
+        countdown = self._countdown - 1
+        if countdown > 0:
+            self._countdown = countdown
+            return perf_counter_ns(), None
+        self._countdown = self.cpu_sample_every
+        return perf_counter_ns(), thread_time_ns()
+
+    def end(self, started):
+        """(duração em segundos, CPU da thread em % de um núcleo ou NaN) desde start"""
+        wall_start, cpu_start = started
+        if cpu_start is None:
+            return (perf_counter_ns() - wall_start) / 1e9, _NAN
+        # CPU lida antes da parede: a janela de CPU fica contida na de parede (no máximo 100%)
+        cpu_ns = thread_time_ns() - cpu_start
+        wall_ns = perf_counter_ns() - wall_start
+        return wall_ns / 1e9, (cpu_ns * 100.0 / wall_ns if wall_ns else 0.0)
+
+
+class ResourceSampler:
+    """Amostra CPU (%) e memória residente (bytes) do processo a cada interval segundos"""
+
+    def __init__(self, metrics, interval=1.0):
+        if interval <= 0:
+            raise ValueError("interval deve ser positivo")
+        self.metrics = metrics
+        self.interval = interval
+        self.latest = None  # Última amostra, para /performance
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Lê e registra uma amostra do processo; retorna o dicionário da amostra"""
+        cpu_percent = self._process.cpu_percent(None)
+        rss = self._process.memory_info().rss
+        self.metrics.record('process_sample', 0.0, 0, cpu_usage=cpu_percent, memory_usage=rss)
+        self.latest = {'cpu_percent': cpu_percent, 'rss_bytes': rss, 'threads': self._process.num_threads()}
+        return self.latest
+
+    def _run(self):
+        self._process.cpu_percent(None)  # A primeira leitura só inicia a janela de medição
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
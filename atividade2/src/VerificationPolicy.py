@@ -0,0 +1,61 @@
+"""
+Política de verificação das mensagens assinadas pelo próprio servidor
+O chat assina e, por padrão, verifica a mesma mensagem antes da difusão: uma
+verificação de assinatura, a decifragem e o hash a mais no caminho crítico para
+uma assinatura que o servidor acabou de produzir. As políticas:
+- always: verifica antes da difusão (comportamento original)
+- deferred: difunde já e verifica fora do caminho crítico (evento 'verified')
+- sampled: verifica em segundo plano apenas uma fração das mensagens (monitoramento)
+- client: os destinatários verificam no navegador (WebCrypto) sobre o texto
+  exibido; vale para envelopes CBC, cuja assinatura cobre o digest do texto. Nos
+  modos AEAD a assinatura cobre o frame cifrado, que o navegador não consegue ligar ao
+  texto sem a chave da sala, então esses envelopes caem para deferred.
+"""
+
+import random
+import threading
+
+from AESCipher import AEAD_MODES
+
+POLICIES = ('always', 'deferred', 'sampled', 'client')
+DEFAULT_SAMPLE_RATE = 0.1
+
+# Destinos de cada mensagem
+INLINE = 'inline'  # verificada antes da difusão
+BACKGROUND = 'background'  # verificada depois da difusão
+CLIENT = 'client'  # verificada pelos destinatários
+SKIP = 'skip'  # não verificada (fora da amostra)
+
+
+class VerificationPolicy:
+    """Decide onde cada mensagem é verificada e conta as decisões"""
+
+    def __init__(self, policy='always', sample_rate=DEFAULT_SAMPLE_RATE, rng=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de verificação desconhecida: {policy} ({', '.join(POLICIES)})")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate deve estar entre 0 e 1")
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.counts = {INLINE: 0, BACKGROUND: 0, CLIENT: 0, SKIP: 0}
+
+    def plan(self, signed_message):
+        """INLINE, BACKGROUND, CLIENT ou SKIP para a mensagem"""
+        if self.policy == 'always':
+            plan = INLINE
+        elif self.policy == 'deferred':
+            plan = BACKGROUND
+        elif self.policy == 'sampled':
+            plan = BACKGROUND if self._rng.random() < self.sample_rate else SKIP
+        elif signed_message.get('mode', 'cbc') in AEAD_MODES:
+            plan = BACKGROUND
+        else:
+            plan = CLIENT
+        with self._lock:
+            self.counts[plan] += 1
+        return plan
+
+    def stats(self):
+        return {'policy': self.policy, 'sample_rate': self.sample_rate, **self.counts}
@@ -0,0 +1,959 @@
+"""
+Benchmarks das camadas criptográficas do chat
+Cada benchmark retorna uma lista de dicionários (uma linha por cenário)
+"""
+
+from concurrent.futures import Future
+import csv
+import logging
+import os
+import random
+import tempfile
+import time
+
+import utils
+from AESCipher import AESCipher
+from CertificateManager import CertificateManager, SIG_ALGORITHMS
+from MessagesSigner import MessageSigner
+from LatencyHistogram import LatencyHistogram
+from MetricsRing import MetricsRing
+from KeyManager import SessionKeyManager
+from CryptoExecutor import CryptoExecutor
+from CertificateCache import PrivateKeyCache, VerificationCache
+from CertificateRegistry import CertificateRegistry, envelope_size
+from crypto_logging import configure_logging, TRACE
+
+BENCH_USER = 'bench'
+
+
+def create_bench_signer(username=BENCH_USER, cert_dir=None, mode='cbc', **signer_kwargs):
+    """Cria CertificateManager, AESCipher e MessageSigner isolados em um diretório temporário"""
+    # Medições sintéticas não devem entrar em data/real_chat_metrics.csv
+    utils.collect_metrics = False
+    cert_manager = CertificateManager(cert_dir or tempfile.mkdtemp(prefix='chat_bench_'))
+    if not os.path.exists(os.path.join(cert_manager.cert_dir, f"{username}.p12")):
+        cert_manager.generate_certificate(username, 'Benchmark')
+    aes_cipher = AESCipher(mode=mode)
+    return cert_manager, aes_cipher, MessageSigner(cert_manager, aes_cipher, **signer_kwargs)
+
+
+def message_sizes(count, seed=0):
+    """Amostra tamanhos de mensagem da distribuição real do chat (data/real_chat_metrics.csv)"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'data', 'real_chat_metrics.csv')
+    sizes = []
+    if os.path.exists(path):
+        with open(path, newline='') as f:
+            sizes = [int(row['message_size_chars']) for row in csv.DictReader(f)
+                     if row.get('message_size_chars')]
+    rng = random.Random(seed)
+    if not sizes:
+        return [rng.randint(9, 60) for _ in range(count)]
+    return [rng.choice(sizes) for _ in range(count)]
+
+
+def sample_messages(count, seed=0):
+    """Mensagens de texto com tamanhos da distribuição real do chat"""
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz áéíóúãõç'
+    return [''.join(rng.choice(alphabet) for _ in range(size)) for size in message_sizes(count, seed)]
+
+
+def latency_summary(samples, prefix=''):
+    """Resumo de latências (µs) via LatencyHistogram"""
+    hist = LatencyHistogram(unit=1e-9)
+    hist.record_many(samples)
+    return {
+        f'{prefix}n': hist.total_count,
+        f'{prefix}mean_us': hist.mean() * 1e6,
+        f'{prefix}p50_us': hist.percentile(50) * 1e6,
+        f'{prefix}p99_us': hist.percentile(99) * 1e6,
+    }
+
+
+def save_benchmark_results(name, rows):
+    """Salva as linhas do benchmark em data/benchmark_<name>.csv"""
+    if not rows:
+        return None
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'benchmark_{name}.csv')
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def benchmark_logging(messages=200):
+    """Latência por mensagem com o rastreamento (TRACE) desligado, ligado e ligado com fila"""
+    _, aes_cipher, signer = create_bench_signer()
+    texts = sample_messages(messages)
+    rows = []
+
+    with open(os.devnull, 'w') as devnull:
+        for scenario, level, queued in (('desligado', logging.WARNING, False),
+                                        ('trace', TRACE, False),
+                                        ('trace_fila', TRACE, True)):
+            configure_logging(level, queued=queued, stream=devnull)
+            aes_samples, signer_samples = [], []
+            for text in texts:
+                start = time.perf_counter()
+                aes_cipher.decrypt(aes_cipher.encrypt(text))
+                aes_samples.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                signer.verify_message(signer.sign_message(BENCH_USER, text))
+                signer_samples.append(time.perf_counter() - start)
+            rows.append({'scenario': scenario,
+                         **latency_summary(aes_samples, 'aes_'),
+                         **latency_summary(signer_samples, 'sign_verify_')})
+
+    configure_logging(logging.WARNING)
+    return rows
+
+
+def benchmark_aead(messages=200):
+    """CBC + SHA-256 (três passagens) contra AEAD de passagem única, na distribuição real de tamanhos"""
+    texts = sample_messages(messages)
+    cert_dir = tempfile.mkdtemp(prefix='chat_bench_')
+    aad = BENCH_USER.encode('utf-8')
+    rows = []
+    
+    for mode in ('cbc', 'gcm', 'chacha20'):
+        _, aes_cipher, signer = create_bench_signer(cert_dir=cert_dir, mode=mode)
+        protect_samples, unprotect_samples, full_samples = [], [], []
+        for text in texts:
+            # Camada de proteção isolada (sem RSA nem carga do certificado)
+            start = time.perf_counter()
+            if aes_cipher.is_aead:
+                encrypted = aes_cipher.encrypt_aead(text, aad=aad)[0]
+            else:
+                digest = signer.compute_hash(text)
+                encrypted = aes_cipher.encrypt(text)
+            protect_samples.append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            if aes_cipher.is_aead:
+                aes_cipher.decrypt_aead(encrypted, aad=aad)
+            else:
+                valid = signer.compute_hash(aes_cipher.decrypt(encrypted)) == digest
+            unprotect_samples.append(time.perf_counter() - start)
+            
+            # Fluxo completo: assinatura + verificação
+            start = time.perf_counter()
+            signer.verify_message(signer.sign_message(BENCH_USER, text))
+            full_samples.append(time.perf_counter() - start)
+        
+        rows.append({'mode': mode,
+                     **latency_summary(protect_samples, 'protect_'),
+                     **latency_summary(unprotect_samples, 'unprotect_'),
+                     **latency_summary(full_samples, 'sign_verify_')})
+    return rows
+
+
+def benchmark_batch(batch_sizes=(100, 1000, 10000), repeats=3):
+    """Mensagens/s de encrypt_many/decrypt_many contra o laço de encrypt/decrypt por mensagem"""
+    utils.collect_metrics = False
+    rows = []
+    
+    for mode in ('cbc', 'gcm', 'chacha20'):
+        aes_cipher = AESCipher(mode=mode)
+        for batch_size in batch_sizes:
+            texts = sample_messages(batch_size)
+            loop_enc = loop_dec = batch_enc = batch_dec = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                encrypted = [aes_cipher.encrypt(text) for text in texts]
+                loop_enc = min(loop_enc, time.perf_counter() - start)
+                start = time.perf_counter()
+                [aes_cipher.decrypt(item) for item in encrypted]
+                loop_dec = min(loop_dec, time.perf_counter() - start)
+                
+                start = time.perf_counter()
+                batch = aes_cipher.encrypt_many(texts)
+                batch_enc = min(batch_enc, time.perf_counter() - start)
+                start = time.perf_counter()
+                aes_cipher.decrypt_many(batch)
+                batch_dec = min(batch_dec, time.perf_counter() - start)
+                aes_cipher.metrics.clear()
+            
+            rows.append({'mode': mode, 'batch_size': batch_size,
+                         'loop_encrypt_msgs_s': batch_size / loop_enc,
+                         'batch_encrypt_msgs_s': batch_size / batch_enc,
+                         'loop_decrypt_msgs_s': batch_size / loop_dec,
+                         'batch_decrypt_msgs_s': batch_size / batch_dec,
+                         'encrypt_speedup': loop_enc / batch_enc,
+                         'decrypt_speedup': loop_dec / batch_dec})
+    return rows
+
+
+def benchmark_binary(messages=2000):
+    """API texto (UTF-8 + base64) contra a API binária (frames): latência e bytes trafegados"""
+    utils.collect_metrics = False
+    texts = sample_messages(messages)
+    payloads = [text.encode('utf-8') for text in texts]
+    rows = []
+    
+    for mode in ('cbc', 'gcm', 'chacha20'):
+        aes_cipher = AESCipher(mode=mode)
+        for api in ('texto', 'binario'):
+            samples, wire_bytes = [], 0
+            for text, payload in zip(texts, payloads):
+                start = time.perf_counter()
+                if api == 'texto':
+                    encrypted = aes_cipher.encrypt(text)
+                    aes_cipher.decrypt(encrypted)
+                else:
+                    encrypted = aes_cipher.encrypt_bytes(payload)
+                    aes_cipher.decrypt_bytes(encrypted)
+                samples.append(time.perf_counter() - start)
+                wire_bytes += len(encrypted)
+            aes_cipher.metrics.clear()
+            rows.append({'mode': mode, 'api': api,
+                         'mean_wire_bytes': wire_bytes / messages,
+                         'mean_plaintext_bytes': sum(map(len, payloads)) / messages,
+                         **latency_summary(samples, 'roundtrip_')})
+    return rows
+
+
+def benchmark_metrics(records=(10_000, 100_000, 1_000_000), capacity=65536):
+    """Custo de registrar e resumir métricas: lista de dicionários contra o buffer circular"""
+    from datetime import datetime
+    import tracemalloc
+    
+    operations = ('aes_encrypt', 'aes_decrypt', 'hash', 'sign_complete', 'verify_complete')
+    
+    def fill_list(count):
+        # Formato antigo: um dicionário (com timestamp ISO) por operação, sem limite
+        data = []
+        for i in range(count):
+            data.append({'operation': operations[i % 5], 'time': 1e-4, 'message_size': 32,
+                         'timestamp': datetime.now().isoformat()})
+        return data
+    
+    def fill_ring(count):
+        ring = MetricsRing(capacity)
+        for i in range(count):
+            ring.record(operations[i % 5], 1e-4, 32)
+        return ring
+    
+    def measure(fill, count):
+        start = time.perf_counter()
+        store = fill(count)
+        elapsed = time.perf_counter() - start
+        del store
+        tracemalloc.start()
+        store = fill(count)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return store, elapsed / count * 1e9, memory / 1e6
+    
+    rows = []
+    for count in records:
+        data, list_record_ns, list_memory_mb = measure(fill_list, count)
+        start = time.perf_counter()
+        for operation in operations:
+            ops = [d for d in data if d['operation'] == operation]
+            sum(d['time'] for d in ops) / max(1, len(ops))
+        list_summary = time.perf_counter() - start
+        del data
+        
+        ring, ring_record_ns, ring_memory_mb = measure(fill_ring, count)
+        start = time.perf_counter()
+        ring.summary()
+        ring_summary = time.perf_counter() - start
+        
+        rows.append({'records': count,
+                     'list_record_ns': list_record_ns,
+                     'ring_record_ns': ring_record_ns,
+                     'list_summary_ms': list_summary * 1e3,
+                     'ring_summary_ms': ring_summary * 1e3,
+                     'list_memory_mb': list_memory_mb,
+                     'ring_memory_mb': ring_memory_mb})
+    return rows
+
+
+class _PatternSource:
+    """Arquivo sintético de size bytes (bloco aleatório repetido), sem materializar o conteúdo"""
+    
+    def __init__(self, size, block):
+        self.remaining = size
+        self.block = block
+    
+    def read(self, size=-1):
+        size = min(self.remaining, len(self.block), size if size >= 0 else self.remaining)
+        self.remaining -= size
+        return self.block[:size]
+
+
+class _NullSink:
+    def write(self, data):
+        return len(data)
+
+
+def benchmark_stream(sizes_mb=(1, 16, 256, 1024), chunk_size=64 * 1024, whole_limit_mb=256):
+    """Vazão e pico de memória (tracemalloc) da cifragem em fluxo de anexos de 1 MB a 1 GB
+    
+    Para comparação, tamanhos até whole_limit_mb também são cifrados de uma vez em memória.
+    """
+    import tracemalloc
+    from AESStream import encrypt_chunks, decrypt_chunks, encrypt_file, read_chunks
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    
+    key = os.urandom(32)
+    block = os.urandom(1 << 20)
+    rows = []
+    for size_mb in sizes_mb:
+        size = size_mb * 1024 * 1024
+        
+        def run(label, func):
+            tracemalloc.start()
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append({'size_mb': size_mb, 'api': label, 'throughput_mb_s': size_mb / elapsed,
+                         'peak_memory_mb': peak / 1e6})
+        
+        run('stream_encrypt', lambda: encrypt_file(key, _PatternSource(size, block), _NullSink(), chunk_size=chunk_size))
+        # Ida e volta encadeadas: o receptor verifica cada chunk assim que ele chega
+        run('stream_roundtrip', lambda: sum(len(chunk) for chunk in decrypt_chunks(
+            key, encrypt_chunks(key, read_chunks(_PatternSource(size, block), chunk_size), chunk_size=chunk_size))))
+        if size_mb <= whole_limit_mb:
+            def whole():
+                data = b''.join(read_chunks(_PatternSource(size, block)))
+                AESGCM(key).encrypt(os.urandom(12), data, None)
+            run('inteiro_encrypt', whole)
+    return rows
+
+
+def benchmark_sessions(sessions=(1000, 10000), cache_sizes=(256, 1024, 4096), messages=20000, mode='gcm'):
+    """Chaves por sessão: latência por mensagem com cache LRU + TTL de cifradores contra preparar a cada mensagem
+    
+    As sessões são acessadas com popularidade tipo Zipf (poucas salas concentram o tráfego).
+    """
+    utils.collect_metrics = False
+    texts = sample_messages(messages)
+    metrics = MetricsRing(1024)
+    rows = []
+    
+    for session_count in sessions:
+        rng = random.Random(session_count)
+        order = rng.choices(range(session_count), weights=[1 / (rank + 1) for rank in range(session_count)],
+                            k=messages)
+        
+        # Referência: AESCipher novo (objetos AEAD preparados) em toda mensagem
+        keys = {session: os.urandom(32) for session in range(session_count)}
+        samples = []
+        for session, text in zip(order, texts):
+            start = time.perf_counter()
+            AESCipher(mode=mode, metrics=metrics, key=keys[session]).encrypt(text)
+            samples.append(time.perf_counter() - start)
+        rows.append({'sessions': session_count, 'cache_size': 0, 'hit_rate': 0.0,
+                     **latency_summary(samples, 'encrypt_')})
+        
+        for cache_size in cache_sizes:
+            manager = SessionKeyManager(mode=mode, max_cached=cache_size, metrics=metrics)
+            for session in range(session_count):
+                manager.create_session(session)
+            samples = []
+            for session, text in zip(order, texts):
+                start = time.perf_counter()
+                manager.cipher(session).encrypt(text)
+                samples.append(time.perf_counter() - start)
+            stats = manager.stats()
+            rows.append({'sessions': session_count, 'cache_size': cache_size, 'hit_rate': stats['hit_rate'],
+                         **latency_summary(samples, 'encrypt_'), 'evictions': stats['evictions']})
+    return rows
+
+
+def benchmark_keycache(messages=200):
+    """Latência de sign_message carregando o .p12 a cada mensagem contra o cache de chaves privadas"""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    
+    cert_manager, _, signer = create_bench_signer()
+    texts = sample_messages(messages)
+    rows = []
+    
+    for scenario, cache in (('sem_cache', PrivateKeyCache(cert_manager.cert_dir, max_entries=0)),
+                            ('cache', PrivateKeyCache(cert_manager.cert_dir)),
+                            ('cache_wipe_load_buffer',
+                             PrivateKeyCache(cert_manager.cert_dir, wipe_load_buffer=True))):
+        signer.key_cache = cache
+        samples = []
+        for text in texts:
+            start = time.perf_counter()
+            signer.sign_message(BENCH_USER, text)
+            samples.append(time.perf_counter() - start)
+        rows.append({'scenario': scenario, **latency_summary(samples, 'sign_'),
+                     'hit_rate': cache.stats()['hit_rate']})
+    
+    # Piso: apenas a operação RSA-PSS
+    private_key = signer.key_cache.get(BENCH_USER)[0]
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        private_key.sign(text.encode('utf-8'),
+                         padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
+                         hashes.SHA256())
+        samples.append(time.perf_counter() - start)
+    rows.append({'scenario': 'somente_rsa', **latency_summary(samples, 'sign_')})
+    return rows
+
+
+def benchmark_verifycache(messages=200):
+    """Latência de verify_message parseando o PEM a cada mensagem contra o cache por impressão digital"""
+    _, _, signer = create_bench_signer()
+    envelopes = [signer.sign_message(BENCH_USER, text) for text in sample_messages(messages)]
+    rows = []
+    
+    for scenario, cache in (('sem_cache', VerificationCache(max_entries=0)), ('cache', VerificationCache())):
+        signer.verify_cache = cache
+        samples, parse_samples = [], []
+        for envelope in envelopes:
+            start = time.perf_counter()
+            signer.verify_message(envelope)
+            samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            cache.lookup_pem(envelope['certificate'])
+            parse_samples.append(time.perf_counter() - start)
+        rows.append({'scenario': scenario, **latency_summary(samples, 'verify_'),
+                     **latency_summary(parse_samples, 'cert_lookup_'), 'hit_rate': cache.stats()['hit_rate']})
+    return rows
+
+
+def benchmark_certref(messages=200, recipients=50):
+    """Bytes por envelope, egresso do fan-out e latência de verificação: PEM embutido x impressão digital
+
+    O egresso considera cada envelope retransmitido a recipients pares, mais (por referência)
+    uma busca do PEM por par; a verificação por referência é medida no miss e no acerto.
+    """
+    cert_manager, aes_cipher, _ = create_bench_signer()
+    texts = sample_messages(messages)
+    rows = []
+    
+    for scenario in ('embutido', 'referencia'):
+        registry = CertificateRegistry() if scenario == 'referencia' else None
+        signer = MessageSigner(cert_manager, aes_cipher, registry=registry)
+        envelopes = [signer.sign_message(BENCH_USER, text) for text in texts]
+        sizes = [envelope_size(envelope) for envelope in envelopes]
+        fetch_bytes = 0
+        if registry is not None:
+            fetch_bytes = sum(len(registry.lookup(fp).encode('ascii')) for fp in
+                              {envelope['cert_fingerprint'] for envelope in envelopes})
+        miss_samples, hit_samples = [], []
+        for envelope in envelopes:
+            signer.verify_cache = VerificationCache()
+            start = time.perf_counter()
+            signer.verify_message(envelope)
+            miss_samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            signer.verify_message(envelope)
+            hit_samples.append(time.perf_counter() - start)
+        rows.append({
+            'scenario': scenario,
+            'messages': messages,
+            'recipients': recipients,
+            'envelope_bytes_mean': sum(sizes) / len(sizes),
+            'egress_bytes': sum(sizes) * recipients + fetch_bytes * recipients,
+            **latency_summary(miss_samples, 'verify_miss_'),
+            **latency_summary(hit_samples, 'verify_hit_'),
+        })
+    return rows
+
+
+def benchmark_prehashed(messages=300):
+    """Assinatura sobre a string hex do hash (sig_version 1) x digest binário Prehashed (sig_version 2)
+
+    digest_us e digest_alloc_bytes isolam a preparação da entrada do RSA (hashes e objetos
+    alocados por mensagem); sign/verify são as latências completas do MessageSigner.
+    """
+    import hashlib
+    import tracemalloc
+    from MessagesSigner import SIG_VERSION_HEX, SIG_VERSION_PREHASHED
+    
+    cert_manager, aes_cipher, _ = create_bench_signer()
+    texts = sample_messages(messages)
+    payloads = [text.encode('utf-8') for text in texts]
+    preparations = {
+        # v1: hash da mensagem, hex, encode e o SHA-256 interno do RSA sobre os 64 bytes
+        SIG_VERSION_HEX: lambda data: hashlib.sha256(hashlib.sha256(data).hexdigest().encode('utf-8')).digest(),
+        SIG_VERSION_PREHASHED: lambda data: hashlib.sha256(data).digest(),
+    }
+    rows = []
+    
+    for sig_version, prepare in preparations.items():
+        signer = MessageSigner(cert_manager, aes_cipher, sig_version=sig_version)
+        digest_samples = []
+        for data in payloads:
+            start = time.perf_counter()
+            prepare(data)
+            digest_samples.append(time.perf_counter() - start)
+        # Pico de alocação por mensagem em passagem separada (tracemalloc distorce os tempos)
+        tracemalloc.start()
+        allocated = 0
+        for data in payloads:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            prepare(data)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        allocated /= len(payloads)
+        
+        sign_samples, verify_samples = [], []
+        for text in texts:
+            start = time.perf_counter()
+            envelope = signer.sign_message(BENCH_USER, text)
+            sign_samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            assert signer.verify_message(envelope)
+            verify_samples.append(time.perf_counter() - start)
+        rows.append({
+            'sig_version': sig_version,
+            'hash_passes': 2 if sig_version == SIG_VERSION_HEX else 1,
+            **latency_summary(digest_samples, 'digest_'),
+            'digest_alloc_bytes': allocated,
+            **latency_summary(sign_samples, 'sign_'),
+            **latency_summary(verify_samples, 'verify_'),
+        })
+    return rows
+
+
+def benchmark_executor(senders=8, messages_per_sender=25, workers=(0, 2, 4), think_ms=20.0):
+    """Teste de carga: remetentes concorrentes e um único despachante de eventos (como o worker do Socket.IO)
+
+    Com workers=0 o despachante assina e verifica no próprio handler; nos demais cenários
+    ele só enfileira no CryptoExecutor. latency_* mede da chegada da mensagem à entrega
+    (em ordem, como no chat); handler_* mede quanto tempo o despachante fica ocupado por evento.
+    """
+    import queue
+    import threading
+    
+    cert_manager, aes_cipher, _ = create_bench_signer()
+    usernames = [f"{BENCH_USER}{i}" for i in range(senders)]
+    for username in usernames:
+        cert_manager.generate_certificate(username, 'Benchmark')
+    texts = sample_messages(messages_per_sender)
+    rows = []
+    
+    for max_workers in workers:
+        metrics = MetricsRing()
+        signer = MessageSigner(cert_manager, aes_cipher, metrics=metrics)
+        executor = CryptoExecutor(max_workers=max_workers, metrics=metrics)
+        for username in usernames:
+            signer.key_cache.get(username)  # Chaves já carregadas: mede só a concorrência
+        events = queue.Queue()
+        latencies, handler_times = [], []
+        done = threading.Semaphore(0)
+        
+        def process(arrival, username, text):
+            signer.verify_message(signer.sign_message(username, text))
+            return arrival
+        
+        def deliver(arrival):
+            latencies.append(time.perf_counter() - arrival)
+            done.release()
+        
+        def sender(username, seed):
+            rng = random.Random(seed)
+            for text in texts:
+                events.put((time.perf_counter(), username, text))
+                time.sleep(rng.expovariate(1000.0 / think_ms))
+        
+        def dispatcher():
+            for _ in range(senders * messages_per_sender):
+                arrival, username, text = events.get()
+                start = time.perf_counter()
+                executor.submit_ordered('chat', deliver, process, arrival, username, text)
+                handler_times.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        threads = [threading.Thread(target=sender, args=(username, i)) for i, username in enumerate(usernames)]
+        threads.append(threading.Thread(target=dispatcher))
+        for thread in threads:
+            thread.start()
+        for _ in range(senders * messages_per_sender):
+            done.acquire()
+        elapsed = time.perf_counter() - start
+        for thread in threads:
+            thread.join()
+        executor.shutdown()
+        
+        rows.append({
+            'workers': max_workers,
+            'senders': senders,
+            'messages': len(latencies),
+            'messages_per_s': len(latencies) / elapsed,
+            **latency_summary(latencies, 'latency_'),
+            **latency_summary(handler_times, 'handler_'),
+            'max_queue_depth': executor.max_pending,
+            'mean_wait_us': metrics.mean_time('executor_wait') * 1e6,
+        })
+    return rows
+
+
+def benchmark_verifybatch(messages=2000, senders=4, workers=(1, 2, 4)):
+    """Vazão de verificação de um histórico: verify_message em série x verify_batch por número de processos
+
+    O tempo do verify_batch inclui a criação do pool (processos spawn). cpu_count indica até
+    onde a escala é possível neste host.
+    """
+    cert_manager, aes_cipher, signer = create_bench_signer(mode='gcm')
+    usernames = [f"{BENCH_USER}{i}" for i in range(senders)]
+    for username in usernames:
+        cert_manager.generate_certificate(username, 'Benchmark')
+    texts = sample_messages(messages)
+    envelopes = [signer.sign_message(usernames[i % senders], text) for i, text in enumerate(texts)]
+    rows = []
+    
+    def run(scenario, n_workers, verify_all):
+        signer.verify_cache = VerificationCache()
+        start = time.perf_counter()
+        results = verify_all()
+        elapsed = time.perf_counter() - start
+        assert all(results)
+        rows.append({'scenario': scenario, 'workers': n_workers, 'cpu_count': os.cpu_count(),
+                     'messages': messages, 'seconds': elapsed, 'messages_per_s': messages / elapsed,
+                     'speedup': rows[0]['seconds'] / elapsed if rows else 1.0})
+    
+    run('serial', 1, lambda: [signer.verify_message(envelope) for envelope in envelopes])
+    for n_workers in workers:
+        run('verify_batch', n_workers, lambda: signer.verify_batch(envelopes, workers=n_workers))
+    return rows
+
+
+def benchmark_sigalg(messages=200, keygens=5):
+    """RSA-2048 x ECDSA P-256 x Ed25519: geração de certificado, latência fim a fim e tamanho do envelope"""
+    from CertificateRegistry import envelope_size
+    
+    cert_manager, aes_cipher, signer = create_bench_signer()
+    texts = sample_messages(messages)
+    rows = []
+    
+    for algorithm in SIG_ALGORITHMS:
+        keygen_samples = []
+        for i in range(keygens):
+            start = time.perf_counter()
+            cert_manager.generate_certificate(f"{algorithm}{i}", 'Benchmark', algorithm=algorithm)
+            keygen_samples.append(time.perf_counter() - start)
+        username = f"{algorithm}0"
+        signer.key_cache.get(username)  # Chave já em cache: mede só sign/verify
+        sign_samples, verify_samples, total_samples, sizes = [], [], [], []
+        for text in texts:
+            start = time.perf_counter()
+            envelope = signer.sign_message(username, text)
+            signed = time.perf_counter()
+            assert signer.verify_message(envelope)
+            end = time.perf_counter()
+            sign_samples.append(signed - start)
+            verify_samples.append(end - signed)
+            total_samples.append(end - start)
+            sizes.append(envelope_size(envelope))
+        rows.append({
+            'sig_alg': algorithm,
+            'keygen_ms': sum(keygen_samples) / len(keygen_samples) * 1e3,
+            **latency_summary(sign_samples, 'sign_'),
+            **latency_summary(verify_samples, 'verify_'),
+            **latency_summary(total_samples, 'e2e_'),
+            'signature_bytes': len(envelope['signature']) // 2,
+            'envelope_bytes_mean': sum(sizes) / len(sizes),
+        })
+    return rows
+
+
+def benchmark_verifypolicy(messages=300, interval_ms=2.0, workers=2, sample_rate=0.1):
+    """Latência de difusão (chegada -> new_message) sob cada política de verificação do chat
+
+    Reproduz o caminho do chat: assinatura no CryptoExecutor, difusão em ordem e, nas políticas
+    deferred/sampled, verificação enfileirada após a difusão (verified_* mede até o evento
+    'verified'). Na política client o custo da verificação sai do servidor e vai para o navegador.
+    """
+    import threading
+    from VerificationPolicy import POLICIES, VerificationPolicy, INLINE, BACKGROUND
+    
+    _, _, signer = create_bench_signer()
+    texts = sample_messages(messages)
+    rows = []
+    
+    for policy_name in POLICIES:
+        policy = VerificationPolicy(policy_name, sample_rate=sample_rate, rng=random.Random(0))
+        executor = CryptoExecutor(max_workers=workers)
+        broadcast_samples, verified_samples = [], []
+        finished = threading.Semaphore(0)
+        
+        def process(arrival, text):
+            envelope = signer.sign_message(BENCH_USER, text)
+            plan = policy.plan(envelope)
+            if plan == INLINE:
+                signer.verify_message(envelope)
+            return arrival, plan, envelope
+        
+        def verify_later(arrival, envelope):
+            signer.verify_message(envelope)
+            verified_samples.append(time.perf_counter() - arrival)
+            finished.release()
+        
+        def broadcast(result):
+            arrival, plan, envelope = result
+            broadcast_samples.append(time.perf_counter() - arrival)
+            if plan == BACKGROUND:
+                executor.submit(verify_later, arrival, envelope)
+            else:
+                finished.release()
+        
+        start = time.perf_counter()
+        for text in texts:
+            executor.submit_ordered('chat', broadcast, process, time.perf_counter(), text)
+            time.sleep(interval_ms / 1000)
+        for _ in texts:
+            finished.acquire()
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+        
+        rows.append({
+            'policy': policy_name,
+            'messages': messages,
+            'server_verifications': policy.counts[INLINE] + policy.counts[BACKGROUND],
+            'messages_per_s': messages / elapsed,
+            **latency_summary(broadcast_samples, 'broadcast_'),
+            **(latency_summary(verified_samples, 'verified_') if verified_samples else {}),
+        })
+    return rows
+
+
+def benchmark_accounting(iterations=200000, psutil_iterations=2000, messages=200):
+    """Custo por mensagem da contabilização: leituras psutil do sistema (antes) x relógios da thread (agora)
+
+    overhead_us é o par início/fim de uma mensagem; cpu_1_em_N lê a CPU da thread em uma a
+    cada N mensagens (thread_time_ns é uma chamada de sistema). sign_mean_us é o
+    sign_message completo com a contabilização padrão. A linha sampler mede uma amostra do
+    ResourceSampler (em segundo plano, fora do caminho das mensagens).
+    """
+    import psutil
+    from ResourceAccounting import OperationAccounting, ResourceSampler, DEFAULT_CPU_SAMPLE_EVERY
+    
+    def psutil_pair():
+        start_cpu, start_memory = psutil.cpu_percent(), psutil.virtual_memory().used
+        return psutil.cpu_percent() - start_cpu, psutil.virtual_memory().used - start_memory
+    
+    def clock_pair(every):
+        accounting = OperationAccounting(every)
+        return lambda: accounting.end(accounting.start())
+    
+    _, _, signer = create_bench_signer()
+    texts = sample_messages(messages)
+    signer.sign_message(BENCH_USER, texts[0])
+    start = time.perf_counter()
+    for text in texts:
+        signer.sign_message(BENCH_USER, text)
+    sign_mean_us = (time.perf_counter() - start) / len(texts) * 1e6
+    
+    scenarios = [('psutil', psutil_pair, psutil_iterations)]
+    scenarios += [(f'cpu_1_em_{every}', clock_pair(every), iterations)
+                  for every in sorted({1, 4, 8, DEFAULT_CPU_SAMPLE_EVERY, 32})]
+    scenarios.append(('sampler', ResourceSampler(MetricsRing(1024)).sample, psutil_iterations))
+    rows = []
+    for scenario, func, count in scenarios:
+        # Menor média entre 5 repetições (o host é compartilhado)
+        overhead_us = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(count):
+                func()
+            overhead_us = min(overhead_us, (time.perf_counter() - start) / count * 1e6)
+        rows.append({'scenario': scenario, 'iterations': count, 'overhead_us': overhead_us,
+                     'under_1us': overhead_us < 1.0,
+                     'sign_mean_us': sign_mean_us if scenario == f'cpu_1_em_{DEFAULT_CPU_SAMPLE_EVERY}' else None})
+    return rows
+
+
+def benchmark_merkle(messages=400, windows_ms=(1.0, 5.0, 20.0), max_batch=64, interval_ms=0.5):
+    """Assinatura em lote (Merkle) x uma assinatura por mensagem, por tamanho da janela
+
+    burst_*: todas as mensagens enviadas de uma vez (assinaturas/s); paced_*: uma mensagem a
+    cada interval_ms, latência do envio até o envelope pronto (a janela soma até window_ms).
+    verify_signature_*: verificações que conferem uma assinatura (toda mensagem na linha de base,
+    a primeira de cada lote com Merkle); verify_cached_*: as demais, que só recalculam a prova. window_ms vazio é a linha de base (sign_message, sem lote).
+    """
+    from MerkleBatch import BatchSigner
+    
+    cert_manager, aes_cipher, signer = create_bench_signer()
+    signer.key_cache.get(BENCH_USER)
+    texts = sample_messages(messages)
+    rows = []
+    
+    for window_ms in (None,) + tuple(windows_ms):
+        if window_ms is None:
+            def submit(text):
+                future = Future()
+                future.set_result(signer.sign_message(BENCH_USER, text))
+                return future
+            batcher = None
+        else:
+            batcher = BatchSigner(signer, window_ms=window_ms, max_batch=max_batch)
+            submit = lambda text: batcher.submit(BENCH_USER, text)
+        
+        start = time.perf_counter()
+        envelopes = [future.result() for future in [submit(text) for text in texts]]
+        burst_elapsed = time.perf_counter() - start
+        
+        latency_samples = []
+        futures = []
+        for text in texts:
+            submitted = time.perf_counter()
+            future = submit(text)
+            future.add_done_callback(
+                lambda _, submitted=submitted: latency_samples.append(time.perf_counter() - submitted))
+            futures.append(future)
+            time.sleep(interval_ms / 1000)
+        for future in futures:
+            future.result()
+        if batcher is not None:
+            batcher.close()
+        
+        verifier = MessageSigner(cert_manager, aes_cipher)
+        signature_samples, cached_samples = [], []
+        for envelope in envelopes:
+            hits = verifier.root_hits
+            start = time.perf_counter()
+            assert verifier.verify_message(envelope)
+            elapsed = time.perf_counter() - start
+            (cached_samples if verifier.root_hits > hits else signature_samples).append(elapsed)
+        
+        stats = batcher.stats() if batcher is not None else {}
+        rows.append({
+            'window_ms': window_ms if window_ms is not None else '',
+            'max_batch': max_batch if window_ms is not None else 1,
+            'mean_batch_size': stats.get('mean_batch_size', 1.0),
+            'burst_signs_per_s': messages / burst_elapsed,
+            **latency_summary(latency_samples, 'paced_'),
+            **latency_summary(signature_samples, 'verify_signature_'),
+            **(latency_summary(cached_samples, 'verify_cached_') if cached_samples else {}),
+            'envelope_bytes_mean': sum(envelope_size(envelope) for envelope in envelopes) / len(envelopes),
+        })
+    return rows
+
+
+def benchmark_envelope(messages=2000, repeats=5):
+    """Envelope JSON (hex/base64/PEM, como o Socket.IO serializa) x envelope binário (BinaryEnvelope)
+
+    encode/decode em ns por mensagem (melhor de repeats passadas), bytes por mensagem e o
+    tempo de verify_message a partir de cada forma decodificada.
+    """
+    import json
+    from BinaryEnvelope import encode_envelope, decode_envelope
+    
+    texts = sample_messages(messages)
+    rows = []
+    
+    for mode, by_reference in (('cbc', False), ('cbc', True), ('gcm', True)):
+        _, _, signer = create_bench_signer(mode=mode, registry=CertificateRegistry() if by_reference else None)
+        envelopes = [signer.sign_message(BENCH_USER, text) for text in texts]
+        forms = {
+            'json': (lambda envelope: json.dumps(envelope, separators=(',', ':')).encode('utf-8'), json.loads),
+            'binary': (encode_envelope, decode_envelope),
+        }
+        for name, (encode, decode) in forms.items():
+            encode_ns = decode_ns = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter_ns()
+                wire = [encode(envelope) for envelope in envelopes]
+                encoded = time.perf_counter_ns()
+                decoded = [decode(data) for data in wire]
+                end = time.perf_counter_ns()
+                encode_ns = min(encode_ns, (encoded - start) / messages)
+                decode_ns = min(decode_ns, (end - encoded) / messages)
+            verify_samples = []
+            for envelope in decoded[:200]:
+                start = time.perf_counter()
+                assert signer.verify_message(envelope)
+                verify_samples.append(time.perf_counter() - start)
+            rows.append({
+                'mode': mode,
+                'certificate': 'reference' if by_reference else 'embedded',
+                'format': name,
+                'encode_ns': encode_ns,
+                'decode_ns': decode_ns,
+                'bytes_mean': sum(len(data) for data in wire) / messages,
+                **latency_summary(verify_samples, 'verify_'),
+            })
+    return rows
+
+
+def benchmark_keypool(users=24, concurrency=4, pool_sizes=(0, 8, 32), paced_interval_ms=150.0):
+    """Vazão de onboarding (primeiro login = emissão de certificado) sem e com KeyPool
+
+    burst: users primeiros logins de uma vez, em concurrency threads (como workers HTTP);
+    paced: um primeiro login a cada paced_interval_ms. A reserva começa cheia; pool_size 0
+    é a linha de base (chave gerada na requisição). Latência da emissão em µs.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from KeyPool import KeyPool
+    
+    utils.collect_metrics = False
+    rows = []
+    
+    for pool_size in pool_sizes:
+        for scenario in ('burst', 'paced'):
+            key_pool = KeyPool(low=max(1, pool_size // 4), high=pool_size) if pool_size else None
+            if key_pool is not None:
+                key_pool.wait_ready()
+            cert_manager = CertificateManager(tempfile.mkdtemp(prefix='chat_bench_'), key_pool=key_pool)
+            samples = []
+            
+            def onboard(i):
+                start = time.perf_counter()
+                cert_manager.generate_certificate(f"user{i}", f"Usuário {i}")
+                samples.append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = []
+                for i in range(users):
+                    futures.append(pool.submit(onboard, i))
+                    if scenario == 'paced':
+                        time.sleep(paced_interval_ms / 1000)
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - start
+            
+            stats = key_pool.stats() if key_pool is not None else {}
+            if key_pool is not None:
+                key_pool.close()
+            rows.append({
+                'pool_size': pool_size,
+                'scenario': scenario,
+                'users': users,
+                'onboardings_per_s': users / elapsed,
+                **latency_summary(samples, 'issue_'),
+                'pool_hits': stats.get('hits', 0),
+                'pool_misses': stats.get('misses', users),
+            })
+    return rows
+
+
+BENCHMARKS = {
+    'accounting': benchmark_accounting,
+    'aead': benchmark_aead,
+    'batch': benchmark_batch,
+    'binary': benchmark_binary,
+    'certref': benchmark_certref,
+    'envelope': benchmark_envelope,
+    'executor': benchmark_executor,
+    'keycache': benchmark_keycache,
+    'keypool': benchmark_keypool,
+    'logging': benchmark_logging,
+    'merkle': benchmark_merkle,
+    'metrics': benchmark_metrics,
+    'prehashed': benchmark_prehashed,
+    'sessions': benchmark_sessions,
+    'sigalg': benchmark_sigalg,
+    'stream': benchmark_stream,
+    'verifybatch': benchmark_verifybatch,
+    'verifycache': benchmark_verifycache,
+    'verifypolicy': benchmark_verifypolicy,
+}
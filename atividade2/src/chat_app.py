@@ -10,10 +10,20 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 from datetime import datetime
 import uuid
 import os
+import threading
 
-from AESCipher import AESCipher
-from CertificateManager import CertificateManager
+from AESCipher import AESCipher, MODES
+from CertificateManager import CertificateManager, SIG_ALGORITHMS
 from MessagesSigner import MessageSigner
+from MetricsRing import MetricsRing
+from KeyManager import SessionKeyManager
+from CipherSelector import auto_select
+from CertificateRegistry import CertificateRegistry
+from CryptoExecutor import CryptoExecutor
+from ResourceAccounting import OperationAccounting, ResourceSampler, DEFAULT_CPU_SAMPLE_EVERY
+from VerificationPolicy import VerificationPolicy, INLINE, BACKGROUND, CLIENT
+from BinaryEnvelope import encode_envelope
+from KeyPool import KeyPool, DEFAULT_HIGH_WATERMARK, DEFAULT_LOW_WATERMARK
 
 
 
@@ -25,9 +35,65 @@ app.config['SECRET_KEY'] = 'crypto-chat-secret-key'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Instâncias globais
-cert_manager = CertificateManager()
-aes_cipher = AESCipher()
-message_signer = MessageSigner(cert_manager, aes_cipher)
+# Métricas das operações (buffer circular compartilhado pelas camadas AES e de assinatura)
+metrics = MetricsRing(capacity=int(os.environ.get('CHAT_METRICS_CAPACITY', 65536)))
+# CHAT_SIG_ALG: rsa (padrão), ecdsa ou ed25519 para os certificados gerados no login
+sig_alg = os.environ.get('CHAT_SIG_ALG', 'rsa')
+# Chaves pré-geradas para o primeiro login: criadas por start_key_pool() no ponto de entrada,
+# não na importação (testes, benchmarks e filhos 'spawn' não geram chaves à toa)
+key_pool = None
+cert_manager = CertificateManager(algorithm=sig_alg)
+# CHAT_RESOURCE_SAMPLE_INTERVAL (s): amostragem de CPU/memória do processo em segundo plano
+resource_interval = float(os.environ.get('CHAT_RESOURCE_SAMPLE_INTERVAL', 0))
+resource_sampler = ResourceSampler(metrics, interval=resource_interval).start() if resource_interval > 0 else None
+# CHAT_CIPHER_MODE: cbc (padrão, CBC + SHA-256), gcm ou chacha20 (AEAD de passagem única)
+# ou auto (calibração na inicialização escolhe o AEAD mais rápido neste host)
+cipher_mode = os.environ.get('CHAT_CIPHER_MODE', 'cbc')
+if cipher_mode == 'auto':
+    cipher_selection = auto_select()
+else:
+    cipher_selection = {'mode': cipher_mode, 'source': 'CHAT_CIPHER_MODE'}
+aes_cipher = AESCipher(mode=cipher_selection['mode'], metrics=metrics)
+# Chave própria por sala; os cifradores preparados ficam em cache (LRU + TTL)
+key_manager = SessionKeyManager(mode=aes_cipher.mode, metrics=metrics,
+                                max_cached=int(os.environ.get('CHAT_KEY_CACHE_SIZE', 1024)),
+                                ttl_seconds=float(os.environ.get('CHAT_KEY_TTL', 900)))
+# CHAT_BINARY_FRAMES=1: mensagens trafegam como frames binários no Socket.IO (sem base64)
+binary_frames = os.environ.get('CHAT_BINARY_FRAMES') == '1'
+# CHAT_BINARY_ENVELOPES=1: o envelope assinado segue como anexo binário (BinaryEnvelope), sem hex/base64/PEM
+binary_envelopes = os.environ.get('CHAT_BINARY_ENVELOPES') == '1'
+# Diretório de certificados por impressão digital (servido em /certificates/<impressão digital>)
+cert_registry = CertificateRegistry()
+# CHAT_CERT_BY_REFERENCE=1: envelopes levam só a impressão digital do certificado, não o PEM
+cert_by_reference = os.environ.get('CHAT_CERT_BY_REFERENCE') == '1'
+# CHAT_PROFILE_DIR ativa o perfilamento (cProfile) de cada assinatura/verificação
+message_signer = MessageSigner(cert_manager, aes_cipher, profile_dir=os.environ.get('CHAT_PROFILE_DIR'),
+                               binary=binary_frames, metrics=metrics,
+                               registry=cert_registry if cert_by_reference else None,
+                               # CHAT_CPU_SAMPLE_EVERY: mensagens por leitura de CPU da thread (1 = todas)
+                               accounting=OperationAccounting(int(os.environ.get('CHAT_CPU_SAMPLE_EVERY',
+                                                                                 DEFAULT_CPU_SAMPLE_EVERY))))
+# Pool que executa sign/verify fora dos handlers (CHAT_CRYPTO_WORKERS=0: no próprio handler)
+crypto_workers = os.environ.get('CHAT_CRYPTO_WORKERS')
+crypto_executor = CryptoExecutor(max_workers=int(crypto_workers) if crypto_workers else None, metrics=metrics)
+# CHAT_VERIFY_POLICY: always (padrão), deferred, sampled (fração CHAT_VERIFY_SAMPLE_RATE) ou client
+verification_policy = VerificationPolicy(os.environ.get('CHAT_VERIFY_POLICY', 'always'),
+                                         sample_rate=float(os.environ.get('CHAT_VERIFY_SAMPLE_RATE', 0.1)))
+
+
+def start_key_pool():
+    """Inicia o KeyPool do chat (CHAT_KEY_POOL_HIGH=0 desativa; reabastece ao cair a LOW)"""
+    global key_pool
+    if key_pool is not None:
+        return key_pool
+    high = int(os.environ.get('CHAT_KEY_POOL_HIGH', DEFAULT_HIGH_WATERMARK))
+    if high <= 0:
+        return None
+    low = int(os.environ.get('CHAT_KEY_POOL_LOW', min(DEFAULT_LOW_WATERMARK, high - 1)))
+    key_pool = KeyPool(sig_alg, low=low, high=high,
+                       workers=int(os.environ.get('CHAT_KEY_POOL_WORKERS', 1)), metrics=metrics)
+    cert_manager.key_pool = key_pool
+    return key_pool
 
 # Usuários pré-cadastrados
 USERS = {
@@ -42,14 +108,17 @@ chat_stats = {
     'messages_verified': 0,
     'active_users': set(),
     'total_signatures': 0,
+    'verifications': 0,  # Verificações feitas no servidor (dependem da política)
     'verification_success_rate': 100.0
 }
+# Os workers do CryptoExecutor atualizam as estatísticas concorrentemente
+stats_lock = threading.Lock()
 
 @app.route('/')
 def index():
     if 'username' not in session:
         return redirect(url_for('login'))
-    return render_template('chat.html', username=session['username'])
+    return render_template('chat.html', username=session['username'], binary_frames=binary_frames)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -107,80 +176,168 @@ def on_disconnect():
             'timestamp': datetime.now().isoformat()
         }, room='chat')
 
-@socketio.on('send_message')
-def handle_message(data):
-    if 'username' not in session:
-        return
-    
-    username = session['username']
-    message = data['message']
-    
-    # Assinar mensagem
-    signed_message = message_signer.sign_message(username, message)
-    
-    if signed_message:
-        # Verificar assinatura
-        is_valid = message_signer.verify_message(signed_message)
-        
-        # Atualizar estatísticas
-        chat_stats['messages_sent'] += 1
-        chat_stats['total_signatures'] += 1
+def record_verification(is_valid):
+    """Contabiliza uma verificação; retorna as estatísticas para o stats_update (chamar com stats_lock)"""
+    if is_valid is not None:
+        chat_stats['verifications'] += 1
         if is_valid:
             chat_stats['messages_verified'] += 1
-        
+    if chat_stats['verifications']:
         chat_stats['verification_success_rate'] = (
-            chat_stats['messages_verified'] / chat_stats['total_signatures'] * 100
+            chat_stats['messages_verified'] / chat_stats['verifications'] * 100
         )
+    return {
+        'active_users': len(chat_stats['active_users']),
+        'messages_sent': chat_stats['messages_sent'],
+        'verification_rate': chat_stats['verification_success_rate']
+    }
+
+def process_message(username, name, message):
+    """Assina a mensagem e a verifica conforme a política (roda no CryptoExecutor, fora do handler)
+
+    Retorna (payload, estatísticas, verificação adiada) para broadcast_message, ou None se
+    não houve assinatura.
+    """
+    # Assinar mensagem com a chave da sala
+    room_cipher = key_manager.cipher('chat')
+    signed_message = message_signer.sign_message(username, message, cipher=room_cipher)
+    
+    if signed_message:
+        # Envelope que trafega: o binário (sem o texto, já presente no payload) ou o dicionário
+        envelope = encode_envelope(signed_message, include_message=False) if binary_envelopes else signed_message
+        plan = verification_policy.plan(signed_message)
+        # Verificar assinatura antes da difusão apenas na política always
+        is_valid = None
+        if plan == INLINE:
+            is_valid = message_signer.verify_message(envelope, cipher=room_cipher)
+        
+        # Atualizar estatísticas
+        with stats_lock:
+            chat_stats['messages_sent'] += 1
+            chat_stats['total_signatures'] += 1
+            stats = record_verification(is_valid)
         
-        # Enviar mensagem para todos
-        emit('new_message', {
+        payload = {
             'id': str(uuid.uuid4()),
             'username': username,
-            'name': session['name'],
+            'name': name,
             'message': message,
             'timestamp': signed_message['timestamp'],
-            'verified': is_valid,
-            'signature_preview': signed_message['signature'][:16] + '...'
-        }, room='chat')
-        
-        # Atualizar estatísticas
-        emit('stats_update', {
-            'active_users': len(chat_stats['active_users']),
-            'messages_sent': chat_stats['messages_sent'],
-            'verification_rate': chat_stats['verification_success_rate']
-        }, room='chat')
+            'verified': is_valid,  # None: pendente (background), no cliente ou fora da amostra
+            'verification': plan,
+            'signature_preview': signed_message['signature'][:16] + '...',
+            'cert_fingerprint': signed_message['cert_fingerprint']
+        }
+        if 'certificate' in signed_message:
+            # Certificado embutido também fica disponível em /certificates/<impressão digital>
+            cert_registry.publish(signed_message['certificate'], signed_message['cert_fingerprint'])
+        if plan == CLIENT:
+            # Dados para a verificação no navegador (o certificado vem do diretório)
+            payload.update(signature=signed_message['signature'], sig_alg=signed_message['sig_alg'],
+                           sig_version=signed_message['sig_version'])
+        if binary_frames:
+            # Frame cifrado (versão | IV | ciphertext) vai como anexo binário do Socket.IO
+            payload['encrypted_frame'] = signed_message['encrypted_message']
+        if binary_envelopes:
+            payload['envelope'] = envelope
+        deferred = (envelope, room_cipher) if plan == BACKGROUND else None
+        return payload, stats, deferred
+    return None
+
+def verify_later(message_id, signed_message, cipher):
+    """Verificação fora do caminho crítico: o resultado segue no evento 'verified'"""
+    is_valid = message_signer.verify_message(signed_message, cipher=cipher)
+    with stats_lock:
+        stats = record_verification(is_valid)
+    socketio.emit('verified', {'id': message_id, 'verified': is_valid}, room='chat')
+    socketio.emit('stats_update', stats, room='chat')
+
+def broadcast_message(result):
+    """Difunde a mensagem processada (chamado na ordem de envio, fora do contexto do handler)"""
+    if result is None:
+        return
+    payload, stats, deferred = result
+    
+    # Enviar mensagem para todos
+    socketio.emit('new_message', payload, room='chat')
+    
+    # Atualizar estatísticas
+    socketio.emit('stats_update', stats, room='chat')
+    
+    if deferred is not None:
+        # Enfileirada só depois da difusão: 'verified' nunca chega antes de 'new_message'
+        crypto_executor.submit(verify_later, payload['id'], *deferred)
+
+@socketio.on('send_message')
+def handle_message(data):
+    if 'username' not in session:
+        return
+    
+    username = session['username']
+    message = data['message']
+    if isinstance(message, (bytes, bytearray)):
+        # Cliente em modo binário envia o texto em UTF-8 como anexo binário
+        message = message.decode('utf-8')
+    
+    # O handler só enfileira: sign/verify rodam no pool e não travam os demais clientes;
+    # a difusão segue a ordem de chegada na sala
+    crypto_executor.submit_ordered('chat', broadcast_message, process_message, username, session['name'], message)
+
+@app.route('/certificates/<fingerprint>')
+def certificate(fingerprint):
+    """PEM publicado com a impressão digital (conteúdo imutável: cache longo no cliente)"""
+    cert_pem = cert_registry.lookup(fingerprint.lower())
+    if cert_pem is None:
+        return 'Certificado não encontrado', 404
+    response = app.response_class(cert_pem, mimetype='application/x-pem-file')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 @app.route('/performance')
 def performance():
-    """Endpoint para dados de performance com detalhamento de operações"""
-    all_operations = (
-        message_signer.performance_data + 
-        aes_cipher.performance_data
-    )
+    """Endpoint para dados de performance com detalhamento de operações
     
-    # Separar por tipo de operação
-    sign_ops = [d for d in all_operations if d['operation'] == 'sign_complete']
-    verify_ops = [d for d in all_operations if d['operation'] == 'verify_complete']
-    hash_ops = [d for d in all_operations if d['operation'] == 'hash']
-    aes_enc_ops = [d for d in all_operations if d['operation'] == 'aes_encrypt']
-    aes_dec_ops = [d for d in all_operations if d['operation'] == 'aes_decrypt']
+    Os resumos são vetorizados sobre o buffer circular; a lista de operações no formato
+    antigo pode ser omitida com ?raw=0. O cpu_usage de sign/verify é amostrado: só uma
+    a cada cpu_sample_every mensagens o tem (nas demais o campo não aparece).
+    """
+    summary = metrics.summary()
     
-    return {
-        'performance_data': all_operations,
+    def avg_time(operation):
+        return summary.get(operation, {}).get('mean_time', 0.0)
+    
+    response = {
         'stats': {
-            'total_operations': len(all_operations),
-            'avg_sign_time': sum(d['time'] for d in sign_ops) / max(1, len(sign_ops)),
-            'avg_verify_time': sum(d['time'] for d in verify_ops) / max(1, len(verify_ops)),
-            'avg_hash_time': sum(d['time'] for d in hash_ops) / max(1, len(hash_ops)),
-            'avg_aes_encrypt_time': sum(d['time'] for d in aes_enc_ops) / max(1, len(aes_enc_ops)),
-            'avg_aes_decrypt_time': sum(d['time'] for d in aes_dec_ops) / max(1, len(aes_dec_ops)),
+            'total_operations': len(metrics),
+            'dropped_operations': metrics.dropped,
+            'avg_sign_time': avg_time('sign_complete'),
+            'avg_verify_time': avg_time('verify_complete'),
+            'avg_hash_time': avg_time('hash'),
+            'avg_aes_encrypt_time': avg_time('aes_encrypt'),
+            'avg_aes_decrypt_time': avg_time('aes_decrypt'),
+            'operations': summary,
+            'cpu_sample_every': message_signer.accounting.cpu_sample_every,
+            'key_cache': key_manager.stats(),
+            'private_key_cache': message_signer.key_cache.stats(),
+            'verify_cache': message_signer.verify_cache.stats(),
+            'crypto_executor': crypto_executor.stats(),
+            'verification_policy': verification_policy.stats(),
+            'process': resource_sampler.latest if resource_sampler else None,
+            'cert_registry': dict(cert_registry.stats(), by_reference=cert_by_reference),
+            'binary_envelopes': binary_envelopes,
+            'key_pool': key_pool.stats() if key_pool else None,
+            'cipher_selection': cipher_selection,
             'security_layers': {
-                'sigilo': 'AES-256-CBC',
-                'integridade': 'SHA-256',
-                'autenticidade': 'RSA-2048 + PSS'
+                'sigilo': MODES[aes_cipher.mode],
+                'integridade': MODES[aes_cipher.mode] if aes_cipher.is_aead else 'SHA-256',
+                'autenticidade': SIG_ALGORITHMS[cert_manager.algorithm]
             }
         }
     }
+    if request.args.get('raw', '1') != '0':
+        response['performance_data'] = metrics.to_dicts()
+    return response
 
 if __name__ == '__main__':
+    start_key_pool()
     socketio.run(app, host='0.0.0.0', port=8080, debug=True)
@@ -0,0 +1,79 @@
+"""
+Logging estruturado e em níveis para as camadas criptográficas do chat
+Níveis desabilitados custam apenas um isEnabledFor (cacheado pelo logging):
+os campos (hex de IVs, assinaturas etc.) só são formatados dentro do guard.
+Material de chave nunca é registrado.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Nível abaixo de DEBUG para o rastreamento passo a passo de cada mensagem
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+ROOT_LOGGER = 'chat'
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formata registros como 'HH:MM:SS NÍVEL logger evento chave=valor ...'"""
+
+    def format(self, record):
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.name} {record.getMessage()}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def get_logger(name):
+    """Logger da camada (ex.: 'aes' -> 'chat.aes')"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger, level, event, **fields):
+    """Registra um evento estruturado; chamar dentro de 'if logger.isEnabledFor(level)'"""
+    logger.log(level, event, extra={'fields': fields})
+
+
+def configure_logging(level=logging.INFO, queued=False, stream=None):
+    """Configura o logger 'chat'; com queued=True a escrita ocorre em uma thread separada"""
+    global _listener
+
+    if isinstance(level, str):
+        level = TRACE if level.upper() == 'TRACE' else logging.getLevelName(level.upper())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter())
+
+    if queued:
+        # O hot path só enfileira o registro; formatação e I/O ficam no listener
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+    else:
+        logger.addHandler(output)
+    return logger
+
+
+@atexit.register
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
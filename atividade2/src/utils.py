@@ -1,14 +1,23 @@
 import threading
+import cProfile
 import csv
+import hashlib
 import os
+import re
+import time
+from collections import deque
 from datetime import datetime
 
 # Dados globais para coleta de métricas
 chat_metrics = []
 metrics_lock = threading.Lock()
+# Desativado pelos benchmarks para não misturar medições sintéticas aos dados reais
+collect_metrics = True
 
 def save_chat_metric(operation, username, message, time_taken, success=True):
     """Salva métrica de uso real do chat com informações detalhadas de tamanho"""
+    if not collect_metrics:
+        return
     with metrics_lock:
         message_chars = len(message)
         message_bytes = len(message.encode('utf-8'))
@@ -44,4 +53,57 @@ def save_metrics_to_file():
                                                  'message_size_chars', 'message_size_bytes',
                                                  'time', 'success', 'test_type', 'scenario'])
             writer.writeheader()
-            writer.writerows(chat_metrics)
\ No newline at end of file
+            writer.writerows(chat_metrics)
+
+# Perfis mantidos por diretório; os mais antigos são apagados (um perfil por mensagem no chat)
+PROFILE_MAX_FILES = 1000
+_profile_files = {}  # diretório -> deque dos perfis existentes, do mais antigo ao mais novo
+_profile_lock = threading.Lock()
+
+
+def profile_file_name(name):
+    """Nome de arquivo seguro para name (que pode vir do remetente da mensagem)
+
+    Só [A-Za-z0-9_-] é mantido; se algo foi trocado, um prefixo do SHA-256 do nome
+    original evita que nomes diferentes colidam.
+    """
+    safe = re.sub(r'[^A-Za-z0-9_-]', '_', name)[:64]
+    if safe != name:
+        safe = f"{safe}-{hashlib.sha256(name.encode('utf-8')).hexdigest()[:8]}"
+    return safe
+
+
+def _register_profile(profile_dir, path, max_files):
+    """Registra o perfil salvo e apaga os mais antigos além de max_files"""
+    with _profile_lock:
+        files = _profile_files.get(profile_dir)
+        if files is None:
+            existing = [os.path.join(profile_dir, entry) for entry in os.listdir(profile_dir)
+                        if entry.endswith('.prof')]
+            existing.sort(key=os.path.getmtime)
+            files = _profile_files[profile_dir] = deque(p for p in existing if p != path)
+        files.append(path)
+        while len(files) > max_files:
+            try:
+                os.remove(files.popleft())
+            except FileNotFoundError:
+                pass
+
+
+def profile_call(profile_dir, name, func, *args, max_files=PROFILE_MAX_FILES, **kwargs):
+    """Executa func sob cProfile e salva o perfil em profile_dir/<name>_<ns>.prof
+
+    name é saneado (profile_file_name) e o arquivo precisa ficar dentro de profile_dir;
+    apenas os max_files perfis mais recentes do diretório são mantidos.
+    """
+    profile_dir = os.path.realpath(profile_dir)
+    path = os.path.realpath(os.path.join(profile_dir, f"{profile_file_name(name)}_{time.time_ns()}.prof"))
+    if os.path.dirname(path) != profile_dir:
+        raise ValueError(f"Perfil fora de {profile_dir}: {name!r}")
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(path)
+        _register_profile(profile_dir, path, max_files)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Os módulos da atividade2 são importados pelo nome (como em run_chat.py / run_benchmarks.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import pytest
+
+import utils
+
+
+@pytest.fixture(autouse=True)
+def no_chat_metrics(monkeypatch):
+    """Testes não gravam em data/real_chat_metrics.csv"""
+    monkeypatch.setattr(utils, 'collect_metrics', False)
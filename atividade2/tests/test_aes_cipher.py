@@ -0,0 +1,32 @@
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from AESCipher import AESCipher, AEAD_TAG_SIZE
+
+
+def test_encrypt_aead_rejects_non_aead_modes():
+    with pytest.raises(ValueError):
+        AESCipher('cbc').encrypt_aead('oi')
+    with pytest.raises(ValueError):
+        AESCipher('gcm').encrypt_aead('oi', mode='cbc')
+
+
+def test_encrypt_aead_round_trip():
+    cipher = AESCipher('chacha20')
+    frame, nonce, tag = cipher.encrypt_aead('olá', aad=b'alice', binary=True)
+    assert tag == bytes(frame[-AEAD_TAG_SIZE:])
+    assert cipher.decrypt_aead(frame, aad=b'alice') == ('olá', nonce, tag)
+
+
+def test_decrypt_large_round_trip_and_short_blob():
+    cipher = AESCipher('gcm')
+    data = os.urandom(3000)
+    blob = cipher.encrypt_large(data, workers=2)
+    assert bytes(cipher.decrypt_large(blob, workers=2)) == data
+    for length in (0, 1, 27):
+        with pytest.raises(ValueError):
+            cipher.decrypt_large(blob[:length])
+    with pytest.raises(InvalidTag):
+        cipher.decrypt_large(blob[:28])
@@ -0,0 +1,89 @@
+import io
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from AESCipher import AEAD_TAG_SIZE
+from AESStream import HEADER_SIZE, StreamDecryptor, StreamEncryptor, decrypt_file, encrypt_file
+
+KEY = bytes(range(32))
+CHUNK = 64
+
+
+def seal(data, mode='gcm', aad=None):
+    """Cifra data alimentando o encryptor em pedaços de tamanhos irregulares"""
+    encryptor = StreamEncryptor(KEY, mode, CHUNK, aad)
+    out = bytearray(encryptor.header)
+    for start in range(0, len(data), 37):
+        out += encryptor.update(data[start:start + 37])
+    out += encryptor.finalize()
+    return bytes(out)
+
+
+def open_stream(stream, aad=None, feed=29):
+    decryptor = StreamDecryptor(KEY, aad)
+    out = bytearray()
+    for start in range(0, len(stream), feed):
+        out += decryptor.update(stream[start:start + feed])
+    out += decryptor.finalize()
+    return bytes(out)
+
+
+def sealed_chunks(stream):
+    body = stream[HEADER_SIZE:]
+    size = CHUNK + AEAD_TAG_SIZE
+    return stream[:HEADER_SIZE], [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('mode', ['gcm', 'chacha20'])
+@pytest.mark.parametrize('length', [0, 1, CHUNK, 3 * CHUNK, 3 * CHUNK + 5])
+def test_round_trip(mode, length):
+    data = os.urandom(length)
+    stream = seal(data, mode, aad=b'anexo')
+    # O último chunk leva o resto (cheio se length for múltiplo do chunk; vazio só se length == 0)
+    assert len(sealed_chunks(stream)[1]) == max(1, -(-length // CHUNK))
+    assert open_stream(stream, aad=b'anexo') == data
+    assert open_stream(stream, aad=b'anexo', feed=len(stream)) == data
+
+
+def test_file_round_trip():
+    data = os.urandom(1000)
+    sink = io.BytesIO()
+    encrypt_file(KEY, io.BytesIO(data), sink, chunk_size=CHUNK)
+    out = io.BytesIO()
+    assert decrypt_file(KEY, io.BytesIO(sink.getvalue()), out, read_size=50) == len(data)
+    assert out.getvalue() == data
+
+
+def test_truncation_is_detected():
+    header, chunks = sealed_chunks(seal(os.urandom(5 * CHUNK + 10)))
+    # Sem o último chunk: o penúltimo não tem a flag de fim
+    with pytest.raises(InvalidTag):
+        open_stream(header + b''.join(chunks[:-1]))
+    with pytest.raises(ValueError):
+        open_stream(header[:5])
+    with pytest.raises(ValueError):
+        open_stream(header)
+
+
+def test_reordering_is_detected():
+    header, chunks = sealed_chunks(seal(os.urandom(5 * CHUNK + 10)))
+    chunks[1], chunks[2] = chunks[2], chunks[1]
+    with pytest.raises(InvalidTag):
+        open_stream(header + b''.join(chunks))
+
+
+def test_header_and_aad_are_authenticated():
+    stream = seal(os.urandom(200), aad=b'alice')
+    with pytest.raises(InvalidTag):
+        open_stream(stream, aad=b'bob')
+    tampered = bytearray(stream)
+    tampered[HEADER_SIZE - 1] ^= 1  # prefixo do nonce
+    with pytest.raises(InvalidTag):
+        open_stream(bytes(tampered), aad=b'alice')
+
+
+def test_non_aead_mode_is_rejected():
+    with pytest.raises(ValueError):
+        StreamEncryptor(KEY, 'cbc')
@@ -0,0 +1,93 @@
+import base64
+import os
+import pickle
+import struct
+from datetime import datetime
+
+import pytest
+
+from BinaryEnvelope import EnvelopeView, decode_envelope, encode_envelope
+
+HEADER_SIZE = 45  # versão, flags, modo, sig_alg, sig_version, timestamp (8), impressão digital (32)
+
+
+def pem(der):
+    body = base64.b64encode(der).decode('ascii')
+    lines = '\n'.join(body[i:i + 64] for i in range(0, len(body), 64))
+    return f"-----BEGIN CERTIFICATE-----\n{lines}\n-----END CERTIFICATE-----\n"
+
+
+def signed_message(**extra):
+    message = {
+        'mode': 'gcm',
+        'sig_alg': 'ed25519',
+        'sig_version': 2,
+        'timestamp': datetime(2025, 3, 1, 12, 30, 15, 123456).isoformat(),
+        'cert_fingerprint': os.urandom(32).hex(),
+        'sender': 'joão',
+        'signature': os.urandom(64).hex(),
+        'encrypted_message': base64.b64encode(os.urandom(77)).decode('ascii'),
+    }
+    message.update(extra)
+    return message
+
+
+def test_round_trip_with_all_optional_fields():
+    original = signed_message(
+        message_hash=os.urandom(32).hex(), certificate=pem(os.urandom(300)), message='olá, mundo',
+        merkle={'root': os.urandom(32).hex(), 'index': 5, 'size': 9,
+                'proof': [os.urandom(32).hex() for _ in range(4)]})
+    data = encode_envelope(original)
+    view = decode_envelope(data)
+    assert view.to_dict() == original
+    assert bytes(view['encrypted_message']) == base64.b64decode(original['encrypted_message'])
+    assert bytes(view.raw('signature')).hex() == original['signature']
+    assert encode_envelope(view) == data
+    assert pickle.loads(pickle.dumps(view)).to_dict() == original
+
+
+def test_round_trip_minimal_and_without_message():
+    original = signed_message(mode='cbc', sig_alg='rsa', message_hash=os.urandom(32).hex())
+    view = decode_envelope(encode_envelope(original))
+    assert dict(view.items()) == dict(original, encrypted_message=view['encrypted_message'])
+    assert 'certificate' not in view and 'merkle' not in view
+
+    full = decode_envelope(encode_envelope(dict(original, message='texto')))
+    stripped = decode_envelope(encode_envelope(full, include_message=False))
+    assert 'message' in full and 'message' not in stripped
+
+
+def test_malformed_lengths_are_rejected():
+    data = bytearray(encode_envelope(signed_message(message='oi')))
+    # Prefixo do remetente maior que o buffer
+    bad = bytearray(data)
+    struct.pack_into('!H', bad, HEADER_SIZE, 0xFFFF)
+    with pytest.raises(ValueError):
+        decode_envelope(bytes(bad))
+    # Prefixo do remetente menor: os campos seguintes ficam desalinhados
+    bad = bytearray(data)
+    struct.pack_into('!H', bad, HEADER_SIZE, len('joão'.encode('utf-8')) - 1)
+    with pytest.raises(ValueError):
+        decode_envelope(bytes(bad))
+    for truncated in (data[:10], data[:HEADER_SIZE + 1], data[:-1]):
+        with pytest.raises(ValueError):
+            decode_envelope(bytes(truncated))
+    with pytest.raises(ValueError):
+        decode_envelope(bytes(data) + b'\x00')
+
+
+def test_merkle_sibling_count_is_checked():
+    data = bytearray(encode_envelope(signed_message(
+        merkle={'root': os.urandom(32).hex(), 'index': 0, 'size': 2, 'proof': [os.urandom(32).hex()]})))
+    data[-33] = 2  # contagem de irmãos além do fim do buffer
+    with pytest.raises(ValueError):
+        decode_envelope(bytes(data))
+
+
+def test_unknown_version_mode_or_algorithm_is_rejected():
+    data = encode_envelope(signed_message())
+    for offset, value in ((0, 0x7B), (2, 0x7F), (3, 0x7F)):
+        bad = bytearray(data)
+        bad[offset] = value
+        with pytest.raises(ValueError):
+            EnvelopeView(bytes(bad))
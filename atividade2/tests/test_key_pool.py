@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import KeyPool as key_pool_module
+from CertificateManager import CertificateManager
+from KeyPool import KeyPool
+
+
+def test_failing_keygen_backs_off(monkeypatch):
+    def broken(algorithm):
+        raise RuntimeError("sem entropia")
+
+    monkeypatch.setattr(key_pool_module, 'generate_private_key', broken)
+    monkeypatch.setattr(key_pool_module, 'KEYGEN_BACKOFF', 0.05)
+    pool = KeyPool('ed25519', low=1, high=4)
+    try:
+        time.sleep(0.4)
+        failures = pool.stats()['failures']
+    finally:
+        pool.close()
+    # 0.05 + 0.1 + 0.2 s: sem backoff seriam milhares de tentativas
+    assert 1 <= failures <= 4
+    assert len(pool) == 0
+
+
+def test_fills_to_high_and_refills_at_low():
+    pool = KeyPool('ed25519', low=2, high=5, workers=2)
+    try:
+        assert pool.wait_ready(timeout=10)
+        assert len(pool) == 5
+        keys = [pool.take() for _ in range(3)]  # 5 -> 2: cai para low e volta a encher
+        assert len({id(key) for key in keys}) == 3
+        assert pool.wait_ready(timeout=10)
+        stats = pool.stats()
+        assert stats['hits'] == 3 and stats['misses'] == 0
+        assert stats['generated'] == 8 and stats['failures'] == 0
+    finally:
+        pool.close()
+
+
+def test_take_generates_inline_when_empty():
+    pool = KeyPool('ed25519', low=0, high=1)
+    pool.close()  # sem workers: a reserva não é reabastecida
+    while len(pool):
+        pool.take()
+    key = pool.take()
+    assert key.public_key() is not None
+    assert pool.stats()['misses'] == 1
+
+
+def test_invalid_configuration():
+    for kwargs in ({'algorithm': 'dsa'}, {'low': 3, 'high': 3}, {'workers': 0}):
+        with pytest.raises(ValueError):
+            KeyPool(**kwargs)
+
+
+def test_certificate_manager_takes_keys_from_pool(tmp_path):
+    pool = KeyPool('ed25519', low=0, high=2)
+    try:
+        assert pool.wait_ready(timeout=10)
+        manager = CertificateManager(str(tmp_path), algorithm='ed25519', key_pool=pool)
+        manager.generate_certificate('alice', 'Alice')
+        assert pool.stats()['hits'] == 1
+    finally:
+        pool.close()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from LatencyHistogram import LatencyHistogram, SUB_BUCKET_COUNT, bucket_bounds, bucket_index
+
+
+def test_sub_bucket_layout():
+    assert SUB_BUCKET_COUNT == 32
+    # Trecho linear: um bucket por unidade; acima dele, 16 buckets por potência de 2
+    assert list(bucket_index(np.arange(32))) == list(range(32))
+    assert bucket_index(np.array([64]))[0] - bucket_index(np.array([32]))[0] == 16
+    low, width = bucket_bounds(bucket_index(np.array([1000])))
+    assert low[0] <= 1000 < low[0] + width[0]
+
+
+def test_percentiles_within_bucket_resolution():
+    values = np.random.default_rng(1).lognormal(mean=-7, sigma=1, size=20000)
+    hist = LatencyHistogram()
+    hist.record_many(values)
+    for q in (50, 90, 99):
+        assert hist.percentile(q) == pytest.approx(np.percentile(values, q), rel=0.035)
+    assert hist.mean() == pytest.approx(values.mean())
+    assert hist.percentile(0) >= hist.min_value and hist.percentile(100) <= hist.max_value
+
+
+def test_merge_matches_single_histogram():
+    values = np.random.default_rng(2).exponential(0.002, size=5000)
+    whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    whole.record_many(values)
+    first.record_many(values[:1234])
+    second.record_many(values[1234:])
+    first.merge(second)
+    assert np.array_equal(first.counts, whole.counts)
+    assert first.total_count == whole.total_count == 5000
+    assert first.mean() == pytest.approx(whole.mean())
+    assert first.std() == pytest.approx(np.std(values, ddof=1))
+    assert first.percentile(99) == whole.percentile(99)
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram(unit=1e-9))
+
+
+def test_std_has_no_cancellation_with_large_offset():
+    # Média enorme e variância pequena: E[x²]−E[x]² perde todos os dígitos significativos
+    values = 1e6 + np.random.default_rng(3).normal(0, 1e-3, size=1000)
+    hist = LatencyHistogram()
+    for chunk in np.array_split(values, 7):
+        part = LatencyHistogram()
+        part.record_many(chunk)
+        hist.merge(part)
+    assert hist.std() == pytest.approx(np.std(values, ddof=1), rel=1e-6)
@@ -0,0 +1,35 @@
+from MerkleBatch import BatchSigner
+
+
+class RecordingSigner:
+    def __init__(self):
+        self.calls = []
+
+    def sign_batch(self, username, messages, cipher=None):
+        self.calls.append((username, cipher, list(messages)))
+        return [f'{username}:{m}' for m in messages]
+
+
+class Cipher:
+    pass
+
+
+def test_batches_are_keyed_on_sender_and_cipher():
+    signer = RecordingSigner()
+    batcher = BatchSigner(signer, window_ms=10_000, max_batch=8)
+    room_a, room_b = Cipher(), Cipher()
+    futures = [batcher.submit('alice', 'a1', room_a), batcher.submit('alice', 'b1', room_b),
+               batcher.submit('alice', 'a2', room_a), batcher.submit('bob', 'a3', room_a)]
+    batcher.close()
+    assert [f.result() for f in futures] == ['alice:a1', 'alice:b1', 'alice:a2', 'bob:a3']
+    groups = sorted((user, cipher is room_a, messages) for user, cipher, messages in signer.calls)
+    assert groups == [('alice', False, ['b1']), ('alice', True, ['a1', 'a2']), ('bob', True, ['a3'])]
+
+
+def test_full_batch_is_signed_before_the_window():
+    signer = RecordingSigner()
+    batcher = BatchSigner(signer, window_ms=10_000, max_batch=2)
+    futures = [batcher.submit('alice', m) for m in ('m1', 'm2')]
+    assert [f.result(timeout=5) for f in futures] == ['alice:m1', 'alice:m2']
+    batcher.close()
+    assert batcher.stats()['batches'] == 1
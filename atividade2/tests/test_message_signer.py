@@ -0,0 +1,124 @@
+import base64
+import os
+
+import pytest
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from AESCipher import AESCipher, AEAD_NONCE_SIZE, AEAD_TAG_SIZE, FRAME_HEADER_SIZE
+from CertificateManager import CertificateManager
+from MessagesSigner import MessageSigner
+
+_GCM_R = 0xE1 << 120
+
+
+def _gf_mult(x, y):
+    """Multiplicação em GF(2^128) na convenção do GHASH (NIST SP 800-38D, algoritmo 1)"""
+    z, v = 0, y
+    for i in range(127, -1, -1):
+        if (x >> i) & 1:
+            z ^= v
+        v = (v >> 1) ^ (_GCM_R if v & 1 else 0)
+    return z
+
+
+def _ascii_safe_deltas(h):
+    """(d1, d2) com d2 = d1 * H e o bit alto de todo byte zerado nos dois
+
+    Trocar os blocos C1, C2 por C1 ^ d1, C2 ^ d2 mantém o GHASH (d1 * H^2 = d2 * H) e
+    portanto a tag; o texto decifrado continua ASCII, então a decifragem é aceita.
+    """
+    high_bits = [127 - 8 * k for k in range(16)]
+    free = [bit for bit in range(128) if bit not in high_bits]
+    # Restrição linear sobre GF(2): os bits altos de d1 * H devem ser zero
+    rows = []
+    for bit in free:
+        product = _gf_mult(1 << bit, h)
+        rows.append((sum(((product >> hb) & 1) << i for i, hb in enumerate(high_bits)), 1 << bit))
+    pivots = {}
+    for syndrome, combo in rows:
+        while syndrome:
+            top = syndrome.bit_length() - 1
+            if top not in pivots:
+                pivots[top] = (syndrome, combo)
+                break
+            syndrome ^= pivots[top][0]
+            combo ^= pivots[top][1]
+        else:
+            if combo:
+                return combo, _gf_mult(combo, h)
+    raise AssertionError("sem solução")
+
+
+@pytest.fixture
+def cert_manager(tmp_path):
+    manager = CertificateManager(str(tmp_path))
+    manager.generate_certificate('alice', 'Alice')
+    return manager
+
+
+def test_aead_signature_covers_ciphertext(cert_manager):
+    room_cipher = AESCipher(mode='gcm')
+    signer = MessageSigner(cert_manager, room_cipher)
+    signed_message = signer.sign_message('alice', 'mensagem original com mais de dois blocos!!')
+    assert signer.verify_message(signed_message)
+
+    frame = bytearray(base64.b64decode(signed_message['encrypted_message']))
+    h = int.from_bytes(Cipher(algorithms.AES(room_cipher.key), modes.ECB()).encryptor().update(bytes(16)), 'big')
+    d1, d2 = _ascii_safe_deltas(h)
+    start = FRAME_HEADER_SIZE + AEAD_NONCE_SIZE
+    for offset, delta in ((start, d1), (start + 16, d2)):
+        block = int.from_bytes(frame[offset:offset + 16], 'big') ^ delta
+        frame[offset:offset + 16] = block.to_bytes(16, 'big')
+
+    # Quem tem a chave da sala obtém outro ciphertext com o mesmo nonce e a mesma tag...
+    original = base64.b64decode(signed_message['encrypted_message'])
+    assert frame[:start] == original[:start] and frame[-AEAD_TAG_SIZE:] == original[-AEAD_TAG_SIZE:]
+    forged_text, _, _ = room_cipher.decrypt_aead(bytes(frame), aad=b'alice')
+    assert forged_text is not None and forged_text != signed_message['message']
+
+    # ...mas a assinatura de alice não vale para ele
+    forged = dict(signed_message, encrypted_message=base64.b64encode(frame).decode('utf-8'))
+    assert not signer.verify_message(forged)
+
+
+def test_verify_batch_accepts_generators(cert_manager):
+    signer = MessageSigner(cert_manager, AESCipher())
+    history = [signer.sign_message('alice', f"mensagem {i}") for i in range(3)]
+    assert signer.verify_batch((signed_message for signed_message in history), workers=1) == [True] * 3
+
+
+def _write_expired_certificate(cert_dir, username):
+    """.p12 com um certificado que expirou ontem (o CertificateManager só gera válidos)"""
+    from datetime import datetime, timedelta
+    from cryptography import x509
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    from cryptography.hazmat.primitives.serialization import pkcs12
+    from cryptography.x509.oid import NameOID
+
+    key = ed25519.Ed25519PrivateKey.generate()
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, username)])
+    now = datetime.utcnow()
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=30)).not_valid_after(now - timedelta(days=1))
+            .sign(key, None))
+    with open(os.path.join(cert_dir, f"{username}.p12"), 'wb') as f:
+        f.write(pkcs12.serialize_key_and_certificates(
+            b"password", key, cert, None, serialization.BestAvailableEncryption(b"password")))
+
+
+def test_expired_certificate_fails_verification(cert_manager):
+    from CertificateRegistry import CertificateRegistry
+
+    _write_expired_certificate(cert_manager.cert_dir, 'mallory')
+    signer = MessageSigner(cert_manager, AESCipher())
+    signed_message = signer.sign_message('mallory', 'assinada com certificado expirado')
+    assert signed_message is not None
+    assert not signer.verify_message(signed_message)
+    assert signer.verify_batch([signed_message], workers=1) == [False]
+
+    # Por referência: o certificado vem do diretório e também é recusado
+    registry = CertificateRegistry()
+    by_reference = MessageSigner(cert_manager, AESCipher(), registry=registry)
+    assert not by_reference.verify_message(by_reference.sign_message('mallory', 'por referência'))
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from MetricsRing import MetricsRing
+
+
+def test_wraparound_keeps_latest_in_order():
+    ring = MetricsRing(capacity=4)
+    for i in range(10):
+        ring.record('aes_encrypt' if i % 2 else 'hash', float(i), i * 10)
+    assert len(ring) == 4 and ring.total == 10 and ring.dropped == 6
+    assert ring.column('time').tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert ring.column('message_size').tolist() == [60, 70, 80, 90]
+    assert np.all(np.diff(ring.column('timestamp_ns')) >= 0)
+    assert sorted(ring.select('hash').tolist()) == [6.0, 8.0]
+    assert [r['operation'] for r in ring.to_dicts()] == ['hash', 'aes_encrypt', 'hash', 'aes_encrypt']
+
+
+def test_summary_after_wraparound():
+    ring = MetricsRing(capacity=3)
+    for duration in (100.0, 1.0, 2.0, 3.0):
+        ring.record('sign_complete', duration, 5)
+    stats = ring.summary()['sign_complete']
+    assert stats['count'] == 3 and stats['total_size'] == 15
+    assert stats['mean_time'] == pytest.approx(2.0)
+    assert ring.mean_time('sign_complete') == pytest.approx(2.0)
+    assert ring.mean_time('nunca_registrada') == 0.0
+
+
+def test_optional_fields_and_clear():
+    ring = MetricsRing(capacity=2)
+    ring.record('verify_complete', 0.5, 1, cpu_usage=40.0)
+    ring.record('sign_batch', 0.5, 1, batch_size=8)
+    ring.record('process_sample', 0.0, 0, memory_usage=1024.0)  # sobrescreve o primeiro registro
+    records = ring.to_dicts()
+    assert 'cpu_usage' not in records[0] and records[0]['batch_size'] == 8
+    assert records[1]['memory_usage'] == 1024.0 and 'batch_size' not in records[1]
+    ring.clear()
+    assert len(ring) == 0 and ring.to_dicts() == []
+    ring.record('hash', 1.0, 1)
+    assert 'cpu_usage' not in ring.to_dicts()[0]
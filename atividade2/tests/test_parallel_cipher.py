@@ -0,0 +1,30 @@
+import os
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from ParallelCipher import BLOCK_SIZE, MAX_SEGMENT_SIZE, ParallelAESCipher
+
+
+def test_segments_stay_below_aad_limit():
+    with ParallelAESCipher(bytes(32), workers=2) as cipher:
+        assert MAX_SEGMENT_SIZE < 2 ** 31 and MAX_SEGMENT_SIZE % BLOCK_SIZE == 0
+        for length in (MAX_SEGMENT_SIZE, MAX_SEGMENT_SIZE + 1, 2 ** 31, 5 * 2 ** 30 + 7):
+            segments = cipher.segments(length)
+            assert segments[0][0] == 0 and segments[-1][1] == length
+            assert all(end - start <= MAX_SEGMENT_SIZE for start, end in segments)
+            assert all(start % BLOCK_SIZE == 0 for start, _ in segments)
+            assert all(a[1] == b[0] for a, b in zip(segments, segments[1:]))
+        # Com 2 workers, 4 GiB vira mais segmentos que workers
+        assert len(cipher.segments(2 ** 32)) == 3
+
+
+def test_gcm_matches_aesgcm_when_split_beyond_workers():
+    key, nonce = os.urandom(32), os.urandom(12)
+    data, aad = os.urandom(1000), os.urandom(77)
+    expected = AESGCM(key).encrypt(nonce, data, aad)
+    # max_segment_size pequeno reproduz, em escala, a divisão dos buffers acima de 2^31
+    with ParallelAESCipher(key, workers=2, min_segment_size=16, max_segment_size=64) as cipher:
+        assert len(cipher.segments(len(data))) > cipher.workers
+        ciphertext, tag = cipher.encrypt_gcm(data, nonce, aad)
+        assert bytes(ciphertext) + tag == expected
+        assert bytes(cipher.decrypt_gcm(ciphertext, nonce, tag, aad)) == data
@@ -0,0 +1,15 @@
+import math
+
+from ResourceAccounting import OperationAccounting
+
+
+def test_start_returns_a_pair_and_cpu_is_sampled():
+    accounting = OperationAccounting(cpu_sample_every=4)
+    results = []
+    for _ in range(8):
+        started = accounting.start()
+        assert isinstance(started, tuple) and len(started) == 2
+        results.append(accounting.end(started))
+    assert all(duration >= 0 for duration, _ in results)
+    sampled = [not math.isnan(cpu) for _, cpu in results]
+    assert sampled == [True, False, False, False] * 2
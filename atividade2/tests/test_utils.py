@@ -0,0 +1,24 @@
+import os
+
+import utils
+
+
+def test_profile_call_stays_inside_profile_dir(tmp_path):
+    profile_dir = tmp_path / 'profiles'
+    assert utils.profile_call(str(profile_dir), 'verify_../../../tmp/x', lambda: 42) == 42
+    files = os.listdir(profile_dir)
+    assert len(files) == 1 and files[0].startswith('verify_')
+    assert not (tmp_path / 'tmp').exists()
+
+
+def test_profile_file_name_keeps_safe_names():
+    assert utils.profile_file_name('sign_carlos') == 'sign_carlos'
+    assert utils.profile_file_name('a/b') != utils.profile_file_name('a_b')
+
+
+def test_profile_call_caps_files(tmp_path):
+    for i in range(7):
+        utils.profile_call(str(tmp_path), f'sign_{i}', lambda: None, max_files=3)
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 3
+    assert [name.split('_')[1] for name in names] == ['4', '5', '6']
@@ -57,7 +57,7 @@ def run_part1_symmetric_analysis():
         from atividade1.src.crypto_benchmark import main as benchmark_main
         
         start_time = time.time()
-        results_df = benchmark_main()
+        results_df = benchmark_main([])
         end_time = time.time()
         
         print(f"✓ Benchmark concluído em {end_time - start_time:.2f} segundos")